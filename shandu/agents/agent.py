@@ -18,6 +18,7 @@ from langchain_community.tools import Tool, DuckDuckGoSearchResults, DuckDuckGoS
 from ..search.search import UnifiedSearcher, SearchResult
 from ..research.researcher import ResearchResult
 from ..scraper import WebScraper, ScrapedContent
+from ..urls import canonicalize
 from ..prompts import SYSTEM_PROMPTS, USER_PROMPTS
 
 class ResearchAgent:
@@ -128,9 +129,9 @@ class ResearchAgent:
                 break
                 
             url = result.url
-            if url and url not in seen and url.startswith('http'):
+            if url and url.startswith('http') and canonicalize(url) not in seen:
                 urls.append(url)
-                seen.add(url)
+                seen.add(canonicalize(url))
         
         return urls
 
@@ -223,10 +224,7 @@ class ResearchAgent:
                 
                 # Scrape and analyze content
                 if urls_to_scrape:
-                    scraped_content = await self.scraper.scrape_urls(
-                        urls_to_scrape,
-                        dynamic=True
-                    )
+                    scraped_content = await self.scraper.scrape_urls(urls_to_scrape)
                     
                     if scraped_content:
                         # Analyze the content
@@ -252,6 +250,10 @@ class ResearchAgent:
                     latest_analysis = context["content_analysis"][-1]
                     context["findings"] += f"\n\nDetailed Analysis:\n{latest_analysis['analysis']}"
         
+        # Release pooled scraper and search connections before the final LLM pass
+        await self.scraper.close()
+        await self.searcher.close()
+        
         # Final reflection and summary
         final_reflection = await self._reflect_on_findings(context["findings"])
         
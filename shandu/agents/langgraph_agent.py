@@ -17,7 +17,8 @@ from .processors import AgentState
 from .utils.agent_utils import (
     get_user_input,
     clarify_query,
-    display_research_progress
+    display_research_progress,
+    peak_memory_mb
 )
 from .nodes import (
     initialize_node,
@@ -149,7 +150,8 @@ class ResearchGraph:
                 "subqueries_count": len(final_state["subqueries"]),
                 "depth": depth,
                 "breadth": breadth,
-                "detail_level": detail_level
+                "detail_level": detail_level,
+                "peak_memory_mb": peak_memory_mb()
             }
         )
     
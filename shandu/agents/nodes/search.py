@@ -7,17 +7,32 @@ import asyncio
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from langchain_core.messages import HumanMessage
+from ...config import config
+from ...urls import canonicalize
+from ...scraper.dedup import NearDuplicateIndex
+from ...scraper.crawler import FocusedCrawler
 from ..processors.content_processor import AgentState, is_relevant_url, process_scraped_item, analyze_content
 from ..utils.agent_utils import log_chain_of_thought, _call_progress_callback
 
 console = Console()
 
+def _source_urls(items) -> list:
+    """URLs of analyzed pages, each followed by the near-duplicate copies folded into it."""
+    return [url for item in items for url in [item.url] + item.metadata.get("duplicate_urls", [])]
+
 async def search_node(llm, searcher, scraper, progress_callback, state: AgentState) -> AgentState:
     """Search for information and analyze results for the current research queries."""
     state["status"] = "Searching and analyzing content"
     recent_queries = state["subqueries"][-state["breadth"]:]
     processed_queries = set()
     
+    # Syndicated copies of a page are analyzed once; optionally remembered across runs
+    duplicate_index = NearDuplicateIndex(path=config.get("scraper", "near_duplicate_db"))
+    # Shared by all subqueries, so a copy found under one folds into the page analyzed for another
+    representatives = {}
+    # This node's analyses and the pages behind them, to add copies found after they were written
+    analyses = []
+    
     # Create a simple LRU cache for URL relevance checks to reduce redundant LLM calls
     url_relevance_cache = {}
     max_cache_size = 100
@@ -61,7 +76,7 @@ async def search_node(llm, searcher, scraper, progress_callback, state: AgentSta
             for i, result in enumerate(search_results):
                 if len(urls) >= 5:  # Maximum number of URLs to analyze
                     break
-                if (result.url and isinstance(result.url, str) and result.url not in seen and 
+                if (result.url and isinstance(result.url, str) and canonicalize(result.url) not in seen and 
                     result.url.startswith('http')):
                     relevance_tasks.append((i, result, cached_relevance_check(result.url, result.title, result.snippet, subquery)))
             
@@ -70,7 +85,7 @@ async def search_node(llm, searcher, scraper, progress_callback, state: AgentSta
                 is_relevant = await relevance_task
                 if is_relevant and len(urls) < 5:
                     urls.append(result.url)
-                    seen.add(result.url)
+                    seen.add(canonicalize(result.url))
                     log_chain_of_thought(state, f"Selected relevant URL: {result.url}")
                     console.print(f"[green]Selected for analysis:[/green] {result.title}")
                     console.print(f"[blue]URL:[/blue] {result.url}")
@@ -80,20 +95,58 @@ async def search_node(llm, searcher, scraper, progress_callback, state: AgentSta
             
             if urls:
                 progress.update(query_task, advance=0.2, description=f"[yellow]Scraping {len(urls)} pages for: {subquery}")
-                scraped = await scraper.scrape_urls(urls, dynamic=True)
-                successful_scraped = [s for s in scraped if s.is_successful()]
+                # Start analyzing each page as soon as it arrives instead of waiting for the slowest
+                processing_tasks = []
+                collapsed = 0
+                scraped = []
                 
-                if successful_scraped:
-                    progress.update(query_task, advance=0.2, description=f"[yellow]Analyzing content for: {subquery}")
-                    content_text = ""
+                def handle(item):
+                    nonlocal collapsed
+                    # Collapse near-duplicate pages before spending LLM calls on them
+                    if not duplicate_index.collapse([item], representatives):
+                        collapsed += 1
+                        return
                     
-                    # Process all scraped items in parallel using our processor module
-                    processing_tasks = []
-                    for item in successful_scraped:
-                        main_content = await scraper.extract_main_content(item)
-                        processing_tasks.append(process_scraped_item(llm, item, subquery, main_content))
+                    if not processing_tasks:
+                        progress.update(query_task, advance=0.2, description=f"[yellow]Analyzing content for: {subquery}")
+                    # Main text was extracted once at scrape time; no need to re-parse the HTML
+                    processing_tasks.append(asyncio.ensure_future(
+                        process_scraped_item(llm, item, subquery, item.extraction.text)
+                    ))
+                
+                try:
+                    async for item in scraper.scrape_iter(urls, deadline=config.get("scraper", "batch_deadline", 90)):
+                        if not item.is_successful():
+                            continue
+                        scraped.append(item)
+                        handle(item)
                     
-                    # Process all items in parallel
+                    # Follow the most promising in-page links of the pages just scraped
+                    if scraped and config.get("scraper", "focused_crawl", False):
+                        crawler = FocusedCrawler(
+                            scraper,
+                            max_pages=config.get("scraper", "crawl_max_pages", 5),
+                            max_pages_per_domain=config.get("scraper", "crawl_max_pages_per_domain", 2),
+                            max_depth=config.get("scraper", "crawl_max_depth", 1),
+                            deadline=config.get("scraper", "batch_deadline", 90)
+                        )
+                        crawled = 0
+                        async for item in crawler.crawl(subquery, scraped, seen):
+                            crawled += 1
+                            log_chain_of_thought(state, f"Crawled linked page: {item.url}")
+                            handle(item)
+                        if crawled:
+                            log_chain_of_thought(state, f"Focused crawl added {crawled} pages for: {subquery}")
+                except BaseException:
+                    for task in processing_tasks:
+                        task.cancel()
+                    raise
+                
+                if collapsed:
+                    log_chain_of_thought(state, f"Collapsed {collapsed} near-duplicate pages for: {subquery}")
+                
+                if processing_tasks:
+                    content_text = ""
                     processed_items = await asyncio.gather(*processing_tasks)
                     
                     # Build content text from processed items
@@ -104,7 +157,9 @@ async def search_node(llm, searcher, scraper, progress_callback, state: AgentSta
                             continue
                         
                         relevant_items.append(processed)
-                        content_text += f"\nSource: {processed['item'].url}\nTitle: {processed['item'].title}\nReliability: {processed['rating']}\nRelevant Content:\n{processed['content']}\n\n"
+                        duplicate_urls = processed['item'].metadata.get("duplicate_urls", [])
+                        also_published = f"Also published at: {', '.join(duplicate_urls)}\n" if duplicate_urls else ""
+                        content_text += f"\nSource: {processed['item'].url}\n{also_published}Title: {processed['item'].title}\nReliability: {processed['rating']}\nRelevant Content:\n{processed['content']}\n\n"
                         console.print(f"\n[bold cyan]Analyzing page:[/bold cyan] {processed['item'].title}")
                         console.print(f"[blue]URL:[/blue] {processed['item'].url}")
                         console.print(f"[dim]Extracted Content: {processed['content'][:150]}{'...' if len(processed['content']) > 150 else ''}[/dim]")
@@ -114,11 +169,14 @@ async def search_node(llm, searcher, scraper, progress_callback, state: AgentSta
                             # Use our analyze_content function from the processors module
                             analysis_content = await analyze_content(llm, subquery, content_text)
                             
-                            state["content_analysis"].append({
+                            analyzed_pages = [item["item"] for item in relevant_items]
+                            entry = {
                                 "subquery": subquery,
                                 "analysis": analysis_content,
-                                "sources": [item["item"].url for item in relevant_items]
-                            })
+                                "sources": _source_urls(analyzed_pages)
+                            }
+                            state["content_analysis"].append(entry)
+                            analyses.append((entry, analyzed_pages))
                             
                             # Store findings with thematic headers
                             state["findings"] += f"\n\n## Research on '{subquery}':\n{analysis_content}\n"
@@ -144,21 +202,31 @@ async def search_node(llm, searcher, scraper, progress_callback, state: AgentSta
             console.print(f"[dim red]Error processing {subquery}: {str(e)}[/dim red]")
             return False
     
-    with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-        # Create all tasks first
-        tasks = {}
-        for i, subquery in enumerate(recent_queries):
-            if subquery not in processed_queries:
-                task_id = progress.add_task(f"[yellow]Searching: {subquery}", total=1)
-                tasks[subquery] = task_id
-        
-        # Process queries in parallel batches to avoid overwhelming the system
-        batch_size = min(3, len(tasks))  # Process up to 3 queries at once
-        
-        for i in range(0, len(tasks), batch_size):
-            batch_queries = list(tasks.keys())[i:i+batch_size]
-            batch_tasks = [process_query(query, tasks[query], progress) for query in batch_queries]
-            await asyncio.gather(*batch_tasks)
+    try:
+        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
+            # Create all tasks first
+            tasks = {}
+            for i, subquery in enumerate(recent_queries):
+                if subquery not in processed_queries:
+                    task_id = progress.add_task(f"[yellow]Searching: {subquery}", total=1)
+                    tasks[subquery] = task_id
+            
+            # Process queries in parallel batches to avoid overwhelming the system
+            batch_size = min(3, len(tasks))  # Process up to 3 queries at once
+            
+            for i in range(0, len(tasks), batch_size):
+                batch_queries = list(tasks.keys())[i:i+batch_size]
+                batch_tasks = [process_query(query, tasks[query], progress) for query in batch_queries]
+                await asyncio.gather(*batch_tasks)
+            
+            # Copies found by later subqueries were folded into pages analyzed earlier
+            for entry, analyzed_pages in analyses:
+                entry["sources"] = _source_urls(analyzed_pages)
+    finally:
+        # Each graph node runs on its own event loop, so release the pooled connections here
+        await scraper.close()
+        await searcher.close()
+        duplicate_index.close()
     
     state["current_depth"] += 1
     elapsed_time = time.time() - state["start_time"]
@@ -1,6 +1,7 @@
 """Agent utility functions."""
 from typing import List, Dict, Optional, Any, Callable, Union, TypedDict, Sequence
 from dataclasses import dataclass
+import sys
 import time
 import re
 from datetime import datetime
@@ -100,6 +101,17 @@ def display_research_progress(state: AgentState) -> Tree:
     
     return tree
 
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB, where the platform reports it."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
 async def _call_progress_callback(callback: Optional[Callable], state: AgentState) -> None:
     """
     Call the progress callback with the current state if provided.
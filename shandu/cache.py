@@ -0,0 +1,338 @@
+"""Indexed on-disk cache store shared by the scraper and search caches."""
+from typing import Any, Dict, Iterable, Optional
+from collections import OrderedDict
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries(expires_at);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at);
+CREATE TABLE IF NOT EXISTS entry_blobs (
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (key, field)
+);
+CREATE INDEX IF NOT EXISTS idx_entry_blobs_hash ON entry_blobs(hash);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+# Per-entry files of the JSON cache format that CacheStore replaced, named by an MD5 hex digest
+LEGACY_FILE_PATTERN = re.compile(r"[0-9a-f]{32}\.json")
+
+def remove_legacy_files(cache_dir: str):
+    """Delete the per-entry JSON files of the previous cache format from cache_dir."""
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+    for name in names:
+        if LEGACY_FILE_PATTERN.fullmatch(name):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+class CacheStore:
+    """
+    SQLite-backed key/value store for JSON records.
+
+    Large text fields are zlib-compressed and stored content-addressed, so
+    identical payloads are kept once no matter how many keys point at them.
+    Entries expire through an indexed TTL column, the least recently used
+    entries are evicted once compressed blobs exceed max_bytes, and a bounded
+    in-memory LRU tier serves hot keys without touching disk. Expired entries
+    are kept for stale_ttl more seconds so callers can revalidate them. Blob
+    fields listed in lazy_fields are left out of get() results and the memory
+    tier and read on demand with get_field(). The aget/aset coroutines run the
+    SQLite work in a worker thread. With purge_interval set, a daemon thread
+    also purges expired entries and evicts down to max_bytes on that period,
+    so stores that see few writes don't grow stale.
+    """
+    def __init__(
+        self,
+        path: str,
+        ttl: int = 86400,
+        max_bytes: int = 512 * 1024 * 1024,
+        memory_items: int = 128,
+        maintenance_interval: int = 50,
+        stale_ttl: int = 0,
+        lazy_fields: Iterable[str] = (),
+        purge_interval: Optional[float] = None
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.maintenance_interval = maintenance_interval
+        self.lazy_fields = frozenset(lazy_fields)
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._writes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.purge_expired()
+
+        self._closed = threading.Event()
+        self._maintainer = None
+        if purge_interval:
+            self._maintainer = threading.Thread(
+                target=self._maintain, args=(purge_interval,), name="cache-maintenance", daemon=True
+            )
+            self._maintainer.start()
+
+    def _maintain(self, interval: float):
+        """Purge and evict periodically until the store is closed."""
+        while not self._closed.wait(interval):
+            try:
+                self.purge_expired()
+                self.evict()
+            except sqlite3.Error:
+                # Closed underneath us or busy; try again next period
+                pass
+
+    @staticmethod
+    def _hash(data: str) -> str:
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, record: Dict[str, Any], expires_at: float):
+        """Put a record in the in-memory LRU tier."""
+        if self.memory_items <= 0:
+            return
+        # Callers own the records they pass in and get back, so the tier keeps its own copies
+        record = copy.deepcopy(record)
+        with self._memory_lock:
+            self._memory[key] = (record, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _forget(self, key: str):
+        """Drop a record from the in-memory LRU tier."""
+        with self._memory_lock:
+            self._memory.pop(key, None)
+
+    def _recall(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an unexpired record from the in-memory LRU tier."""
+        with self._memory_lock:
+            cached = self._memory.get(key)
+            if cached is None:
+                return None
+            record, expires_at = cached
+            if expires_at < time.time():
+                self._memory.pop(key, None)
+                return None
+            self._memory.move_to_end(key)
+            return copy.deepcopy(record)
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Get a record if present and not expired, or also if expired when allow_stale is set."""
+        record = self._recall(key)
+        if record is not None:
+            return record
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] < now and not allow_stale):
+                return None
+
+            record = json.loads(row[0])
+            for field, blob_hash in self._conn.execute(
+                "SELECT field, hash FROM entry_blobs WHERE key = ?", (key,)
+            ).fetchall():
+                if field in self.lazy_fields:
+                    continue
+                blob = self._conn.execute("SELECT data FROM blobs WHERE hash = ?", (blob_hash,)).fetchone()
+                if blob is None:
+                    # A missing blob means a partially evicted entry; treat it as a miss
+                    return None
+                record[field] = zlib.decompress(blob[0]).decode("utf-8")
+
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            if row[1] >= now:
+                self._remember(key, record, row[1])
+            return dict(record)
+
+    def get_field(self, key: str, field: str) -> Optional[str]:
+        """Read one blob field of a record, expired or not, e.g. a lazy field."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM blobs JOIN entry_blobs ON blobs.hash = entry_blobs.hash "
+                "WHERE entry_blobs.key = ? AND entry_blobs.field = ?", (key, field)
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def refresh(self, key: str, ttl: Optional[int] = None) -> bool:
+        """Extend an entry's lifetime, e.g. after a successful revalidation."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE entries SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                (expires_at, now, key)
+            ).rowcount
+        return bool(updated)
+
+    def set(
+        self,
+        key: str,
+        record: Dict[str, Any],
+        blob_fields: Iterable[str] = (),
+        ttl: Optional[int] = None
+    ):
+        """Store a record, moving the named string fields into compressed shared blobs."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        blob_fields = [f for f in blob_fields if isinstance(record.get(f), str)]
+        inline = {k: v for k, v in record.items() if k not in blob_fields}
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM entry_blobs WHERE key = ?", (key,))
+                for field in blob_fields:
+                    value = record[field]
+                    blob_hash = self._hash(value)
+                    exists = self._conn.execute(
+                        "SELECT 1 FROM blobs WHERE hash = ?", (blob_hash,)
+                    ).fetchone()
+                    if exists is None:
+                        data = zlib.compress(value.encode("utf-8"), 6)
+                        self._conn.execute(
+                            "INSERT INTO blobs (hash, data, size) VALUES (?, ?, ?)",
+                            (blob_hash, data, len(data))
+                        )
+                    self._conn.execute(
+                        "INSERT INTO entry_blobs (key, field, hash) VALUES (?, ?, ?)",
+                        (key, field, blob_hash)
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, stored_at, expires_at, accessed_at, record) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, now, expires_at, now, json.dumps(inline))
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            self._remember(key, {k: v for k, v in record.items() if k not in self.lazy_fields}, expires_at)
+            self._writes += 1
+            if self._writes % self.maintenance_interval == 0:
+                self.purge_expired()
+                self.evict()
+
+    def delete(self, key: str):
+        """Remove a record."""
+        self._forget(key)
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM entry_blobs WHERE key = ?", (key,))
+
+    def _collect_orphans(self):
+        """Drop blobs no longer referenced by any entry."""
+        self._conn.execute("DELETE FROM entry_blobs WHERE key NOT IN (SELECT key FROM entries)")
+        self._conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM entry_blobs)")
+
+    def purge_expired(self) -> int:
+        """Delete entries past their stale window and their unreferenced blobs."""
+        now = time.time()
+        with self._memory_lock:
+            for key in [k for k, (_, expires_at) in self._memory.items() if expires_at < now]:
+                self._memory.pop(key, None)
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM entries WHERE expires_at < ?", (now - self.stale_ttl,)
+            ).rowcount
+            if deleted:
+                self._collect_orphans()
+            return deleted
+
+    def size_bytes(self) -> int:
+        """Total compressed size of stored blobs."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least recently used entries until blobs fit in max_bytes."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        evicted = 0
+        with self._lock:
+            # Evict down to 90% of the limit so eviction doesn't run on every write
+            target = int(limit * 0.9)
+            size = self.size_bytes()
+            while size > limit or (evicted and size > target):
+                rows = self._conn.execute(
+                    "SELECT e.key, COALESCE(SUM(b.size), 0) FROM entries e "
+                    "LEFT JOIN entry_blobs eb ON eb.key = e.key "
+                    "LEFT JOIN blobs b ON b.hash = eb.hash "
+                    "GROUP BY e.key ORDER BY e.accessed_at ASC"
+                ).fetchall()
+                if not rows:
+                    break
+
+                keys, freed = [], 0
+                for key, entry_size in rows:
+                    keys.append(key)
+                    freed += entry_size
+                    if size - freed <= target:
+                        break
+
+                for key in keys:
+                    self._forget(key)
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+                self._collect_orphans()
+                evicted += len(keys)
+                size = self.size_bytes()
+        return evicted
+
+    async def aget(self, key: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Get a record without blocking the event loop."""
+        record = self._recall(key)
+        if record is not None:
+            return record
+        return await asyncio.to_thread(self.get, key, allow_stale)
+
+    async def aset(
+        self,
+        key: str,
+        record: Dict[str, Any],
+        blob_fields: Iterable[str] = (),
+        ttl: Optional[int] = None
+    ):
+        """Store a record without blocking the event loop."""
+        await asyncio.to_thread(self.set, key, record, tuple(blob_fields), ttl)
+
+    def close(self):
+        """Stop background maintenance and close the underlying database connection."""
+        self._closed.set()
+        with self._lock:
+            self._conn.close()
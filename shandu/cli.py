@@ -20,7 +20,7 @@ from rich.table import Table
 from rich.layout import Layout
 from rich.syntax import Syntax
 from langchain_openai import ChatOpenAI
-from .config import config
+from .config import config, get_cache_dir
 from .agents.langgraph_agent import clarify_query, display_research_progress
 from .agents.langgraph_agent import ResearchGraph, AgentState
 from .search.search import UnifiedSearcher
@@ -117,8 +117,25 @@ def create_research_dashboard(state: AgentState) -> Layout:
     return layout
 
 @click.group()
-def cli():
+@click.option("--record", "record_path", default=None, metavar="ARCHIVE",
+              help="Record all search and scraper traffic to an archive file")
+@click.option("--replay", "replay_path", default=None, metavar="ARCHIVE",
+              help="Serve search and scraper traffic from a recorded archive, offline")
+@click.option("--replay-latency", default="recorded",
+              help="Delay for replayed responses: 'recorded', a number of seconds, or 0")
+def cli(record_path: Optional[str], replay_path: Optional[str], replay_latency: str):
     """Shandu deep research system."""
+    if record_path and replay_path:
+        raise click.UsageError("--record and --replay cannot be used together")
+    if record_path or replay_path:
+        config.set_runtime("replay", "mode", "record" if record_path else "replay")
+        config.set_runtime("replay", "archive", record_path or replay_path)
+        if replay_latency != "recorded":
+            try:
+                replay_latency = float(replay_latency)
+            except ValueError:
+                raise click.BadParameter("must be 'recorded' or a number of seconds", param_hint="--replay-latency")
+        config.set_runtime("replay", "latency", replay_latency)
     display_banner()
     pass
 
@@ -197,7 +214,7 @@ def clean(force: bool, cache_only: bool):
         return
     
     if cache_only:
-        cache_path = os.path.join(config_path, "cache")
+        cache_path = get_cache_dir()
         if os.path.exists(cache_path):
             if not force:
                 confirm = click.confirm(f"Are you sure you want to delete all cache files in {cache_path}?")
@@ -484,14 +501,14 @@ def search(query: str, engines: Optional[str], max_results: int):
 
 @cli.command()
 @click.argument("url")
-@click.option("--dynamic", "-d", is_flag=True, help="Use dynamic rendering (for JavaScript-heavy sites)")
+@click.option("--dynamic", "-d", is_flag=True, help="Always use dynamic rendering (by default pages are rendered only when they need JavaScript)")
 def scrape(url: str, dynamic: bool):
     """Scrape and analyze a webpage."""
     scraper = WebScraper(proxy=config.get("scraper", "proxy"))
     
     console.print(Panel(
         f"[bold blue]URL:[/] {url}\n"
-        f"[bold blue]Dynamic Rendering:[/] {'Enabled' if dynamic else 'Disabled'}",
+        f"[bold blue]Dynamic Rendering:[/] {'Always' if dynamic else 'Auto'}",
         title="Scrape Parameters",
         border_style="blue"
     ))
@@ -504,7 +521,11 @@ def scrape(url: str, dynamic: bool):
         task = progress.add_task("[green]Scraping...", total=1)
         
         try:
-            result = asyncio.run(scraper.scrape_url(url, dynamic=dynamic))
+            async def run_scrape():
+                async with scraper:
+                    return await scraper.scrape_url(url, dynamic=True if dynamic else None)
+            
+            result = asyncio.run(run_scrape())
             progress.update(task, completed=1)
             
         except Exception as e:
@@ -543,5 +564,112 @@ def scrape(url: str, dynamic: bool):
     else:
         console.print(f"[red]Failed to scrape {url}: {result.error}[/]")
 
+@cli.command(name="bulk-scrape")
+@click.argument("input_file", type=click.File("r", encoding="utf-8"), default="-")
+@click.option("--output", "-o", default="-", help="JSONL file to write results to (default: stdout)")
+@click.option("--cache-only", is_flag=True, help="Only store pages in the scraper cache, don't write results")
+@click.option("--concurrency", "-n", default=8, type=int, help="Initial number of pages fetched at once")
+@click.option("--strategy", "-s", default="auto", type=click.Choice(["auto", "static", "dynamic"]),
+              help="Rendering strategy: render only when needed, never, or always")
+@click.option("--per-host", default=None, type=int, help="Maximum concurrent requests per host")
+@click.option("--rate", default=None, type=float, help="Maximum requests per second per host")
+@click.option("--checkpoint", "-c", default=None, help="Checkpoint file for resuming (default: OUTPUT.checkpoint)")
+@click.option("--force-refresh", "-f", is_flag=True, help="Ignore cached pages")
+@click.option("--include-html", is_flag=True, help="Include raw HTML in the results")
+def bulk_scrape(
+    input_file,
+    output: str,
+    cache_only: bool,
+    concurrency: int,
+    strategy: str,
+    per_host: Optional[int],
+    rate: Optional[float],
+    checkpoint: Optional[str],
+    force_refresh: bool,
+    include_html: bool
+):
+    """Scrape a list of URLs (one per line, from a file or stdin) into JSONL."""
+    import contextlib
+    from .scraper.bulk import Checkpoint, bulk_scrape as run_bulk_scrape, read_urls
+    
+    # Results may go to stdout, so all progress output goes to stderr
+    err_console = Console(stderr=True)
+    urls = read_urls(input_file)
+    if not urls:
+        err_console.print("[yellow]No URLs to scrape.[/]")
+        return
+    
+    if checkpoint is None and output != "-":
+        checkpoint = output + ".checkpoint"
+    done = Checkpoint(checkpoint) if checkpoint else None
+    
+    scraper = WebScraper(proxy=config.get("scraper", "proxy"), max_concurrent=concurrency)
+    if per_host:
+        scraper.scheduler.per_domain_concurrency = per_host
+    if rate:
+        scraper.scheduler.requests_per_second = rate
+    dynamic = {"auto": None, "static": False, "dynamic": True}[strategy]
+    
+    if cache_only:
+        out = None
+    elif output == "-":
+        out = sys.stdout
+    else:
+        # Resumed runs append to what the earlier run wrote
+        out = open(output, "a" if done is not None and done.done else "w", encoding="utf-8")
+    
+    def write_result(result):
+        if out is None:
+            return
+        record = result.to_dict()
+        if not include_html:
+            record.pop("html", None)
+        elif record["html"] is None and result.is_successful():
+            # Shed after extraction; read it back from the cache
+            record["html"] = scraper.cache.load_html(result.url)
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+    
+    err_console.print(f"[bold blue]Scraping {len(urls)} URLs[/] ({'cache only' if cache_only else output})")
+    
+    async def run():
+        async with scraper:
+            return await run_bulk_scrape(
+                scraper, urls,
+                on_result=write_result,
+                checkpoint=done,
+                dynamic=dynamic,
+                force_refresh=force_refresh
+            )
+    
+    try:
+        # The scraper logs with print(); keep it out of JSONL written to stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            stats = asyncio.run(run())
+    except KeyboardInterrupt:
+        err_console.print("[yellow]Interrupted. Run again with the same checkpoint to resume.[/]")
+        sys.exit(130)
+    finally:
+        if done is not None:
+            done.close()
+        if out is not None and out is not sys.stdout:
+            out.close()
+    
+    summary = stats.to_dict()
+    table = Table(title="Bulk Scrape Summary", show_header=False)
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="green")
+    table.add_row("Scraped", f"{summary['succeeded']} ok, {summary['failed']} failed")
+    if summary["skipped"]:
+        table.add_row("Skipped (checkpoint)", str(summary["skipped"]))
+    table.add_row("Elapsed", f"{summary['elapsed']:.1f}s")
+    table.add_row("Throughput", f"{summary['pages_per_second']:.2f} pages/s")
+    if summary["p50_latency"] is not None:
+        table.add_row("Latency p50 / p95 / max", f"{summary['p50_latency']:.2f}s / {summary['p95_latency']:.2f}s / {summary['max_latency']:.2f}s")
+    table.add_row("Text extracted", f"{summary['text_chars']:,} chars")
+    for error, count in sorted(summary["errors"].items(), key=lambda item: -item[1])[:5]:
+        table.add_row(f"Error ({count})", error)
+    err_console.print(table)
+
 if __name__ == "__main__":
     cli()
@@ -17,7 +17,12 @@ DEFAULT_CONFIG = {
         "max_results": 10,
         "region": "wt-wt",
         "safesearch": "moderate",
-        "user_agent": "Research 1.0"
+        "user_agent": "Research 1.0",
+        "cache_max_bytes": 67108864,
+        "max_connections": 20,
+        "max_connections_per_host": 4,
+        "engine_concurrency": {"google": 1, "wikipedia": 4, "duckduckgo": 2, "arxiv": 1},
+        "google_deadline": 30
     },
     "research": {
         "default_depth": 2,
@@ -31,7 +36,49 @@ DEFAULT_CONFIG = {
         "max_retries": 3,
         "chunk_size": 1000,
         "chunk_overlap": 200,
-        "proxy": None
+        "proxy": None,
+        "max_connections": 100,
+        "max_connections_per_host": 8,
+        "max_browsers": 1,
+        "max_browser_pages": 4,
+        "per_host_concurrency": 2,
+        "per_host_rate": 1.0,
+        "per_host_burst": 2,
+        "adaptive_concurrency": True,
+        "min_concurrent": 2,
+        "max_concurrent_limit": 32,
+        "cache_max_bytes": 536870912,
+        "extraction_workers": None,
+        "extraction_timeout": 30,
+        "extraction_inline": False,
+        "max_page_bytes": 2097152,
+        "max_content_length": 10485760,
+        "shed_html": True,
+        "page_budget": 60,
+        "batch_deadline": 90,
+        "robots_cache_ttl": 86400,
+        "canonical_rules": {},
+        "near_duplicate_db": None,
+        "health_db": "health/health.db",
+        "circuit_failure_threshold": 5,
+        "circuit_cooldown": 60,
+        "render_block_resources": True,
+        "render_block_trackers": True,
+        "render_quiet_ms": 500,
+        "render_max_wait_ms": 5000,
+        "focused_crawl": False,
+        "crawl_max_pages": 5,
+        "crawl_max_pages_per_domain": 2,
+        "crawl_max_depth": 1
+    },
+    "cache": {
+        "dir": "~/.shandu/cache"
+    },
+    "replay": {
+        "mode": None,
+        "archive": None,
+        "latency": "recorded",
+        "latency_scale": 1.0
     },
     "display": {
         "verbose": False,
@@ -45,6 +92,7 @@ class Config:
     
     def __init__(self):
         self._config = DEFAULT_CONFIG.copy()
+        self._runtime: Dict[str, Dict[str, Any]] = {}  # per-process overrides that save() leaves out
         self._config_path = os.path.expanduser("~/.shandu/config.json")
         self._load_config()
         self._load_env_vars()
@@ -72,6 +120,13 @@ class Config:
         if os.environ.get("SHANDU_PROXY"):
             self._config["scraper"]["proxy"] = os.environ["SHANDU_PROXY"]
             
+        if os.environ.get("SHANDU_RECORD"):
+            self.set_runtime("replay", "mode", "record")
+            self.set_runtime("replay", "archive", os.environ["SHANDU_RECORD"])
+        elif os.environ.get("SHANDU_REPLAY"):
+            self.set_runtime("replay", "mode", "replay")
+            self.set_runtime("replay", "archive", os.environ["SHANDU_REPLAY"])
+            
         if os.environ.get("USER_AGENT"):
             self._config["search"]["user_agent"] = os.environ["USER_AGENT"]
     
@@ -92,6 +147,10 @@ class Config:
     
     def get(self, section: str, key: str, default: Any = None) -> Any:
         """Get config value."""
+        try:
+            return self._runtime[section][key]
+        except KeyError:
+            pass
         try:
             return self._config[section][key]
         except KeyError:
@@ -103,13 +162,20 @@ class Config:
             self._config[section] = {}
         self._config[section][key] = value
     
+    def set_runtime(self, section: str, key: str, value: Any):
+        """Set config value for this process only; it is not saved."""
+        self._runtime.setdefault(section, {})[key] = value
+    
     def get_section(self, section: str) -> Dict[str, Any]:
         """Get config section."""
-        return self._config.get(section, {}).copy()
+        return {**self._config.get(section, {}), **self._runtime.get(section, {})}
     
     def get_all(self) -> Dict[str, Any]:
         """Get all config."""
-        return self._config.copy()
+        merged = self._config.copy()
+        for section, values in self._runtime.items():
+            merged[section] = {**merged.get(section, {}), **values}
+        return merged
 
 config = Config()
 
@@ -121,6 +187,11 @@ def get_current_datetime() -> str:
     """Get current date and time."""
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def get_cache_dir(*parts: str) -> str:
+    """Get a directory under the configured cache root."""
+    root = os.path.expanduser(config.get("cache", "dir") or "~/.shandu/cache")
+    return os.path.join(root, *parts)
+
 def get_user_agent() -> str:
     """Get user agent string."""
     configured_agent = config.get("search", "user_agent", None)
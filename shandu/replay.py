@@ -0,0 +1,412 @@
+"""Record/replay of network traffic for deterministic, offline runs."""
+from typing import Any, Dict, List, Optional, Tuple, Union
+from contextlib import asynccontextmanager
+import asyncio
+import atexit
+import base64
+import gzip
+import json
+import os
+import threading
+import time
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from .config import config
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Kinds of exchange kept in an archive
+HTTP = "http"
+RENDER = "render"
+SEARCH = "search"
+
+# Recorded failures, raised again on replay
+TIMEOUT_ERROR = "timeout"
+CLIENT_ERROR = "client"
+
+class ReplayMiss(Exception):
+    """Raised in replay mode for a request that was never recorded."""
+
+class Archive:
+    """
+    Append-only archive of recorded request/response pairs.
+
+    The archive is a gzip-compressed file of JSON lines in the spirit of WARC:
+    a header line, then one record per exchange with its kind (http, render or
+    search), request key, response payload, the time the real request took and
+    any error it raised. In replay mode records are served back per key in the
+    order they were recorded, the last one repeating once a key runs out, after
+    an injected delay: the recorded latency times latency_scale, a fixed number
+    of seconds, or none.
+    """
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = REPLAY,
+        latency: Union[str, float, None] = "recorded",
+        latency_scale: float = 1.0
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown archive mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._positions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+        if mode == REPLAY:
+            self._load()
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            # Appending adds a gzip member; readers see one continuous stream
+            self._file = gzip.open(path, "at", encoding="utf-8")
+            self._write({"type": "archive", "version": self.VERSION, "created": time.time()})
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("type") != "response":
+                    continue
+                self._entries.setdefault((record["kind"], record["key"]), []).append(record)
+
+    def _write(self, record: Dict[str, Any]):
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def record(self, kind: str, key: str, payload: Dict[str, Any], elapsed: Optional[float] = None):
+        """Append one exchange to the archive."""
+        if not self.recording or self._file is None:
+            return
+        record = {"type": "response", "kind": kind, "key": key, "recorded_at": time.time()}
+        if elapsed is not None:
+            record["elapsed"] = round(elapsed, 4)
+        record.update(payload)
+        self._write(record)
+        self.recorded += 1
+
+    def lookup(self, kind: str, key: str) -> Dict[str, Any]:
+        """Get the next recorded response for a request, without delay."""
+        with self._lock:
+            entries = self._entries.get((kind, key))
+            if not entries:
+                self.misses += 1
+                raise ReplayMiss(f"No recorded {kind} response for {key}")
+            position = self._positions.get((kind, key), 0)
+            self._positions[(kind, key)] = position + 1
+            self.replayed += 1
+            return entries[min(position, len(entries) - 1)]
+
+    def delay_for(self, entry: Dict[str, Any]) -> float:
+        """Latency to inject before serving a recorded response."""
+        if self.latency == "recorded":
+            return entry.get("elapsed", 0.0) * self.latency_scale
+        if self.latency:
+            return float(self.latency) * self.latency_scale
+        return 0.0
+
+    async def replay(self, kind: str, key: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Serve a recorded response after its injected latency.
+
+        A delay longer than timeout ends in asyncio.TimeoutError once the
+        timeout has passed, as the live request would have.
+        """
+        entry = self.lookup(kind, key)
+        delay = self.delay_for(entry)
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        """Report archive usage."""
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "keys": len(self._entries)
+        }
+
+    def close(self):
+        """Flush and close a recording archive."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+_archives: Dict[Tuple[str, str], Archive] = {}
+_archives_lock = threading.Lock()
+
+def shared_archive() -> Optional[Archive]:
+    """
+    Get the process-wide archive set up in the replay config section, if any.
+
+    The scraper and the searchers share it, so one archive holds a whole run.
+    """
+    mode = config.get("replay", "mode")
+    path = config.get("replay", "archive")
+    if not mode or not path:
+        return None
+    path = os.path.expanduser(path)
+    with _archives_lock:
+        archive = _archives.get((mode, path))
+        if archive is None:
+            archive = Archive(
+                path,
+                mode,
+                latency=config.get("replay", "latency", "recorded"),
+                latency_scale=config.get("replay", "latency_scale", 1.0)
+            )
+            _archives[(mode, path)] = archive
+            atexit.register(archive.close)
+        return archive
+
+def _total_timeout(kwargs: Dict[str, Any]) -> Optional[float]:
+    timeout = kwargs.get("timeout")
+    return getattr(timeout, "total", None)
+
+class _ReplayContent:
+    """Body stream of a replayed response."""
+    def __init__(self, body: bytes):
+        self._body = body
+        self._position = 0
+
+    async def iter_chunked(self, size: int):
+        while self._position < len(self._body):
+            chunk = self._body[self._position:self._position + size]
+            self._position += len(chunk)
+            yield chunk
+
+    async def read(self, n: int = -1) -> bytes:
+        end = len(self._body) if n < 0 else self._position + n
+        chunk = self._body[self._position:end]
+        self._position += len(chunk)
+        return chunk
+
+class ReplayResponse:
+    """The parts of an aiohttp response the scraper and searchers use."""
+    def __init__(self, url: str, status: int, headers: List[List[str]], body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict([(k, v) for k, v in headers]))
+        self.content = _ReplayContent(body)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "strict") -> str:
+        return self._body.decode(encoding or "utf-8", errors=errors)
+
+    async def json(self, **kwargs) -> Any:
+        return json.loads(self._body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status, message="replayed error")
+
+    def release(self):
+        pass
+
+class _ArchiveSession:
+    """aiohttp-style session whose requests go through an archive."""
+    closed = False
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    @staticmethod
+    def key(method: str, url: str, params: Optional[Dict[str, Any]] = None, data: Any = None) -> str:
+        """Archive key of a request."""
+        key = f"{method.upper()} {url}"
+        if params:
+            key += "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        if data:
+            key += " " + (json.dumps(data, sort_keys=True) if isinstance(data, dict) else str(data))
+        return key
+
+class ReplaySession(_ArchiveSession):
+    """Serves recorded responses; nothing touches the network."""
+    def __init__(self, archive: Archive):
+        self.archive = archive
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs):
+        key = self.key(method, url, kwargs.get("params"), kwargs.get("data") or kwargs.get("json"))
+        try:
+            entry = await self.archive.replay(HTTP, key, _total_timeout(kwargs))
+        except ReplayMiss as e:
+            raise aiohttp.ClientConnectionError(str(e)) from e
+        if entry.get("error") == TIMEOUT_ERROR:
+            raise asyncio.TimeoutError()
+        if entry.get("error"):
+            raise aiohttp.ClientConnectionError(entry.get("message", "replayed error"))
+        yield ReplayResponse(url, entry["status"], entry.get("headers", []), base64.b64decode(entry.get("body", "")))
+
+class _RecordingContent:
+    """Body stream of a live response that keeps a copy of what is read."""
+    def __init__(self, response: "RecordingResponse"):
+        self._response = response
+
+    async def iter_chunked(self, size: int):
+        async for chunk in self._response.read_chunks(size):
+            yield chunk
+
+    async def read(self, n: int = -1) -> bytes:
+        return await self._response.read_some(n)
+
+class RecordingResponse:
+    """
+    A live response whose body is recorded as the caller reads it.
+
+    Status and headers are available straight away, so a caller can still
+    turn a response down from its headers without the body being downloaded.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, response: aiohttp.ClientResponse, max_body_bytes: int):
+        self._response = response
+        self.url = response.url
+        self.status = response.status
+        self.headers = response.headers
+        self.content = _RecordingContent(self)
+        self.max_body_bytes = max_body_bytes
+        self.body = bytearray()
+        self.error: Optional[BaseException] = None
+
+    def _keep(self, chunk: bytes) -> bytes:
+        room = self.max_body_bytes - len(self.body)
+        if room > 0:
+            self.body.extend(chunk[:room])
+        return chunk
+
+    async def read_chunks(self, size: int):
+        try:
+            async for chunk in self._response.content.iter_chunked(size):
+                yield self._keep(chunk)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            self.error = e
+            raise
+
+    async def read_some(self, n: int = -1) -> bytes:
+        try:
+            return self._keep(await self._response.content.read(n))
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            self.error = e
+            raise
+
+    async def read(self) -> bytes:
+        """Read the body until its end or max_body_bytes."""
+        while len(self.body) < self.max_body_bytes:
+            if not await self.read_some(min(self.CHUNK_SIZE, self.max_body_bytes - len(self.body))):
+                break
+        return bytes(self.body)
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "strict") -> str:
+        body = await self.read()
+        return body.decode(encoding or self._response.charset or "utf-8", errors=errors)
+
+    async def json(self, **kwargs) -> Any:
+        return json.loads(await self.read())
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    def release(self):
+        self._response.release()
+
+class RecordingSession(_ArchiveSession):
+    """
+    Sends requests through a real session and records every exchange.
+
+    A response is recorded once the caller is done with it, holding the
+    status, the headers and as much of the body as the caller read, up to
+    max_body_bytes. Replaying serves the caller that same response.
+    """
+    def __init__(self, session: aiohttp.ClientSession, archive: Archive, max_body_bytes: int = 10 * 1024 * 1024):
+        self.session = session
+        self.archive = archive
+        self.max_body_bytes = max_body_bytes
+
+    @property
+    def closed(self) -> bool:
+        return self.session.closed
+
+    def _record_error(self, key: str, error: BaseException, started: float):
+        if isinstance(error, asyncio.TimeoutError):
+            payload = {"error": TIMEOUT_ERROR}
+        else:
+            payload = {"error": CLIENT_ERROR, "message": str(error)}
+        self.archive.record(HTTP, key, payload, time.monotonic() - started)
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs):
+        key = self.key(method, url, kwargs.get("params"), kwargs.get("data") or kwargs.get("json"))
+        started = time.monotonic()
+        recorded = None
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                recorded = RecordingResponse(response, self.max_body_bytes)
+                try:
+                    yield recorded
+                finally:
+                    if recorded.error is not None:
+                        self._record_error(key, recorded.error, started)
+                    else:
+                        self.archive.record(HTTP, key, {
+                            "status": recorded.status,
+                            "headers": [[k, v] for k, v in recorded.headers.items()],
+                            "body": base64.b64encode(bytes(recorded.body)).decode("ascii")
+                        }, time.monotonic() - started)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            # Failures before any response arrived; body errors were recorded above
+            if recorded is None:
+                self._record_error(key, e, started)
+            raise
+
+async def search_through(archive: Optional[Archive], engine: str, query: str, search) -> List[Dict[str, Any]]:
+    """
+    Run one engine search through an archive.
+
+    search is a coroutine function returning result dictionaries. When
+    recording its results are stored; when replaying they come from the
+    archive and search is never called.
+    """
+    if archive is None:
+        return await search()
+    key = f"{engine} {query}"
+    if archive.replaying:
+        entry = await archive.replay(SEARCH, key)
+        return entry.get("results", [])
+    started = time.monotonic()
+    results = await search()
+    archive.record(SEARCH, key, {"results": results}, time.monotonic() - started)
+    return results
@@ -90,7 +90,10 @@ class ResearchResult:
         md.append(f"- **Breadth**: {stats.get('breadth', 'Not specified')}")
         md.append(f"- **Time Taken**: {elapsed_time}")
         md.append(f"- **Subqueries Explored**: {subqueries_count}")
-        md.append(f"- **Sources Analyzed**: {sources_count}\n")
+        md.append(f"- **Sources Analyzed**: {sources_count}")
+        if stats.get("peak_memory_mb") is not None:
+            md.append(f"- **Peak Memory**: {stats['peak_memory_mb']} MB")
+        md.append("")
         
         # Add chain of thought if requested
         if include_chain_of_thought and self.chain_of_thought:
@@ -0,0 +1,300 @@
+"""Shared Playwright browser pool for dynamic page rendering."""
+from typing import Dict, List, Optional, Any
+from contextlib import asynccontextmanager
+import asyncio
+import time
+import weakref
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from ..replay import Archive, ReplayMiss, RENDER, TIMEOUT_ERROR, CLIENT_ERROR
+
+DEFAULT_LAUNCH_ARGS = ["--disable-dev-shm-usage", "--no-sandbox", "--disable-setuid-sandbox"]
+
+class _PooledPage:
+    """A browser context and its page, checked out and returned as a unit."""
+    def __init__(self, browser: Browser, context: BrowserContext, page: Page):
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.crashed = False
+        page.on("crash", self._mark_crashed)
+
+    def _mark_crashed(self, *args):
+        self.crashed = True
+
+    def is_healthy(self) -> bool:
+        """Check that the page and its browser can still be used."""
+        return not self.crashed and not self.page.is_closed() and self.browser.is_connected()
+
+class _ReplayedPageResponse:
+    """Status and headers of a replayed navigation."""
+    def __init__(self, status: Optional[int], headers: Dict[str, str]):
+        self.status = status
+        self.headers = headers
+
+class ReplayPage:
+    """
+    Stands in for a browser page when replaying an archive.
+
+    Navigations are served from recorded renders, so no browser is launched.
+    Request routing and selector waits do nothing, and readiness checks
+    report what was seen while recording.
+    """
+    def __init__(self, archive: Archive):
+        self.archive = archive
+        self._entry: Dict[str, Any] = {}
+        self._timeout: Optional[float] = None
+
+    def set_default_timeout(self, timeout: float):
+        self._timeout = timeout / 1000
+
+    async def route(self, *args, **kwargs):
+        pass
+
+    async def unroute(self, *args, **kwargs):
+        pass
+
+    async def goto(self, url: str, timeout: Optional[float] = None, **kwargs) -> _ReplayedPageResponse:
+        try:
+            self._entry = await self.archive.replay(RENDER, url, timeout / 1000 if timeout else self._timeout)
+        except asyncio.TimeoutError:
+            raise PlaywrightTimeoutError(f"Timeout navigating to {url}")
+        except ReplayMiss as e:
+            raise RuntimeError(str(e)) from e
+        if self._entry.get("error") == TIMEOUT_ERROR:
+            raise PlaywrightTimeoutError(f"Timeout navigating to {url}")
+        if self._entry.get("error"):
+            raise RuntimeError(self._entry.get("message", "replayed error"))
+        return _ReplayedPageResponse(self._entry.get("status"), self._entry.get("headers", {}))
+
+    async def evaluate(self, script: str, arg: Any = None) -> Any:
+        return self._entry.get("readiness")
+
+    async def wait_for_selector(self, *args, **kwargs):
+        pass
+
+    async def content(self) -> str:
+        return self._entry.get("body", "")
+
+class RecordingPage:
+    """
+    Wraps a pooled browser page and records each render into an archive.
+
+    A render is recorded when its content is read, together with the
+    navigation's status and headers and the last evaluate() result, which is
+    the readiness report.
+    """
+    def __init__(self, page: Page, archive: Archive):
+        self._page = page
+        self._archive = archive
+        self._url = None
+        self._started = 0.0
+        self._response = None
+        self._readiness = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._page, name)
+
+    async def goto(self, url: str, **kwargs):
+        self._url = url
+        self._started = time.monotonic()
+        self._readiness = None
+        try:
+            self._response = await self._page.goto(url, **kwargs)
+        except PlaywrightTimeoutError:
+            self._archive.record(RENDER, url, {"error": TIMEOUT_ERROR}, time.monotonic() - self._started)
+            raise
+        except Exception as e:
+            self._archive.record(RENDER, url, {"error": CLIENT_ERROR, "message": str(e)}, time.monotonic() - self._started)
+            raise
+        return self._response
+
+    async def evaluate(self, *args, **kwargs) -> Any:
+        self._readiness = await self._page.evaluate(*args, **kwargs)
+        return self._readiness
+
+    async def content(self) -> str:
+        html = await self._page.content()
+        if self._url is not None:
+            self._archive.record(RENDER, self._url, {
+                "status": self._response.status if self._response else None,
+                "headers": dict(self._response.headers) if self._response else {},
+                "readiness": self._readiness,
+                "body": html
+            }, time.monotonic() - self._started)
+            self._url = None
+        return html
+
+class _LoopState:
+    """Browsers and idle pages belonging to a single event loop."""
+    def __init__(self, max_pages: int):
+        self.playwright = None
+        self.browsers: List[Browser] = []
+        self.idle: List[_PooledPage] = []
+        self.slots = asyncio.Semaphore(max_pages)
+        self.lock = asyncio.Lock()
+        self.next_browser = 0
+
+class BrowserPool:
+    """
+    Long-lived Chromium browsers with a bounded pool of reusable contexts and pages.
+
+    Browsers are launched once and kept alive, so a dynamic fetch only pays for
+    navigation. Pages are health-checked on checkout, crashed pages and
+    disconnected browsers are replaced, and each context is recycled after
+    max_uses_per_page navigations to keep memory bounded. Playwright objects are
+    bound to the loop that created them, so state is kept per running loop.
+    With an archive, renders are recorded, or replayed without a browser.
+    """
+    def __init__(
+        self,
+        max_browsers: int = 1,
+        max_pages: int = 4,
+        max_uses_per_page: int = 20,
+        proxy: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        launch_args: Optional[List[str]] = None,
+        archive: Optional[Archive] = None
+    ):
+        self.max_browsers = max(1, max_browsers)
+        self.max_pages = max(1, max_pages)
+        self.max_uses_per_page = max_uses_per_page
+        self.proxy = proxy
+        self.user_agent = user_agent
+        self.launch_args = launch_args or DEFAULT_LAUNCH_ARGS
+        self.archive = archive
+        self._states = weakref.WeakKeyDictionary()
+
+    def _get_state(self) -> _LoopState:
+        """Get the pool state for the running event loop."""
+        loop = asyncio.get_running_loop()
+
+        # Browsers started on a loop that has since closed cannot be reused
+        for stale_loop in [l for l in self._states.keys() if l.is_closed()]:
+            self._states.pop(stale_loop, None)
+
+        state = self._states.get(loop)
+        if state is None:
+            state = _LoopState(self.max_pages)
+            self._states[loop] = state
+        return state
+
+    async def _get_browser(self, state: _LoopState) -> Browser:
+        """Return a connected browser, launching or restarting browsers as needed."""
+        async with state.lock:
+            if state.playwright is None:
+                state.playwright = await async_playwright().start()
+
+            # Restart any browser that crashed or was disconnected
+            state.browsers = [b for b in state.browsers if b.is_connected()]
+            while len(state.browsers) < self.max_browsers:
+                proxy_options = {"server": self.proxy} if self.proxy and self.proxy.strip() else None
+                browser = await state.playwright.chromium.launch(
+                    proxy=proxy_options,
+                    headless=True,
+                    args=self.launch_args
+                )
+                state.browsers.append(browser)
+
+            browser = state.browsers[state.next_browser % len(state.browsers)]
+            state.next_browser += 1
+            return browser
+
+    async def _new_page(self, state: _LoopState) -> _PooledPage:
+        """Open a fresh context and page on one of the pooled browsers."""
+        browser = await self._get_browser(state)
+        context = await browser.new_context(
+            user_agent=self.user_agent,
+            viewport={"width": 1280, "height": 800},
+            accept_downloads=False
+        )
+        page = await context.new_page()
+        return _PooledPage(browser, context, page)
+
+    async def _discard(self, pooled: _PooledPage):
+        """Close a pooled context, ignoring errors from dead browsers."""
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def _checkout(self, state: _LoopState) -> _PooledPage:
+        """Take a healthy idle page from the pool or create a new one."""
+        while state.idle:
+            pooled = state.idle.pop()
+            if pooled.is_healthy():
+                return pooled
+            await self._discard(pooled)
+        return await self._new_page(state)
+
+    async def _checkin(self, state: _LoopState, pooled: _PooledPage):
+        """Reset a page and return it to the pool, or discard it if it is worn out."""
+        pooled.uses += 1
+        if not pooled.is_healthy() or pooled.uses >= self.max_uses_per_page:
+            await self._discard(pooled)
+            return
+
+        try:
+            await pooled.page.goto("about:blank")
+            await pooled.context.clear_cookies()
+        except Exception:
+            await self._discard(pooled)
+            return
+
+        state.idle.append(pooled)
+
+    @asynccontextmanager
+    async def page(self):
+        """Check out a pooled page for the duration of the block."""
+        state = self._get_state()
+        await state.slots.acquire()
+        try:
+            if self.archive is not None and self.archive.replaying:
+                yield ReplayPage(self.archive)
+                return
+            pooled = await self._checkout(state)
+            try:
+                yield RecordingPage(pooled.page, self.archive) if self.archive is not None else pooled.page
+            finally:
+                await self._checkin(state, pooled)
+        finally:
+            state.slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report pool occupancy for the running event loop."""
+        state = self._states.get(asyncio.get_running_loop())
+        if state is None:
+            return {"browsers": 0, "idle_pages": 0}
+        return {
+            "browsers": len([b for b in state.browsers if b.is_connected()]),
+            "idle_pages": len(state.idle)
+        }
+
+    async def close(self):
+        """Close all pages and browsers started on the running event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        state = self._states.pop(loop, None)
+        if state is None:
+            return
+
+        for pooled in state.idle:
+            await self._discard(pooled)
+        state.idle.clear()
+
+        for browser in state.browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        state.browsers.clear()
+
+        if state.playwright is not None:
+            try:
+                await state.playwright.stop()
+            except Exception:
+                pass
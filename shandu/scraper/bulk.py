@@ -0,0 +1,178 @@
+"""Bulk scraping of URL lists with resumable checkpoints and run statistics."""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from dataclasses import dataclass, field
+import asyncio
+import os
+import time
+from ..urls import canonicalize
+from .scraper import WebScraper, ScrapedContent
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """Read URLs one per line, skipping blanks, # comments and canonical duplicates."""
+    urls = []
+    seen = set()
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith("#"):
+            continue
+        canonical_url = canonicalize(url)
+        if canonical_url in seen:
+            continue
+        seen.add(canonical_url)
+        urls.append(url)
+    return urls
+
+class Checkpoint:
+    """
+    Append-only record of URLs already handled by a bulk run.
+
+    Only URLs that were fetched, or that failed in a way another attempt
+    would repeat, belong in it; timeouts and other transient failures are
+    left out so a resumed run tries them again.
+
+    Each finished URL is written as one line and flushed, so an interrupted
+    run loses at most the pages that were in flight.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.done
+
+    def add(self, url: str):
+        """Mark a URL as handled."""
+        self.done.add(url)
+        self._file.write(url + "\n")
+        self._file.flush()
+
+    def close(self):
+        """Close the checkpoint file."""
+        self._file.close()
+
+@dataclass
+class BulkStats:
+    """Throughput and latency of a bulk run."""
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    text_chars: int = 0
+    latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    def record(self, result: ScrapedContent, latency: float):
+        """Count a finished page."""
+        self.latencies.append(latency)
+        if result.is_successful():
+            self.succeeded += 1
+            self.text_chars += len(result.text)
+        else:
+            self.failed += 1
+            # Group errors by their message, without the URL-specific tail
+            kind = (result.error or "Unknown error").split(":")[0][:80]
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def pages_per_second(self) -> float:
+        done = self.succeeded + self.failed
+        return done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Page latency in seconds below which the given share of pages finished."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format."""
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "text_chars": self.text_chars,
+            "elapsed": round(self.elapsed, 3),
+            "pages_per_second": round(self.pages_per_second, 3),
+            "p50_latency": self.latency_percentile(0.5),
+            "p95_latency": self.latency_percentile(0.95),
+            "max_latency": max(self.latencies) if self.latencies else None,
+            "errors": dict(self.errors)
+        }
+
+async def bulk_scrape(
+    scraper: WebScraper,
+    urls: List[str],
+    on_result: Optional[Callable[[ScrapedContent], None]] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    dynamic: Optional[bool] = None,
+    force_refresh: bool = False,
+    window: Optional[int] = None
+) -> BulkStats:
+    """
+    Scrape a list of URLs, handing each result to on_result as it finishes.
+
+    URLs already in the checkpoint are skipped. Fetched URLs and permanent
+    failures are added to it, while transient failures are not, so they are
+    retried when the run is resumed. At most window pages are in flight or waiting for a scheduler slot
+    at once, so memory stays flat however long the list is; the scraper's
+    scheduler still decides how many actually run concurrently.
+
+    Returns:
+        BulkStats for the run
+    """
+    stats = BulkStats()
+    todo = [url for url in urls if checkpoint is None or url not in checkpoint]
+    stats.skipped = len(urls) - len(todo)
+    stats.total = len(todo)
+    window = window or max(1, scraper.scheduler.max_concurrent) * 4
+
+    async def timed_scrape(url: str):
+        started = time.monotonic()
+        try:
+            result = await scraper.scrape_url(url, dynamic=dynamic, force_refresh=force_refresh)
+        except Exception as e:
+            result = ScrapedContent.from_error(url, str(e))
+        return url, result, time.monotonic() - started
+
+    remaining = iter(todo)
+    pending = set()
+    try:
+        while True:
+            for url in remaining:
+                pending.add(asyncio.ensure_future(timed_scrape(url)))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                url, result, latency = task.result()
+                stats.record(result, latency)
+                if on_result is not None:
+                    on_result(result)
+                if checkpoint is not None and (result.error is None or result.permanent):
+                    checkpoint.add(url)
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        stats.finished = time.monotonic()
+
+    return stats
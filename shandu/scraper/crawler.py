@@ -0,0 +1,156 @@
+"""Focused crawling: follow in-page links in order of predicted relevance."""
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse, unquote
+import heapq
+import re
+import time
+from ..urls import canonicalize
+from .scraper import WebScraper, ScrapedContent
+
+# Words too common to say anything about relevance
+STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her", "was", "one",
+    "our", "out", "has", "his", "how", "its", "may", "new", "now", "old", "see", "two", "who", "did",
+    "get", "let", "say", "she", "too", "use", "what", "when", "where", "which", "while", "with",
+    "from", "that", "this", "into", "than", "then", "them", "they", "about", "between", "does",
+    "have", "more", "most", "over", "some", "such", "their", "there", "these", "those", "will", "would",
+    "www", "http", "https", "html", "htm", "php", "aspx", "index"
+}
+
+# Links to files that have no text worth extracting
+SKIPPED_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".mp3", ".mp4", ".avi", ".mov",
+    ".zip", ".gz", ".tar", ".exe", ".dmg", ".css", ".js", ".woff", ".woff2", ".ttf"
+)
+
+_TERMS = re.compile(r"[a-z0-9]+")
+
+def terms(text: str) -> Set[str]:
+    """Lower-cased words of a text, without stopwords and very short words."""
+    return {t for t in _TERMS.findall(text.lower()) if len(t) > 2 and t not in STOPWORDS}
+
+class FocusedCrawler:
+    """
+    Bounded best-first crawl outward from pages already scraped.
+
+    Links are kept in a priority-queue frontier scored by how many of the
+    query's terms appear in their anchor text and URL, decayed with each hop.
+    The best links are fetched in batches through the scraper, so its
+    scheduler, robots.txt checks and circuit breaker still apply, and each
+    fetched page's links join the frontier. Crawling stops when max_pages
+    pages were fetched, the frontier has no link scoring at least min_score,
+    or the deadline passes. URLs are deduplicated on their canonical form and
+    at most max_pages_per_domain pages are fetched from any one host.
+    """
+    def __init__(
+        self,
+        scraper: WebScraper,
+        max_pages: int = 5,
+        max_pages_per_domain: int = 2,
+        max_depth: int = 1,
+        min_score: float = 0.2,
+        anchor_weight: float = 0.6,
+        depth_decay: float = 0.7,
+        batch_size: Optional[int] = None,
+        deadline: Optional[float] = None
+    ):
+        self.scraper = scraper
+        self.max_pages = max_pages
+        self.max_pages_per_domain = max_pages_per_domain
+        self.max_depth = max_depth
+        self.min_score = min_score
+        self.anchor_weight = anchor_weight
+        self.depth_decay = depth_decay
+        self.batch_size = batch_size
+        self.deadline = deadline
+
+    def score(self, query_terms: Set[str], url: str, anchor: str = "", depth: int = 1) -> float:
+        """Predict how relevant a link is to the query from its anchor text and URL."""
+        if not query_terms:
+            return 0.0
+        parsed = urlparse(url)
+        url_terms = terms(unquote(parsed.path + " " + parsed.query))
+        anchor_score = len(query_terms & terms(anchor)) / len(query_terms)
+        url_score = len(query_terms & url_terms) / len(query_terms)
+        combined = self.anchor_weight * anchor_score + (1 - self.anchor_weight) * url_score
+        return combined * self.depth_decay ** (depth - 1)
+
+    @staticmethod
+    def _crawlable(url: str) -> bool:
+        path = urlparse(url).path.lower()
+        return url.startswith(("http://", "https://")) and not path.endswith(SKIPPED_EXTENSIONS)
+
+    async def crawl(
+        self,
+        query: str,
+        seeds: Iterable[ScrapedContent],
+        seen_urls: Optional[Set[str]] = None
+    ) -> AsyncIterator[ScrapedContent]:
+        """
+        Crawl from the links of seed pages, yielding each fetched page as it arrives.
+
+        Args:
+            query: What the crawl should find more about
+            seeds: Already scraped pages whose links start the frontier
+            seen_urls: Canonical URLs not to fetch; crawled pages are added to it
+
+        Yields:
+            Successfully scraped pages
+        """
+        query_terms = terms(query)
+        seen = seen_urls if seen_urls is not None else set()
+        frontier: List[tuple] = []
+        order = 0
+        domain_pages: Dict[str, int] = {}
+        fetched = 0
+        give_up_at = time.monotonic() + self.deadline if self.deadline is not None else None
+
+        def enqueue(page: ScrapedContent, depth: int):
+            nonlocal order
+            seen.add(canonicalize(page.url))
+            if depth > self.max_depth:
+                return
+            for link in page.links:
+                if not self._crawlable(link) or canonicalize(link) in seen:
+                    continue
+                link_score = self.score(query_terms, link, page.anchors.get(link, ""), depth)
+                if link_score >= self.min_score:
+                    order += 1
+                    heapq.heappush(frontier, (-link_score, order, link, depth))
+
+        for seed in seeds:
+            if seed.is_successful():
+                enqueue(seed, 1)
+
+        batch_size = self.batch_size or max(1, self.scraper.scheduler.max_concurrent)
+        while frontier and fetched < self.max_pages:
+            remaining_time = None
+            if give_up_at is not None:
+                remaining_time = give_up_at - time.monotonic()
+                if remaining_time <= 0:
+                    break
+
+            # Take the best links, skipping ones already seen or over their host's budget
+            batch, depths = [], {}
+            while frontier and len(batch) < min(batch_size, self.max_pages - fetched):
+                _, _, link, depth = heapq.heappop(frontier)
+                canonical_url = canonicalize(link)
+                domain = self.scraper.scheduler.domain_of(link)
+                if canonical_url in seen or domain_pages.get(domain, 0) >= self.max_pages_per_domain:
+                    continue
+                # Don't spend crawl budget on hosts that are refusing us
+                if not self.scraper.health.is_closed(domain):
+                    continue
+                seen.add(canonical_url)
+                domain_pages[domain] = domain_pages.get(domain, 0) + 1
+                batch.append(link)
+                depths[link] = depth
+            if not batch:
+                break
+
+            fetched += len(batch)
+            async for page in self.scraper.scrape_iter(batch, deadline=remaining_time):
+                if not page.is_successful():
+                    continue
+                yield page
+                enqueue(page, depths.get(page.url, self.max_depth) + 1)
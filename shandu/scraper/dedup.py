@@ -0,0 +1,137 @@
+"""Near-duplicate page detection with SimHash fingerprints."""
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import re
+from ..cache import CacheStore
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 4
+
+# Texts with fewer shingles than this are too short to fingerprint reliably
+MIN_SHINGLES = 20
+
+_WORDS = re.compile(r"\w+")
+
+def fingerprint(text: str, shingle_size: int = SHINGLE_SIZE) -> Optional[int]:
+    """
+    Compute a 64-bit SimHash of a text from its word shingles.
+
+    Texts that share most of their shingles get fingerprints a few bits apart.
+    Returns None for texts too short to compare.
+    """
+    words = _WORDS.findall(text.lower())
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    # Count set bits per position across all shingle hashes, column-wise
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for s in shingles
+    ]
+    half = len(bits) / 2
+    value = 0
+    for column in zip(*bits):
+        value = (value << 1) | (column.count("1") > half)
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count("1")
+
+class NearDuplicateIndex:
+    """
+    Finds fingerprints within max_distance bits of one already indexed.
+
+    Fingerprints are split into max_distance + 1 bands; any two within the
+    distance share at least one band exactly, so a lookup only compares
+    against the few fingerprints in matching band buckets. With a path, the
+    buckets are also kept in an on-disk store so duplicates are recognized
+    across runs.
+    """
+    def __init__(self, max_distance: int = 3, path: Optional[str] = None, ttl: int = 30 * 86400):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._buckets: Dict[str, List[Tuple[int, str]]] = {}
+        self.store = CacheStore(path, ttl=ttl, memory_items=0) if path else None
+
+    def _band_keys(self, value: int) -> List[str]:
+        width = FINGERPRINT_BITS // self.bands
+        keys = []
+        for band in range(self.bands):
+            bits = FINGERPRINT_BITS - width * band if band == self.bands - 1 else width
+            keys.append(f"{band}:{(value >> (width * band)) & ((1 << bits) - 1)}")
+        return keys
+
+    def _bucket(self, key: str) -> List[Tuple[int, str]]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = []
+            if self.store is not None:
+                record = self.store.get(key)
+                if record:
+                    bucket = [tuple(entry) for entry in record["entries"]]
+            self._buckets[key] = bucket
+        return bucket
+
+    def find(self, value: int) -> Optional[str]:
+        """Get the key of an indexed near-duplicate of a fingerprint."""
+        for band_key in self._band_keys(value):
+            for other, key in self._bucket(band_key):
+                if hamming_distance(value, other) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, value: int, key: str):
+        """Index a fingerprint under a key such as the page URL."""
+        for band_key in self._band_keys(value):
+            bucket = self._bucket(band_key)
+            if (value, key) in bucket:
+                continue
+            bucket.append((value, key))
+            if self.store is not None:
+                self.store.set(band_key, {"entries": bucket})
+
+    def collapse(
+        self,
+        items: List["ScrapedContent"],
+        representatives: Optional[Dict[str, "ScrapedContent"]] = None
+    ) -> List["ScrapedContent"]:
+        """
+        Keep one representative per group of near-duplicate pages.
+
+        The first page of each group is kept, in input order, and the URLs of
+        the pages folded into it are listed in its metadata["duplicate_urls"].
+        When a group's only earlier page was indexed before this batch, e.g. in
+        a previous run, the first copy in the batch becomes its representative.
+        To collapse a batch that arrives a page at a time, pass the same
+        representatives dict to every call.
+        """
+        if representatives is None:
+            representatives = {}
+        unique = []
+        for item in items:
+            value = item.fingerprint if item.fingerprint is not None else fingerprint(item.text)
+            if value is None:
+                unique.append(item)
+                continue
+
+            match = self.find(value)
+            if match is None:
+                self.add(value, item.url)
+                match = item.url
+            representative = representatives.get(match)
+            if representative is None or representative.url == item.url:
+                # The same page seen again, e.g. for another query, is not a duplicate
+                representatives[match] = item
+                unique.append(item)
+            else:
+                # A new dict, since the page's metadata may be shared with a cached copy
+                duplicate_urls = representative.metadata.get("duplicate_urls", []) + [item.url]
+                representative.metadata = {**representative.metadata, "duplicate_urls": duplicate_urls}
+        return unique
+
+    def close(self):
+        """Close the on-disk store, if any."""
+        if self.store is not None:
+            self.store.close()
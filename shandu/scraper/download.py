@@ -0,0 +1,146 @@
+"""Streaming, size-capped reading of HTTP response bodies."""
+from typing import Optional, Tuple
+import codecs
+import re
+import aiohttp
+
+# Content types worth extracting text from; anything else is rejected unread
+TEXT_CONTENT_TYPES = (
+    "text/html", "application/xhtml+xml", "text/plain",
+    "text/xml", "application/xml", "application/json"
+)
+
+# Magic numbers of binaries that servers sometimes label as HTML
+BINARY_SIGNATURES = (b"%PDF", b"\x89PNG", b"GIF8", b"\xff\xd8\xff", b"PK\x03\x04", b"\x1f\x8b", b"\x00\x00\x01\x00")
+
+BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:\-]+)""", re.IGNORECASE)
+
+# Bytes inspected before settling on a charset, as in the HTML spec's prescan
+SNIFF_BYTES = 1024
+
+class DownloadRejected(Exception):
+    """Raised when a response is not worth downloading."""
+    def __init__(self, reason: str, status_code: int):
+        super().__init__(reason)
+        self.status_code = status_code
+
+def is_textual(content_type: Optional[str]) -> bool:
+    """Check whether a Content-Type can hold extractable text."""
+    if not content_type:
+        return True
+    mime = content_type.split(";")[0].strip().lower()
+    return mime in TEXT_CONTENT_TYPES or mime.endswith(("+xml", "+json"))
+
+def _valid_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip().strip("\"'")).name
+    except LookupError:
+        return None
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """Get the charset parameter of a Content-Type header."""
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return _valid_codec(value)
+    return None
+
+def sniff_charset(head: bytes) -> Optional[str]:
+    """Detect a charset from a byte order mark or a <meta> declaration."""
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return name
+    match = META_CHARSET_PATTERN.search(head)
+    return _valid_codec(match.group(1).decode("ascii", "ignore")) if match else None
+
+def looks_binary(head: bytes) -> bool:
+    """Check the first bytes of a body for binary signatures or NUL bytes."""
+    if head.startswith(BINARY_SIGNATURES):
+        return True
+    return b"\x00" in head[:SNIFF_BYTES] and not head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE))
+
+def truncate_at_tag_boundary(text: str) -> str:
+    """Cut text after the last complete tag so no tag is left half open."""
+    end = text.rfind(">")
+    return text[:end + 1] if end >= 0 else text
+
+def check_headers(headers, max_content_length: int):
+    """Reject a response from its headers before reading the body."""
+    content_type = headers.get("Content-Type")
+    if not is_textual(content_type):
+        raise DownloadRejected(f"unsupported content type {content_type}", 415)
+
+    content_length = headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_content_length:
+        raise DownloadRejected(f"Content-Length {content_length} exceeds {max_content_length} bytes", 413)
+
+def _decoder_for(head: bytes, charset: Optional[str]):
+    """Pick an incremental decoder once the first bytes of the body are known."""
+    charset = charset or sniff_charset(head)
+    if charset is None:
+        try:
+            # Ignore a multi-byte sequence split at the end of the sniffed bytes
+            codecs.getincrementaldecoder("utf-8")().decode(head)
+            charset = "utf-8"
+        except UnicodeDecodeError:
+            charset = "windows-1252"
+    return codecs.getincrementaldecoder(charset)(errors="replace")
+
+async def read_text(
+    response: aiohttp.ClientResponse,
+    max_bytes: int,
+    chunk_size: int = 64 * 1024
+) -> Tuple[str, bool]:
+    """
+    Stream a response body into text, reading at most max_bytes.
+
+    The charset comes from the Content-Type header, a byte order mark or a
+    <meta> declaration in the first bytes, then falls back to UTF-8 or
+    Windows-1252. Chunks are decoded as they arrive, and a body cut at the cap
+    is trimmed back to the last complete tag.
+
+    Returns:
+        Tuple of (text, truncated)
+    """
+    charset = charset_from_content_type(response.headers.get("Content-Type"))
+    decoder = None
+    head = b""
+    parts = []
+    received = 0
+    truncated = False
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if received + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - received]
+            truncated = True
+        received += len(chunk)
+
+        if decoder is None:
+            head += chunk
+            if len(head) < SNIFF_BYTES and not truncated:
+                continue
+            if looks_binary(head):
+                raise DownloadRejected("binary content", 415)
+            decoder = _decoder_for(head, charset)
+            chunk, head = head, b""
+
+        parts.append(decoder.decode(chunk))
+        if truncated:
+            break
+
+    if decoder is None:
+        # Body shorter than the sniffing window
+        if looks_binary(head):
+            raise DownloadRejected("binary content", 415)
+        decoder = _decoder_for(head, charset)
+        parts.append(decoder.decode(head))
+    parts.append(decoder.decode(b"", final=True))
+
+    text = "".join(parts)
+    if truncated:
+        text = truncate_at_tag_boundary(text)
+    return text, truncated
@@ -0,0 +1,404 @@
+"""HTML extraction functions and the worker pool that runs them off the event loop."""
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import atexit
+import json
+import multiprocessing
+import os
+import threading
+import weakref
+from urllib.parse import urljoin, urldefrag
+from bs4 import BeautifulSoup
+import trafilatura
+from .dedup import fingerprint
+
+# Pools with running workers, shut down by one exit hook instead of one hook per pool
+_live_pools = weakref.WeakSet()
+
+@atexit.register
+def _shutdown_pools():
+    for pool in list(_live_pools):
+        pool.shutdown()
+
+class ExtractionPool:
+    """
+    Runs CPU-bound HTML extraction in a pool of worker processes.
+
+    The pool is sized to the number of cores and started lazily. At most
+    max_pending pages are queued per event loop, so a burst of large pages
+    applies backpressure instead of piling up in memory. A page that takes
+    longer than timeout seconds gets the default result and its worker pool is
+    restarted, since a stuck worker cannot be interrupted otherwise; pages that
+    were in flight on the killed workers are submitted again to the new pool.
+    A page whose extraction raises also gets the default result. With
+    inline=True extraction runs directly in the caller, which is what tests use.
+
+    Workers are started from a fork server (or spawned where there is none)
+    rather than forked from this process, since by then it runs threads whose
+    locks a forked child could inherit held. The pool is shut down at exit.
+    """
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = 30.0,
+        inline: bool = False
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 2
+        self.timeout = timeout
+        self.inline = inline
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = weakref.WeakKeyDictionary()
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        """Get the queueing semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_pending)
+            self._slots[loop] = slots
+        return slots
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("forkserver")
+                    # Workers forked from the server start with the parsers already imported
+                    context.set_forkserver_preload([__name__])
+                else:
+                    context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                _live_pools.add(self)
+            return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        """
+        Kill the workers of a stuck or broken executor so the next call starts fresh.
+
+        Its other pending futures fail with BrokenProcessPool rather than being
+        cancelled, so their callers can tell a restart from their own cancellation.
+        """
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        executor.shutdown(wait=False)
+
+    async def _run_in_thread(self, fn: Callable[..., Any], *args: Any, default: Any = None) -> Any:
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            print(f"Extraction failed: {e}")
+            return default
+
+    async def run(self, fn: Callable[..., Any], *args: Any, default: Any = None) -> Any:
+        """Run a module-level extraction function and return its result, or default on timeout or error."""
+        if self.inline:
+            return fn(*args)
+
+        async with self._get_slots():
+            # A second attempt covers workers killed while restarting for another page's timeout
+            for attempt in range(2):
+                executor = None
+                try:
+                    executor = self._get_executor()
+                    # Submitting starts any missing workers, which waits for the fork server
+                    future = asyncio.wrap_future(await asyncio.to_thread(executor.submit, fn, *args))
+                except (BrokenProcessPool, OSError, RuntimeError) as e:
+                    if attempt == 0 and executor is not None and executor is not self._executor:
+                        # Shut down by a concurrent restart before the page was submitted
+                        continue
+                    # No usable worker processes: keep the loop responsive with a thread
+                    print(f"Extraction pool unavailable, using a thread: {e}")
+                    return await self._run_in_thread(fn, *args, default=default)
+
+                try:
+                    return await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    print(f"Extraction timed out after {self.timeout} seconds")
+                    self._restart(executor)
+                    return default
+                except BrokenProcessPool:
+                    self._restart(executor)
+                except Exception as e:
+                    print(f"Extraction failed: {e}")
+                    return default
+            return await self._run_in_thread(fn, *args, default=default)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        _live_pools.discard(self)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+@dataclass
+class ExtractionResult:
+    """Everything extracted from a page in its single parse."""
+    title: str
+    text: str
+    metadata: Dict[str, Any]
+    links: List[str] = field(default_factory=list)
+    fingerprint: Optional[int] = None
+    anchors: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format."""
+        return asdict(self)
+
+# Metadata fields copied from trafilatura's extraction
+METADATA_FIELDS = ("description", "author", "date", "categories", "tags", "sitename", "language")
+
+# Elements dropped before the BeautifulSoup fallback looks for the main content
+BOILERPLATE_SELECTORS = [
+    'nav', 'header', 'footer', 'aside',
+    '.sidebar', '.navigation', '.menu', '.ad', '.advertisement',
+    '.cookie-notice', '.popup', '#cookie-banner', '.banner',
+    'script', 'style', 'iframe', 'noscript'
+]
+
+MAIN_CONTENT_SELECTORS = [
+    'article', 'main', '.content', '.main-content', '#content', '#main',
+    '[role="main"]', '.post', '.entry', '.article-content'
+]
+
+def _default_title(url: str, fallback: str = "Unknown Title") -> str:
+    return url.split("/")[-1] or fallback
+
+def failed_extraction(url: str, text: str = "") -> ExtractionResult:
+    """Result used when a page could not be extracted in time."""
+    return ExtractionResult(
+        title=_default_title(url),
+        text=text,
+        metadata={"url": url, "extraction_failed": True}
+    )
+
+def _absolute_links(hrefs: List[str], url: str) -> List[str]:
+    """Resolve hrefs against the page URL, keeping unique http(s) links in page order."""
+    links, seen = [], set()
+    for href in hrefs:
+        href = (href or "").strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:", "tel:")):
+            continue
+        link = urldefrag(urljoin(url, href))[0]
+        if link.startswith(("http://", "https://")) and link not in seen:
+            seen.add(link)
+            links.append(link)
+    return links
+
+# Longest anchor text kept per link
+MAX_ANCHOR_CHARS = 200
+
+def _link_anchors(pairs: List[tuple], url: str) -> tuple:
+    """
+    Resolve (href, anchor text) pairs into links and their anchor texts.
+
+    Returns:
+        Tuple of (links in page order, dict of link -> first non-empty anchor text)
+    """
+    links, anchors, seen = [], {}, set()
+    for href, text in pairs:
+        resolved = _absolute_links([href], url)
+        if not resolved:
+            continue
+        link = resolved[0]
+        if link not in seen:
+            seen.add(link)
+            links.append(link)
+        if link not in anchors:
+            text = " ".join((text or "").split())[:MAX_ANCHOR_CHARS]
+            if text:
+                anchors[link] = text
+    return links, anchors
+
+def _canonical_link(links: List[tuple], url: str) -> Optional[str]:
+    """Get the absolute target of the first <link rel=canonical> from (rel, href) pairs."""
+    for rel, href in links:
+        if rel and href and "canonical" in rel.lower().split():
+            resolved = _absolute_links([href], url)
+            if resolved:
+                return resolved[0]
+    return None
+
+def extract_content(html: str, url: str, content_type: str = "text/html") -> ExtractionResult:
+    """
+    Extract the title, main text, metadata and links of a page.
+
+    HTML is parsed once with lxml; the same tree feeds trafilatura and the link
+    collection. BeautifulSoup is only used when trafilatura finds no main text.
+    The main text's SimHash fingerprint is computed here too, off the event loop.
+    """
+    result = _extract(html, url, content_type)
+    result.fingerprint = fingerprint(result.text)
+    return result
+
+def _extract(html: str, url: str, content_type: str) -> ExtractionResult:
+    if not html:
+        return ExtractionResult(title="No content", text="", metadata={"url": url})
+    
+    if content_type and "json" in content_type.lower():
+        try:
+            json_data = json.loads(html)
+            return ExtractionResult(
+                title=_default_title(url, "JSON Content"),
+                text=json.dumps(json_data, indent=2),
+                metadata={"url": url, "content_type": "json"}
+            )
+        except json.JSONDecodeError:
+            pass
+            
+    elif content_type and "xml" in content_type.lower():
+        try:
+            soup = BeautifulSoup(html, 'xml')
+            title = soup.find('title')
+            return ExtractionResult(
+                title=title.get_text(strip=True) if title else _default_title(url, "XML Content"),
+                text=soup.get_text(separator="\n\n", strip=True),
+                metadata={"url": url, "content_type": "xml"}
+            )
+        except Exception:
+            pass
+    
+    try:
+        tree = trafilatura.load_html(html)
+        if tree is not None:
+            # Read these before trafilatura prunes the tree
+            title = (tree.findtext(".//title") or "").strip()
+            links, anchors = _link_anchors(
+                [(a.get("href"), "".join(a.itertext())) for a in tree.iter("a")], url
+            )
+            canonical = _canonical_link(
+                [(link.get("rel"), link.get("href")) for link in tree.iter("link")], url
+            )
+            
+            extracted = trafilatura.bare_extraction(
+                tree,
+                url=url,
+                with_metadata=True,
+                include_comments=False,
+                include_tables=True,
+                include_images=False,
+                include_links=False
+            )
+            if extracted is not None and not isinstance(extracted, dict):
+                extracted = extracted.as_dict()
+            
+            text = (extracted or {}).get("text") or ""
+            if len(text.strip()) > 100:
+                metadata = {"url": url}
+                for name in METADATA_FIELDS:
+                    if extracted.get(name):
+                        metadata[name] = extracted[name]
+                if canonical:
+                    metadata["canonical_url"] = canonical
+                return ExtractionResult(
+                    title=title or extracted.get("title") or _default_title(url),
+                    text=text,
+                    metadata=metadata,
+                    links=links,
+                    anchors=anchors
+                )
+    except Exception as e:
+        print(f"Trafilatura extraction failed for {url}: {e}")
+    
+    return _extract_with_soup(html, url)
+
+def _extract_with_soup(html: str, url: str) -> ExtractionResult:
+    """Fallback extraction that strips boilerplate and reads the main content container."""
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        title = soup.title.get_text(strip=True) if soup.title else ""
+        links, anchors = _link_anchors([(a.get('href'), a.get_text(" ")) for a in soup.find_all('a')], url)
+        
+        metadata = {
+            "description": "",
+            "keywords": "",
+            "author": "",
+            "date": "",
+            "publisher": "",
+            "language": "",
+            "url": url
+        }
+        
+        for tag in soup.find_all('meta'):
+            if tag.get('name') and tag.get('content'):
+                name = tag['name'].lower()
+                if name in metadata:
+                    metadata[name] = tag['content']
+            
+            if tag.get('property') and tag.get('content'):
+                prop = tag['property'].lower()
+                if 'og:title' in prop:
+                    metadata['og_title'] = tag['content']
+                elif 'og:description' in prop:
+                    metadata['og_description'] = tag['content']
+                elif 'og:site_name' in prop:
+                    metadata['site_name'] = tag['content']
+                elif 'article:published_time' in prop:
+                    metadata['date'] = tag['content']
+        
+        date_elements = soup.select('time, .date, .published, [itemprop="datePublished"]')
+        if date_elements and not metadata.get('date'):
+            metadata['date'] = date_elements[0].get_text(strip=True)
+        
+        canonical = _canonical_link(
+            [(" ".join(link.get('rel') or []), link.get('href')) for link in soup.find_all('link')], url
+        )
+        if canonical:
+            metadata['canonical_url'] = canonical
+        
+        for selector in BOILERPLATE_SELECTORS:
+            for element in soup.select(selector):
+                element.decompose()
+        
+        main_content = None
+        for selector in MAIN_CONTENT_SELECTORS:
+            main_content = soup.select_one(selector)
+            if main_content:
+                break
+        
+        if not main_content:
+            main_content = soup.body or soup
+        
+        lines = []
+        for element in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'table']):
+            if element.name == 'table':
+                lines.append("TABLE:")
+                for row in element.find_all('tr'):
+                    row_data = [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
+                    if row_data:
+                        lines.append(" | ".join(row_data))
+                lines.append("END TABLE")
+                continue
+            
+            text = element.get_text(strip=True)
+            if text:
+                if element.name.startswith('h'):
+                    # Add heading level indicator
+                    lines.append(f"{'#' * int(element.name[1])} {text}")
+                else:
+                    lines.append(text)
+        
+        return ExtractionResult(
+            title=title or _default_title(url),
+            text="\n\n".join(lines),
+            metadata=metadata,
+            links=links,
+            anchors=anchors
+        )
+    except Exception as e:
+        print(f"BeautifulSoup extraction failed for {url}: {e}")
+        
+    return failed_extraction(url, html[:1000] + "...")
@@ -0,0 +1,318 @@
+"""Learned per-domain health with a circuit breaker for scraper requests."""
+from typing import Any, Dict, List, Optional
+from collections import deque
+from dataclasses import replace
+import random
+import threading
+import time
+from ..cache import CacheStore
+from .render import RenderProfile
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Request outcomes recorded by the scraper
+OK = "ok"
+TIMEOUT = "timeout"
+BLOCKED = "blocked"
+ERROR = "error"
+FAILURES = (TIMEOUT, BLOCKED, ERROR)
+
+# Statuses that mean the host refuses us rather than the page being missing
+BLOCK_STATUSES = (401, 403, 429, 503, 999)
+
+class DomainHealth:
+    """Rolling request statistics and circuit state for one host."""
+    def __init__(self, window: int = 50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.render_outcomes = deque(maxlen=window)
+        self.ready_times = deque(maxlen=window)
+        self.full_render_needed = 0
+        self.full_render_not_needed = 0
+        self.js_needed = 0
+        self.js_not_needed = 0
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.probe_started = 0.0
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency in seconds below which the given share of requests completed."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+    def rate(self, outcome: str) -> float:
+        """Share of recent requests with the given outcome."""
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for o in self.outcomes if o == outcome) / len(self.outcomes)
+
+    @property
+    def full_render(self) -> bool:
+        """Whether the host's pages mostly render only with nothing blocked."""
+        return self.full_render_needed > self.full_render_not_needed
+
+    @property
+    def timeout_rate(self) -> float:
+        return self.rate(TIMEOUT)
+
+    @property
+    def block_rate(self) -> float:
+        return self.rate(BLOCKED)
+
+    @property
+    def render_failure_rate(self) -> float:
+        if not self.render_outcomes:
+            return 0.0
+        return sum(1 for o in self.render_outcomes if o != OK) / len(self.render_outcomes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format."""
+        return {
+            "latencies": list(self.latencies),
+            "outcomes": list(self.outcomes),
+            "render_outcomes": list(self.render_outcomes),
+            "ready_times": list(self.ready_times),
+            "full_render_needed": self.full_render_needed,
+            "full_render_not_needed": self.full_render_not_needed,
+            "js_needed": self.js_needed,
+            "js_not_needed": self.js_not_needed,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_at": self.opened_at,
+            "cooldown": self.cooldown
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], window: int = 50) -> 'DomainHealth':
+        """Rebuild from a stored record."""
+        health = cls(window)
+        health.latencies.extend(data.get("latencies", []))
+        health.outcomes.extend(data.get("outcomes", []))
+        health.render_outcomes.extend(data.get("render_outcomes", []))
+        health.ready_times.extend(data.get("ready_times", []))
+        health.full_render_needed = data.get("full_render_needed", 1 if data.get("full_render") else 0)
+        health.full_render_not_needed = data.get("full_render_not_needed", 0)
+        health.js_needed = data.get("js_needed", 0)
+        health.js_not_needed = data.get("js_not_needed", 0)
+        # A probe in flight when the last run ended is gone; retry after the cooldown
+        health.state = OPEN if data.get("state") in (OPEN, HALF_OPEN) else CLOSED
+        health.consecutive_failures = data.get("consecutive_failures", 0)
+        health.opened_at = data.get("opened_at", 0.0)
+        health.cooldown = data.get("cooldown", 0.0)
+        return health
+
+class DomainHealthTracker:
+    """
+    Learns how each host behaves and stops sending requests to failing ones.
+
+    Every fetch records its latency and outcome (ok, timeout, blocked or
+    error), and every browser render whether it worked. After
+    failure_threshold consecutive failures a host's circuit opens and requests
+    to it are refused for a cooldown that doubles each time a half-open probe
+    fails again, up to max_cooldown. The statistics also pick the fetch
+    strategy and a per-host timeout, and are persisted between runs.
+    """
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        failure_threshold: int = 5,
+        cooldown: float = 60.0,
+        max_cooldown: float = 3600.0,
+        probe_timeout: float = 120.0,
+        window: int = 50,
+        ttl: int = 7 * 86400
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.window = window
+        self.store = CacheStore(path, ttl=ttl, memory_items=0) if path else None
+        self._domains: Dict[str, DomainHealth] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def get(self, domain: str) -> DomainHealth:
+        """Get the health record of a host, loading it from disk on first use."""
+        with self._lock:
+            health = self._domains.get(domain)
+            if health is None:
+                record = self.store.get(domain) if self.store is not None else None
+                health = DomainHealth.from_dict(record, self.window) if record else DomainHealth(self.window)
+                self._domains[domain] = health
+            return health
+
+    def allow(self, domain: str) -> bool:
+        """Check whether a request to the host may be sent now."""
+        health = self.get(domain)
+        now = time.time()
+        if health.state == CLOSED:
+            return True
+        if health.state == OPEN:
+            if now < health.opened_at + health.cooldown:
+                return False
+            health.state = HALF_OPEN
+            health.probe_started = 0.0
+        # Half-open: let a single probe through, or another if the last one was lost
+        if now - health.probe_started < self.probe_timeout:
+            return False
+        health.probe_started = now
+        return True
+
+    def is_closed(self, domain: str) -> bool:
+        """Check whether the host's circuit is closed, without claiming a probe."""
+        return self.get(domain).state == CLOSED
+
+    def record(self, domain: str, outcome: str, latency: Optional[float] = None, rendered: bool = False):
+        """Record the outcome of a plain fetch or, with rendered=True, a browser render."""
+        health = self.get(domain)
+        self._dirty.add(domain)
+        if rendered:
+            health.render_outcomes.append(outcome)
+            # Rendering trouble alone doesn't make the host unreachable
+            return
+
+        health.outcomes.append(outcome)
+        if latency is not None and outcome != TIMEOUT:
+            health.latencies.append(round(latency, 3))
+
+        if outcome not in FAILURES:
+            health.state = CLOSED
+            health.consecutive_failures = 0
+            health.cooldown = 0.0
+            return
+
+        health.consecutive_failures += 1
+        if health.state == HALF_OPEN:
+            self._open(health, min(self.max_cooldown, max(self.base_cooldown, health.cooldown * 2)))
+        elif health.state == CLOSED and health.consecutive_failures >= self.failure_threshold:
+            self._open(health, self.base_cooldown)
+
+    def _open(self, health: DomainHealth, cooldown: float):
+        health.state = OPEN
+        health.opened_at = time.time()
+        health.cooldown = cooldown
+
+    def record_javascript(self, domain: str, needed: bool):
+        """Record whether a page from the host needed JavaScript rendering."""
+        health = self.get(domain)
+        self._dirty.add(domain)
+        if needed:
+            health.js_needed += 1
+        else:
+            health.js_not_needed += 1
+
+    def can_render(self, domain: str) -> bool:
+        """Check whether browser rendering has been working for the host."""
+        health = self.get(domain)
+        return len(health.render_outcomes) < 3 or health.render_failure_rate < 0.6
+
+    def strategy(self, domain: str) -> Optional[str]:
+        """
+        Choose how to fetch a host: "static", "dynamic" or None to decide per page.
+
+        Hosts whose pages mostly need JavaScript go straight to the browser,
+        unless rendering keeps failing there.
+        """
+        health = self.get(domain)
+        if not self.can_render(domain):
+            return "static"
+        decided = health.js_needed + health.js_not_needed
+        if decided:
+            return "dynamic" if health.js_needed / decided > 0.5 else "static"
+        return None
+
+    def record_readiness(self, domain: str, elapsed_ms: float):
+        """Record how long a rendered page from the host took to settle."""
+        health = self.get(domain)
+        self._dirty.add(domain)
+        health.ready_times.append(round(elapsed_ms))
+
+    def record_full_render(self, domain: str, needed: bool):
+        """Record whether a page from the host only rendered with nothing blocked."""
+        health = self.get(domain)
+        self._dirty.add(domain)
+        if needed:
+            health.full_render_needed += 1
+        else:
+            health.full_render_not_needed += 1
+
+    def should_retry_full_render(self, domain: str) -> bool:
+        """
+        Check whether a page still empty after a blocked render is worth rendering in full.
+
+        Not for hosts whose pages mostly stayed empty after a full render too.
+        """
+        health = self.get(domain)
+        return health.full_render_not_needed <= health.full_render_needed
+
+    def render_profile(self, domain: str, default: RenderProfile) -> RenderProfile:
+        """
+        Adapt a render profile to what has worked for the host before.
+
+        Hosts whose pages break with requests blocked are rendered in full, and
+        once a few renders have been timed the readiness wait is capped near
+        the host's usual settling time instead of the default maximum.
+        """
+        health = self.get(domain)
+        profile = replace(default)
+        if health.full_render:
+            profile.block_resources = False
+            profile.block_trackers = False
+        if len(health.ready_times) >= 3:
+            usual = sorted(health.ready_times)[min(len(health.ready_times) - 1, int(0.9 * len(health.ready_times)))]
+            profile.max_wait_ms = int(max(1000, min(default.max_wait_ms, usual * 1.5 + default.quiet_ms)))
+        return profile
+
+    def timeout_for(self, domain: str, default: float, minimum: float = 5.0) -> float:
+        """Request timeout for a host: a multiple of its p95 latency, capped at default."""
+        health = self.get(domain)
+        if len(health.latencies) < 5:
+            return default
+        return max(minimum, min(default, health.latency_percentile(0.95) * 3))
+
+    @staticmethod
+    def backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+        """Jittered exponential backoff delay before retry number attempt + 1."""
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Summarize the hosts seen so far."""
+        rows = []
+        with self._lock:
+            domains = list(self._domains.items())
+        for domain, health in domains:
+            rows.append({
+                "domain": domain,
+                "state": health.state,
+                "p50_latency": health.latency_percentile(0.5),
+                "p95_latency": health.latency_percentile(0.95),
+                "timeout_rate": health.timeout_rate,
+                "block_rate": health.block_rate,
+                "strategy": self.strategy(domain),
+                "can_render": self.can_render(domain)
+            })
+        return rows
+
+    def flush(self):
+        """Persist the records changed since the last flush."""
+        if self.store is None:
+            self._dirty.clear()
+            return
+        with self._lock:
+            dirty = [(d, self._domains[d].to_dict()) for d in self._dirty if d in self._domains]
+            self._dirty.clear()
+        for domain, record in dirty:
+            self.store.set(domain, record)
+
+    def close(self):
+        """Persist pending records and close the on-disk store."""
+        self.flush()
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,120 @@
+"""Render profiles: request blocking and content readiness for browser rendering."""
+from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from urllib.parse import urlparse
+
+# Resource types that never contribute text
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# Ad, analytics and tag-manager hosts, matched with their subdomains
+TRACKER_HOSTS = {
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "googletagmanager.com",
+    "googletagservices.com", "google-analytics.com", "adservice.google.com", "amazon-adsystem.com",
+    "adnxs.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com", "scorecardresearch.com",
+    "quantserve.com", "chartbeat.com", "chartbeat.net", "hotjar.com", "segment.io", "segment.com",
+    "mixpanel.com", "newrelic.com", "nr-data.net", "connect.facebook.net", "ads-twitter.com",
+    "static.ads-twitter.com", "bat.bing.com", "clarity.ms", "moatads.com", "pubmatic.com",
+    "rubiconproject.com", "openx.net", "casalemedia.com", "yieldmo.com", "teads.tv"
+}
+
+# Resolves once the main text has stopped changing for quietMs, or at maxWaitMs.
+# Mutations that leave the text length unchanged (ads, animations) don't reset the timer.
+READINESS_SCRIPT = """
+([quietMs, maxWaitMs, minChars]) => new Promise(resolve => {
+    const start = performance.now();
+    const root = () => document.querySelector('main, article, [role=main]') || document.body;
+    const textLength = () => { const r = root(); return r ? r.textContent.length : 0; };
+    let last = textLength();
+    let timer = null;
+    let observer = null;
+    let deadline = null;
+    const finish = quiet => {
+        if (observer) observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(deadline);
+        resolve({quiet: quiet, elapsed: performance.now() - start, textLength: last});
+    };
+    const arm = () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => last >= minChars ? finish(true) : arm(), quietMs);
+    };
+    observer = new MutationObserver(() => {
+        const length = textLength();
+        if (length !== last) {
+            last = length;
+            arm();
+        }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    deadline = setTimeout(() => finish(false), maxWaitMs);
+    arm();
+})
+"""
+
+@dataclass
+class RenderProfile:
+    """How to render pages from one host."""
+    block_resources: bool = True
+    block_trackers: bool = True
+    quiet_ms: int = 500
+    max_wait_ms: int = 5000
+    min_chars: int = 200
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format."""
+        return asdict(self)
+
+def is_tracker(url: str) -> bool:
+    """Check whether a request goes to a known ad or analytics host."""
+    host = (urlparse(url).hostname or "").lower()
+    labels = host.split(".")
+    return any(".".join(labels[i:]) in TRACKER_HOSTS for i in range(len(labels) - 1))
+
+def should_block(resource_type: str, url: str, profile: RenderProfile) -> bool:
+    """Decide whether the browser should skip a subresource request."""
+    if profile.block_resources and resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    return profile.block_trackers and is_tracker(url)
+
+@asynccontextmanager
+async def blocking(page, profile: RenderProfile, counts: Optional[Dict[str, int]] = None):
+    """
+    Abort unneeded subresource requests on a page for the duration of the block.
+
+    The route is removed again on exit because pages are reused from a pool.
+    Blocked and allowed request counts are added to counts, if given.
+    """
+    async def handle(route):
+        request = route.request
+        if should_block(request.resource_type, request.url, profile):
+            if counts is not None:
+                counts["blocked"] = counts.get("blocked", 0) + 1
+            await route.abort()
+        else:
+            if counts is not None:
+                counts["allowed"] = counts.get("allowed", 0) + 1
+            await route.continue_()
+
+    if not (profile.block_resources or profile.block_trackers):
+        yield
+        return
+
+    await page.route("**/*", handle)
+    try:
+        yield
+    finally:
+        try:
+            await page.unroute("**/*", handle)
+        except Exception:
+            pass
+
+async def wait_until_ready(page, profile: RenderProfile) -> Dict[str, Any]:
+    """
+    Wait until the page's main text has stopped changing.
+
+    Returns:
+        Dictionary with quiet (False if max_wait_ms ran out first), elapsed
+        milliseconds and the text length seen
+    """
+    return await page.evaluate(READINESS_SCRIPT, [profile.quiet_ms, profile.max_wait_ms, profile.min_chars])
@@ -0,0 +1,142 @@
+"""robots.txt checking with per-host single-flight fetches and a persistent cache."""
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import asyncio
+import os
+import time
+import urllib.robotparser
+import aiohttp
+from ..cache import CacheStore
+from ..config import get_cache_dir
+from .session import HttpSessionPool
+from .download import read_text
+
+# RFC 9309 asks crawlers to parse at least the first 500 KiB of robots.txt
+MAX_ROBOTS_BYTES = 500 * 1024
+
+# Seconds before a robots.txt that failed with a server or network error is retried
+FAILED_FETCH_TTL = 300
+
+class RobotsChecker:
+    """
+    Handles robots.txt checking and caching for ethical web scraping.
+
+    Each host's robots.txt is fetched at most once at a time: concurrent
+    callers for the same host share one in-flight fetch, while different
+    hosts are fetched in parallel. Fetched rules are kept in memory and in an
+    on-disk store for cache_ttl seconds, so later runs skip the fetch.
+    """
+    def __init__(
+        self,
+        cache_ttl: int = 86400,
+        session_pool: Optional[HttpSessionPool] = None,
+        cache_dir: Optional[str] = None
+    ):
+        self.parsers = {}  # Cache for robot parsers
+        self.cache_ttl = cache_ttl
+        self.last_checked = {}  # When each domain was last checked
+        self.session_pool = session_pool or HttpSessionPool()
+        self.cache_dir = cache_dir or get_cache_dir("robots")
+        self.store = CacheStore(os.path.join(self.cache_dir, "robots.db"), ttl=cache_ttl, memory_items=0)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _domain(url: str) -> Optional[str]:
+        parsed_url = urlparse(url)
+        if not parsed_url.netloc:
+            return None
+        return parsed_url.scheme + "://" + parsed_url.netloc
+
+    def is_cached(self, url: str) -> bool:
+        """Check whether rules for the URL's host are already loaded in memory."""
+        domain = self._domain(url)
+        return domain in self.parsers and time.time() - self.last_checked.get(domain, 0) < self.cache_ttl
+
+    async def can_fetch(self, url: str, user_agent: str) -> bool:
+        """Check robots.txt rules for URL."""
+        try:
+            domain = self._domain(url)
+            if domain is None:
+                return False
+
+            parser = await self._get_parser(domain)
+            return parser.can_fetch(user_agent, url)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # If any error occurs during parsing, allow access but log it
+            print(f"Error checking robots.txt for {url}")
+            return True
+
+    async def _get_parser(self, domain: str) -> urllib.robotparser.RobotFileParser:
+        """Get the host's parser, joining an in-flight fetch if there is one."""
+        if time.time() - self.last_checked.get(domain, 0) < self.cache_ttl and domain in self.parsers:
+            return self.parsers[domain]
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(domain)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._load(domain))
+            self._inflight[domain] = task
+            task.add_done_callback(lambda done: self._forget_inflight(domain, done))
+
+        # Shielded so one cancelled caller does not abort the fetch for the others
+        return await asyncio.shield(task)
+
+    def _forget_inflight(self, domain: str, task: asyncio.Future):
+        if self._inflight.get(domain) is task:
+            del self._inflight[domain]
+
+    async def _load(self, domain: str) -> urllib.robotparser.RobotFileParser:
+        """Load a host's rules from the on-disk cache or fetch them."""
+        checked_at = time.time()
+        record = await self.store.aget(domain)
+        if record is None:
+            record = await self._fetch(domain)
+            if record.pop("persist", True):
+                await self.store.aset(domain, record)
+            else:
+                checked_at -= self.cache_ttl - FAILED_FETCH_TTL
+
+        parser = urllib.robotparser.RobotFileParser()
+        parser.set_url(domain + "/robots.txt")
+        if record.get("allow_all"):
+            parser.allow_all = True
+        else:
+            parser.parse(record.get("text", "").splitlines())
+
+        self.parsers[domain] = parser
+        self.last_checked[domain] = checked_at
+        return parser
+
+    async def _fetch(self, domain: str) -> Dict[str, Any]:
+        """Fetch robots.txt and describe it as a cache record."""
+        try:
+            session = await self.session_pool.get_session()
+            async with session.get(domain + "/robots.txt", timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    text, _ = await read_text(response, MAX_ROBOTS_BYTES)
+                    return {"text": text}
+                if 400 <= response.status < 500:
+                    # If robots.txt doesn't exist, assume everything is allowed
+                    return {"allow_all": True}
+                # Server errors may be temporary: allow for now but don't persist
+                return {"allow_all": True, "persist": False}
+        except Exception:
+            # If error occurs while fetching robots.txt, allow access
+            return {"allow_all": True, "persist": False}
+
+    def crawl_delay(self, url: str, user_agent: str) -> Optional[float]:
+        """Get the Crawl-delay for a URL's domain from an already fetched robots.txt."""
+        parser = self.parsers.get(self._domain(url))
+        if parser is None:
+            return None
+        try:
+            delay = parser.crawl_delay(user_agent)
+            return float(delay) if delay else None
+        except Exception:
+            return None
+
+    def close(self):
+        """Close the on-disk cache."""
+        self.store.close()
@@ -0,0 +1,338 @@
+"""Host-aware politeness scheduling for scraper requests."""
+from typing import Dict, Optional
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+import asyncio
+import time
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Token bucket allowing short bursts while holding a long-run request rate."""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self, now: float) -> float:
+        """Seconds until a token can be taken."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        """Take one token."""
+        self._refill(now)
+        self.tokens -= 1
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None):
+        """Change the refill rate and optionally the burst capacity."""
+        self._refill(time.monotonic())
+        self.rate = rate
+        if capacity is not None:
+            self.capacity = capacity
+            self.tokens = min(self.tokens, capacity)
+
+class AdaptiveLimit:
+    """
+    Additive-increase/multiplicative-decrease limit on concurrent requests.
+
+    While requests succeed at a healthy latency and the limit is actually in
+    use, it grows by about one slot per limit completions. Timeouts, 429/503
+    responses or a p95 latency rising past latency_tolerance times its
+    baseline cut it by the backoff factor, at most once per decrease_interval
+    so one burst of failures does not collapse it to the minimum. Failure
+    rates above max_error_rate stop growth without cutting the limit. The
+    limit is plain numbers, not tied to any event loop.
+    """
+    def __init__(
+        self,
+        initial: int = 8,
+        minimum: int = 1,
+        maximum: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_error_rate: float = 0.1,
+        decrease_interval: float = 1.0,
+        window: int = 50
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.decrease_interval = decrease_interval
+        self.latencies = deque(maxlen=window)
+        self.failures = deque(maxlen=window)
+        self.baseline_p95: Optional[float] = None
+        self._last_decrease = 0.0
+
+    @property
+    def current(self) -> int:
+        """The limit as a whole number of requests."""
+        return max(self.minimum, int(self.limit))
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of recent successful request latencies."""
+        if len(self.latencies) < 10:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def record(self, latency: Optional[float] = None, overloaded: bool = False, failed: bool = False, saturated: bool = True):
+        """
+        Adjust the limit after a request completes.
+
+        Args:
+            latency: Seconds the request took, if it got a response
+            overloaded: The request timed out or was throttled (429/503)
+            failed: The request failed for another reason
+            saturated: Requests were waiting or every slot was in use
+        """
+        self.failures.append(overloaded or failed)
+        if latency is not None and not overloaded:
+            self.latencies.append(latency)
+
+        p95 = self.p95()
+        latency_rising = (
+            p95 is not None and self.baseline_p95 is not None
+            and p95 > self.baseline_p95 * self.latency_tolerance
+        )
+        if overloaded or latency_rising:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.decrease_interval:
+                self.limit = max(float(self.minimum), self.limit * self.backoff)
+                self._last_decrease = now
+                # Judge the new limit on latencies measured under it
+                self.latencies.clear()
+            return
+
+        if p95 is not None:
+            self.baseline_p95 = p95 if self.baseline_p95 is None else self.baseline_p95 + 0.05 * (p95 - self.baseline_p95)
+
+        error_rate = sum(self.failures) / len(self.failures)
+        if failed or error_rate > self.max_error_rate or not saturated:
+            return
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+
+class _DomainState:
+    """Scheduling state for one host."""
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.active = 0
+        self.waiters = deque()
+        self.not_before = 0.0
+
+class DomainScheduler:
+    """
+    Grants request slots fairly across hosts.
+
+    Each host has a concurrency cap and a token-bucket request rate, which can
+    be tightened by robots.txt Crawl-delay and paused by Retry-After. Waiting
+    requests are served round-robin across hosts, so one busy host never
+    starves the others, and a global cap bounds total in-flight requests.
+    With an AdaptiveLimit, the global cap follows the outcomes fed to report().
+    """
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        per_domain_concurrency: int = 2,
+        requests_per_second: float = 1.0,
+        burst: int = 2,
+        max_defer: float = 60.0,
+        limiter: Optional[AdaptiveLimit] = None
+    ):
+        self._max_concurrent = max_concurrent
+        self.limiter = limiter
+        self.per_domain_concurrency = per_domain_concurrency
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_defer = max_defer
+        self._domains: Dict[str, _DomainState] = {}
+        self._rotation = deque()
+        self._active = 0
+        self._timer = None
+        self._timer_loop = None
+        self._timer_due = None
+
+    @property
+    def max_concurrent(self) -> int:
+        """Current global cap on in-flight requests."""
+        return self.limiter.current if self.limiter is not None else self._max_concurrent
+
+    @max_concurrent.setter
+    def max_concurrent(self, value: int):
+        self._max_concurrent = value
+        if self.limiter is not None:
+            self.limiter.limit = float(min(self.limiter.maximum, max(self.limiter.minimum, value)))
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        """Get the scheduling key for a URL."""
+        return (urlparse(url).hostname or "").lower()
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            state = _DomainState(TokenBucket(self.requests_per_second, self.burst))
+            self._domains[domain] = state
+        return state
+
+    def set_crawl_delay(self, domain: str, delay: float):
+        """Honor a robots.txt Crawl-delay for a host."""
+        if not delay or delay <= 0:
+            return
+        state = self._state(domain)
+        state.bucket.set_rate(min(self.requests_per_second, 1.0 / delay), capacity=1)
+
+    def defer(self, domain: str, seconds: float):
+        """Hold back new requests to a host, e.g. after a Retry-After response."""
+        seconds = min(max(0.0, seconds), self.max_defer)
+        state = self._state(domain)
+        state.not_before = max(state.not_before, time.monotonic() + seconds)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of granted, unreleased slots."""
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return sum(
+            sum(1 for waiter in state.waiters if not waiter.done())
+            for state in self._domains.values()
+        )
+
+    def report(self, latency: Optional[float] = None, overloaded: bool = False, failed: bool = False):
+        """Feed a request outcome to the adaptive limit, if any."""
+        if self.limiter is None:
+            return
+        limit = self.limiter.current
+        self.limiter.record(latency, overloaded, failed, saturated=self.queued > 0 or self._active >= limit)
+        if self.limiter.current > limit:
+            self._dispatch()
+
+    def stats(self) -> Dict[str, int]:
+        """Report the current limit, in-flight requests and queue depth."""
+        return {"limit": self.max_concurrent, "in_flight": self._active, "queued": self.queued}
+
+    async def acquire(self, url: str) -> str:
+        """Wait for a slot to request the URL and return its host key."""
+        loop = asyncio.get_running_loop()
+        domain = self.domain_of(url)
+        state = self._state(domain)
+        waiter = loop.create_future()
+        state.waiters.append(waiter)
+        if domain not in self._rotation:
+            self._rotation.append(domain)
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Granted just as we were cancelled: hand the slot back
+            if waiter.done() and not waiter.cancelled():
+                self.release(domain)
+            raise
+        return domain
+
+    def release(self, domain: str):
+        """Return a slot granted by acquire."""
+        state = self._state(domain)
+        state.active = max(0, state.active - 1)
+        self._active = max(0, self._active - 1)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold a request slot for the URL's host for the duration of the block."""
+        domain = await self.acquire(url)
+        try:
+            yield domain
+        finally:
+            self.release(domain)
+
+    def _dispatch(self):
+        """Grant slots round-robin to hosts whose limits allow it."""
+        now = time.monotonic()
+        next_wake = None
+        granted = True
+
+        while granted and self._active < self.max_concurrent:
+            granted = False
+            for _ in range(len(self._rotation)):
+                domain = self._rotation[0]
+                self._rotation.rotate(-1)
+                state = self._domains[domain]
+
+                # Requests left behind by a closed event loop will never run
+                while state.waiters and (state.waiters[0].done() or state.waiters[0].get_loop().is_closed()):
+                    state.waiters.popleft()
+                if not state.waiters or state.active >= self.per_domain_concurrency:
+                    continue
+
+                wait = max(state.not_before - now, state.bucket.time_until_available(now))
+                if wait > 0:
+                    next_wake = wait if next_wake is None else min(next_wake, wait)
+                    continue
+
+                state.bucket.consume(now)
+                state.active += 1
+                self._active += 1
+                state.waiters.popleft().set_result(None)
+                granted = True
+                if self._active >= self.max_concurrent:
+                    break
+
+        # Hosts with nothing queued leave the rotation until they get new work
+        for domain in list(self._rotation):
+            state = self._domains[domain]
+            if not any(not waiter.done() for waiter in state.waiters):
+                state.waiters.clear()
+                self._rotation.remove(domain)
+
+        if next_wake is not None:
+            self._schedule_wake(next_wake)
+
+    def _schedule_wake(self, delay: float):
+        """Re-run dispatch once the earliest rate-limited host becomes eligible."""
+        loop = asyncio.get_running_loop()
+        due = loop.time() + delay
+        if self._timer is not None and not self._timer.cancelled():
+            if self._timer_loop is loop and self._timer_due <= due:
+                return
+            self._timer.cancel()
+        self._timer_loop = loop
+        self._timer_due = due
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._timer_due = None
+        self._dispatch()
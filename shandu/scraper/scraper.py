@@ -1,38 +1,60 @@
 """Web scraper implementation."""
-from typing import List, Dict, Optional, Union, Any, Tuple
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Union, Any, Tuple, AsyncIterator
+from dataclasses import dataclass, asdict, field, replace
 from datetime import datetime
 import asyncio
+import sys
 import aiohttp
 import time
 import os
-import json
-import hashlib
-import random
-import urllib.robotparser
-from urllib.parse import urlparse
+import re
 from fake_useragent import UserAgent
-from pathlib import Path
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from langchain_community.document_loaders import AsyncChromiumLoader
 from langchain_community.document_transformers import BeautifulSoupTransformer
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-import trafilatura
-from ..config import config
+from ..config import config, get_cache_dir
+from ..cache import CacheStore, remove_legacy_files
+from ..urls import canonicalizer
+from ..replay import Archive, shared_archive
+from .session import HttpSessionPool
+from .robots import RobotsChecker
+from .browser import BrowserPool
+from .scheduler import AdaptiveLimit, DomainScheduler, parse_retry_after
+from .download import DownloadRejected, check_headers, read_text, truncate_at_tag_boundary
+from .render import RenderProfile, blocking, wait_until_ready
+from .health import DomainHealthTracker, BLOCK_STATUSES, OK, TIMEOUT, BLOCKED, ERROR
+from .extraction import ExtractionPool, ExtractionResult, extract_content, failed_extraction
 
-@dataclass
+# Slotted records drop the per-instance __dict__; dataclasses support it from Python 3.10
+SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**SLOTS)
 class ScrapedContent:
-    """Container for scraped webpage content."""
+    """
+    Container for scraped webpage content.
+    
+    html is None once it has been shed after extraction; it can be read back
+    from the scraper cache with ScraperCache.load_html(). permanent marks
+    failures another attempt would only repeat: a permanent HTTP status or a
+    robots.txt denial.
+    """
     url: str
     title: str
     text: str
-    html: str
+    html: Optional[str]
     metadata: Dict[str, Any]
     timestamp: datetime = datetime.now()
     content_type: str = "text/html"
     status_code: Optional[int] = None
     error: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    fingerprint: Optional[int] = None
+    anchors: Dict[str, str] = field(default_factory=dict)
+    permanent: bool = False
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary format."""
@@ -45,15 +67,51 @@ class ScrapedContent:
             "content_type": self.content_type,
             "status_code": self.status_code,
             "timestamp": self.timestamp.isoformat(),
-            "error": self.error
+            "error": self.error,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "links": self.links,
+            "fingerprint": self.fingerprint,
+            "anchors": self.anchors
         }
     
+    @property
+    def extraction(self) -> ExtractionResult:
+        """The page's extraction result: main text, title, metadata and links."""
+        return ExtractionResult(
+            title=self.title,
+            text=self.text,
+            metadata=self.metadata,
+            links=self.links,
+            fingerprint=self.fingerprint,
+            anchors=self.anchors
+        )
+    
+    def validators(self) -> Dict[str, str]:
+        """HTTP conditional request headers for revalidating this content."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+    
+    def shed_html(self):
+        """Release the raw HTML, keeping only the extracted content."""
+        self.html = None
+    
     def is_successful(self) -> bool:
         """Check if scraping was successful."""
         return self.error is None and bool(self.text.strip())
     
     @classmethod
-    def from_error(cls, url: str, error: str) -> 'ScrapedContent':
+    def from_error(
+        cls,
+        url: str,
+        error: str,
+        status_code: Optional[int] = None,
+        permanent: bool = False
+    ) -> 'ScrapedContent':
         """Create an error result."""
         return cls(
             url=url,
@@ -61,46 +119,77 @@ class ScrapedContent:
             text="",
             html="",
             metadata={},
-            error=error
+            status_code=status_code,
+            error=error,
+            permanent=permanent
         )
 
 class ScraperCache:
-    """Cache for scraped content to improve performance."""
-    def __init__(self, cache_dir: Optional[str] = None, ttl: int = 86400):
-        self.cache_dir = cache_dir or os.path.expanduser("~/.shandu/cache/scraper")
+    """
+    Cache for scraped content to improve performance.
+    
+    Entries live in an indexed SQLite store with compressed, content-addressed
+    HTML/text blobs, a bounded in-memory LRU tier and size-based eviction.
+    Expired entries are kept for stale_ttl seconds so they can be revalidated
+    with their ETag/Last-Modified validators instead of refetched. With
+    lazy_html, cached content comes back without its HTML, which load_html()
+    reads on demand.
+    """
+    BLOB_FIELDS = ("html", "text")
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: int = 86400,
+        max_bytes: Optional[int] = None,
+        memory_items: int = 128,
+        stale_ttl: int = 7 * 86400,
+        lazy_html: bool = False
+    ):
+        self.cache_dir = cache_dir or get_cache_dir("scraper")
         self.ttl = ttl
-        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, "scraper.db")
+        # The per-URL JSON files of the old format are only cleaned up when the store is first created
+        if not os.path.exists(path):
+            remove_legacy_files(self.cache_dir)
+        self.store = CacheStore(
+            path,
+            ttl=ttl,
+            max_bytes=max_bytes or config.get("scraper", "cache_max_bytes", 512 * 1024 * 1024),
+            memory_items=memory_items,
+            stale_ttl=stale_ttl,
+            lazy_fields=("html",) if lazy_html else ()
+        )
     
     def _get_cache_key(self, url: str) -> str:
-        """Generate a cache key from URL."""
-        return hashlib.md5(url.encode()).hexdigest()
+        """Generate a cache key from URL, shared by all variants of the same page."""
+        return canonicalizer.normalize(url)
     
-    def _get_cache_path(self, key: str) -> str:
-        """Get file path for cache key."""
-        return os.path.join(self.cache_dir, f"{key}.json")
+    @staticmethod
+    def _to_content(content_dict: Dict[str, Any]) -> Optional[ScrapedContent]:
+        """Rebuild ScrapedContent from a stored record."""
+        required_fields = ['url', 'title', 'text', 'metadata']
+        if not all(field in content_dict for field in required_fields):
+            return None
+        content_dict.setdefault('html', None)
+        if 'timestamp' in content_dict:
+            content_dict['timestamp'] = datetime.fromisoformat(content_dict['timestamp'])
+        return ScrapedContent(**content_dict)
     
     def get(self, url: str) -> Optional[ScrapedContent]:
         """Get cached content if available and not expired."""
         key = self._get_cache_key(url)
-        path = self._get_cache_path(key)
-        
-        if os.path.exists(path):
-            try:
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                
-                if time.time() - data['timestamp'] <= self.ttl:
-                    content_dict = data['content']
-                    required_fields = ['url', 'title', 'text', 'html', 'metadata']
-                    if all(field in content_dict for field in required_fields):
-                        if 'timestamp' in content_dict:
-                            content_dict['timestamp'] = datetime.fromisoformat(content_dict['timestamp'])
-                        return ScrapedContent(**content_dict)
-                    else:
-                        print(f"Cache entry for {url} is missing required fields. Invalidating cache.")
-                        os.remove(path)
-            except Exception as e:
-                print(f"Error reading cache for {url}: {e}")
+        try:
+            content_dict = self.store.get(key)
+            if content_dict is None:
+                return None
+            content = self._to_content(content_dict)
+            if content is None:
+                print(f"Cache entry for {url} is missing required fields. Invalidating cache.")
+                self.store.delete(key)
+            return content
+        except Exception as e:
+            print(f"Error reading cache for {url}: {e}")
         
         return None
     
@@ -108,78 +197,66 @@ class ScraperCache:
         """Cache scraped content."""
         if not isinstance(content, ScrapedContent):
             raise ValueError("Only ScrapedContent objects can be cached.")
-        key = self._get_cache_key(content.url)
-        path = self._get_cache_path(key)
-        
         try:
-            with open(path, 'w') as f:
-                json.dump({
-                    'timestamp': time.time(),
-                    'content': content.to_dict()
-                }, f)
+            self.store.set(self._get_cache_key(content.url), content.to_dict(), self.BLOB_FIELDS)
         except Exception as e:
             print(f"Error writing cache for {content.url}: {e}")
-
-class RobotsChecker:
-    """Handles robots.txt checking and caching for ethical web scraping."""
     
-    def __init__(self, cache_ttl: int = 3600):
-        self.parsers = {}  # Cache for robot parsers
-        self.cache_ttl = cache_ttl
-        self.last_checked = {}  # When each domain was last checked
-        self._lock = asyncio.Lock()  # For thread safety
-        
-    async def can_fetch(self, url: str, user_agent: str) -> bool:
-        """Check robots.txt rules for URL."""
+    async def aget(self, url: str) -> Optional[ScrapedContent]:
+        """Get cached content without blocking the event loop."""
+        key = self._get_cache_key(url)
         try:
-            # Parse the URL to get the domain
-            parsed_url = urlparse(url)
-            if not parsed_url.netloc:
-                return False
-                
-            domain = parsed_url.scheme + "://" + parsed_url.netloc
-            robots_url = domain + "/robots.txt"
-            
-            # Check if we need to refresh the parser
-            current_time = time.time()
-            
-            async with self._lock:
-                if domain in self.parsers:
-                    # Use cached parser if it's still valid
-                    if current_time - self.last_checked.get(domain, 0) < self.cache_ttl:
-                        parser = self.parsers[domain]
-                        return parser.can_fetch(user_agent, url)
-                
-                # Need to fetch or refresh the robots.txt
-                parser = urllib.robotparser.RobotFileParser()
-                parser.set_url(robots_url)
-                
-                # Fetch the robots.txt file
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(robots_url, timeout=5) as response:
-                            if response.status == 200:
-                                robots_content = await response.text()
-                                parser.parse(robots_content.splitlines())
-                            else:
-                                # If robots.txt doesn't exist, assume everything is allowed
-                                return True
-                except Exception:
-                    # If error occurs while fetching robots.txt, allow access
-                    return True
-                
-                # Cache the parser
-                self.parsers[domain] = parser
-                self.last_checked[domain] = current_time
-                
-                # Check if the URL is allowed
-                return parser.can_fetch(user_agent, url)
-                
-        except Exception:
-            # If any error occurs during parsing, allow access but log it
-            print(f"Error checking robots.txt for {url}")
+            content_dict = await self.store.aget(key)
+            if content_dict is None:
+                return None
+            content = self._to_content(content_dict)
+            if content is None:
+                print(f"Cache entry for {url} is missing required fields. Invalidating cache.")
+                await asyncio.to_thread(self.store.delete, key)
+            return content
+        except Exception as e:
+            print(f"Error reading cache for {url}: {e}")
+        
+        return None
+    
+    def load_html(self, url: str) -> Optional[str]:
+        """Read the cached raw HTML of a page, e.g. after it was shed."""
+        try:
+            return self.store.get_field(self._get_cache_key(url), "html")
+        except Exception as e:
+            print(f"Error reading cached HTML for {url}: {e}")
+            return None
+    
+    async def aload_html(self, url: str) -> Optional[str]:
+        """Read the cached raw HTML of a page without blocking the event loop."""
+        return await asyncio.to_thread(self.load_html, url)
+    
+    async def aget_stale(self, url: str) -> Optional[ScrapedContent]:
+        """Get cached content even if expired, for conditional revalidation."""
+        try:
+            content_dict = await self.store.aget(self._get_cache_key(url), allow_stale=True)
+            return self._to_content(content_dict) if content_dict else None
+        except Exception as e:
+            print(f"Error reading stale cache for {url}: {e}")
+            return None
+    
+    async def arefresh(self, url: str):
+        """Mark cached content as fresh again after the server confirmed it is unchanged."""
+        try:
+            await asyncio.to_thread(self.store.refresh, self._get_cache_key(url))
+        except Exception as e:
+            print(f"Error refreshing cache for {url}: {e}")
+    
+    async def aset(self, content: ScrapedContent) -> bool:
+        """Cache scraped content without blocking the event loop; returns whether it was stored."""
+        if not isinstance(content, ScrapedContent):
+            raise ValueError("Only ScrapedContent objects can be cached.")
+        try:
+            await self.store.aset(self._get_cache_key(content.url), content.to_dict(), self.BLOB_FIELDS)
             return True
-
+        except Exception as e:
+            print(f"Error writing cache for {content.url}: {e}")
+            return False
 
 class WebScraper:
     """
@@ -196,7 +273,8 @@ class WebScraper:
         max_concurrent: int = 8,  # Increased from 5 to 8 for more parallel processing
         cache_ttl: int = 86400,  # 24 hours
         user_agent: Optional[str] = None,
-        respect_robots: bool = True
+        respect_robots: bool = True,
+        archive: Optional[Archive] = None
     ):
         self.proxy = proxy or config.get("scraper", "proxy")
         self.timeout = timeout or config.get("scraper", "timeout", 10)
@@ -204,8 +282,21 @@ class WebScraper:
         self.chunk_size = chunk_size or config.get("scraper", "chunk_size", 1000)
         self.chunk_overlap = chunk_overlap or config.get("scraper", "chunk_overlap", 200)
         self.max_concurrent = max_concurrent
+        self.max_page_bytes = config.get("scraper", "max_page_bytes", 2 * 1024 * 1024)
+        self.max_content_length = config.get("scraper", "max_content_length", 10 * 1024 * 1024)
+        self.page_budget = config.get("scraper", "page_budget", 60)
         self.respect_robots = respect_robots
         
+        # Record/replay archive for offline runs, from the replay config section by default
+        self.archive = archive if archive is not None else shared_archive()
+        
+        # Pooled session shared by page fetches and robots.txt lookups
+        self.session_pool = HttpSessionPool(
+            limit=config.get("scraper", "max_connections", 100),
+            limit_per_host=config.get("scraper", "max_connections_per_host", 8),
+            archive=self.archive
+        )
+        
         # Create a single UserAgent instance to avoid repeated initialization
         if user_agent is None:
             ua_generator = UserAgent()
@@ -214,22 +305,100 @@ class WebScraper:
             self.user_agent = user_agent
 
         # Initialize robots.txt checker
-        self.robots_checker = RobotsChecker()
+        self.robots_checker = RobotsChecker(
+            cache_ttl=config.get("scraper", "robots_cache_ttl", 86400),
+            session_pool=self.session_pool
+        )
+        
+        # Learned per-host latency, failure and rendering history with a circuit breaker;
+        # kept in memory only when no health_db is configured; relative paths are under the cache dir
+        health_db = config.get("scraper", "health_db")
+        self.health = DomainHealthTracker(
+            path=os.path.join(get_cache_dir(), os.path.expanduser(health_db)) if health_db else None,
+            failure_threshold=config.get("scraper", "circuit_failure_threshold", 5),
+            cooldown=config.get("scraper", "circuit_cooldown", 60)
+        )
+        
+        # URL -> ETag/Last-Modified of the latest response, consumed by scrape_url
+        self.response_validators: Dict[str, Dict[str, Optional[str]]] = {}
+        
+        # Long-lived browsers with reusable pages for dynamic rendering
+        self.browser_pool = BrowserPool(
+            max_browsers=config.get("scraper", "max_browsers", 1),
+            max_pages=config.get("scraper", "max_browser_pages", 4),
+            proxy=self.proxy,
+            user_agent=self.user_agent,
+            archive=self.archive
+        )
+        
+        # Default rendering profile; per-host adjustments are learned by self.health
+        self.render_profile = RenderProfile(
+            block_resources=config.get("scraper", "render_block_resources", True),
+            block_trackers=config.get("scraper", "render_block_trackers", True),
+            quiet_ms=config.get("scraper", "render_quiet_ms", 500),
+            max_wait_ms=config.get("scraper", "render_max_wait_ms", 5000)
+        )
+        # Subresource requests blocked and allowed while rendering
+        self.render_requests: Dict[str, int] = {}
         
         self.splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap
         )
         
-        self.cache = ScraperCache(ttl=cache_ttl)
+        # Raw HTML is dropped after extraction and read back from the cache when needed
+        self.shed_html = config.get("scraper", "shed_html", True)
+        self.cache = ScraperCache(ttl=cache_ttl, lazy_html=self.shed_html)
         
-        # Use a single semaphore for all scraper instances
-        if not hasattr(WebScraper, '_semaphore'):
-            WebScraper._semaphore = asyncio.Semaphore(max_concurrent)
-        self.semaphore = WebScraper._semaphore
-    
-    async def _get_page_simple(self, url: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
-        """Get page content using aiohttp."""
+        # Host-aware request scheduling: global cap, per-host concurrency and rate
+        self.scheduler = DomainScheduler(
+            max_concurrent=max_concurrent,
+            per_domain_concurrency=config.get("scraper", "per_host_concurrency", 2),
+            requests_per_second=config.get("scraper", "per_host_rate", 1.0),
+            burst=config.get("scraper", "per_host_burst", 2),
+            limiter=AdaptiveLimit(
+                initial=max_concurrent,
+                minimum=config.get("scraper", "min_concurrent", 2),
+                # An explicitly higher starting concurrency raises the ceiling with it
+                maximum=max(max_concurrent, config.get("scraper", "max_concurrent_limit", 32))
+            ) if config.get("scraper", "adaptive_concurrency", True) else None
+        )
+        
+        # Worker processes for trafilatura/BeautifulSoup parsing
+        self.extraction_pool = ExtractionPool(
+            max_workers=config.get("scraper", "extraction_workers", None),
+            timeout=config.get("scraper", "extraction_timeout", 30),
+            inline=config.get("scraper", "extraction_inline", False)
+        )
+
+    async def close(self):
+        """Release pooled network resources held for the running event loop."""
+        await self.session_pool.close()
+        await self.browser_pool.close()
+        await asyncio.to_thread(self.health.flush)
+
+    async def __aenter__(self) -> 'WebScraper':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_page_simple(
+        self,
+        url: str,
+        validators: Optional[Dict[str, str]] = None
+    ) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+        """
+        Get page content using aiohttp.
+        
+        When validators (If-None-Match / If-Modified-Since) are given the request is
+        conditional and a 304 response is returned as (None, content_type, 304).
+        The response's own ETag/Last-Modified are kept in self.response_validators.
+        
+        The body is streamed and capped at max_page_bytes. Non-text content types
+        and oversized Content-Length values are rejected before the body is read,
+        as (None, content_type, 415) and (None, content_type, 413) respectively.
+        """
         headers = {
             'User-Agent': self.user_agent,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -238,57 +407,72 @@ class WebScraper:
             'Upgrade-Insecure-Requests': '1',
             'Cache-Control': 'max-age=0',
         }
+        if validators:
+            headers.update(validators)
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                kwargs = {
-                    'timeout': aiohttp.ClientTimeout(total=self.timeout),
-                    'headers': headers,
-                    'allow_redirects': True
-                }
-                
-                if self.proxy and self.proxy.strip():
-                    kwargs['proxy'] = self.proxy
+        domain = self.scheduler.domain_of(url)
+        started = time.monotonic()
+        try:
+            session = await self.session_pool.get_session()
+            kwargs = {
+                'timeout': aiohttp.ClientTimeout(total=self.health.timeout_for(domain, self.timeout)),
+                'headers': headers,
+                'allow_redirects': True
+            }
+            
+            if self.proxy and self.proxy.strip():
+                kwargs['proxy'] = self.proxy
+            
+            async with session.get(url, **kwargs) as response:
+                content_type = response.headers.get('Content-Type', 'text/html')
+                status_code = response.status
+                self._remember_validators(url, response.headers)
+                latency = time.monotonic() - started
+                self.health.record(domain, BLOCKED if status_code in BLOCK_STATUSES else OK, latency)
+                self.scheduler.report(latency, overloaded=status_code in (429, 503))
                 
-                async with session.get(url, **kwargs) as response:
-                    content_type = response.headers.get('Content-Type', 'text/html')
-                    status_code = response.status
-                    
-                    if 200 <= status_code < 300:
-                        return await response.text(), content_type, status_code
-                    else:
-                        print(f"HTTP error {status_code} for {url}")
-                        return None, content_type, status_code
-            except asyncio.TimeoutError:
-                print(f"Timeout fetching {url}")
-                return None, None, None
-            except Exception as e:
-                print(f"Error fetching {url}: {e}")
-                return None, None, None
+                if status_code == 304:
+                    return None, content_type, status_code
+                elif 200 <= status_code < 300:
+                    check_headers(response.headers, self.max_content_length)
+                    html, truncated = await read_text(response, self.max_page_bytes)
+                    if truncated:
+                        print(f"Truncated {url} at {self.max_page_bytes} bytes")
+                    return html, content_type, status_code
+                else:
+                    if status_code in (429, 503):
+                        self._honor_retry_after(url, response.headers.get('Retry-After'))
+                    print(f"HTTP error {status_code} for {url}")
+                    return None, content_type, status_code
+        except DownloadRejected as e:
+            print(f"Skipping {url}: {e}")
+            return None, content_type, e.status_code
+        except asyncio.TimeoutError:
+            print(f"Timeout fetching {url}")
+            self.health.record(domain, TIMEOUT)
+            self.scheduler.report(overloaded=True)
+            return None, None, None
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            self.health.record(domain, ERROR)
+            self.scheduler.report(failed=True)
+            return None, None, None
 
-    PROBLEMATIC_DOMAINS = []
-    
-    PROBLEMATIC_DOMAINS = ["msn.com", "evwind.es", "military.com", "statista.com", "yahoo.com"]
-    
-    # Share a single browser instance across multiple pages for efficiency
-    _browser = None
-    _browser_lock = None
-    
-    @classmethod
-    async def _get_shared_browser(cls):
-        """Get or create a shared browser instance to avoid overhead of repeated browser launches"""
-        if cls._browser_lock is None:
-            cls._browser_lock = asyncio.Lock()
-            
-        async with cls._browser_lock:
-            if cls._browser is None:
-                async with async_playwright() as p:
-                    browser_args = ["--disable-dev-shm-usage", "--no-sandbox", "--disable-setuid-sandbox"]
-                    cls._browser = await p.chromium.launch(
-                        headless=True,
-                        args=browser_args
-                    )
-        return cls._browser
+    def _remember_validators(self, url: str, headers: Any):
+        """Keep a response's cache validators until scrape_url stores them."""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if etag or last_modified:
+            self.response_validators[url] = {"etag": etag, "last_modified": last_modified}
+
+    def _honor_retry_after(self, url: str, retry_after: Optional[str]):
+        """Pause requests to a host for the period given in a Retry-After header."""
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            self.scheduler.defer(self.scheduler.domain_of(url), delay)
+
+    # Statuses that another attempt or the browser cannot fix
+    PERMANENT_FAILURES = (404, 410, 413, 415)
     
     async def _get_page_dynamic(
         self, 
@@ -299,6 +483,12 @@ class WebScraper:
         """
         Get page content using Playwright for JavaScript rendering with improved efficiency.
         
+        Pages come from the shared browser pool, so only navigation is paid per URL.
+        Hosts where rendering keeps failing are fetched statically instead.
+        Images, media, fonts and trackers are blocked unless the host's pages were
+        seen to need them, in which case the page is rendered again in full. Hosts
+        whose pages stay empty either way are not rendered a second time.
+        
         Args:
             url: URL to fetch
             wait_for_selector: CSS selector to wait for before considering page loaded
@@ -307,347 +497,393 @@ class WebScraper:
         Returns:
             Tuple of (html_content, content_type, status_code)
         """
-        is_problematic = any(domain in url for domain in self.PROBLEMATIC_DOMAINS)
-        
-        if is_problematic:
-            print(f"URL {url} is from a problematic domain. Using simple fetching instead.")
+        domain = self.scheduler.domain_of(url)
+        if not self.health.can_render(domain):
+            print(f"Rendering keeps failing for {domain}. Using simple fetching instead.")
             return await self._get_page_simple(url)
         
-        context = None
+        profile = self.health.render_profile(domain, self.render_profile)
+        result = await self._render(url, profile, wait_for_selector, extra_wait)
+        
+        html, content_type, _ = result
+        if (
+            html
+            and (profile.block_resources or profile.block_trackers)
+            and self.needs_javascript(html, content_type)
+            and self.health.should_retry_full_render(domain)
+        ):
+            # Still empty with requests blocked: see whether the page renders in full
+            full_profile = replace(profile, block_resources=False, block_trackers=False)
+            full_result = await self._render(url, full_profile, wait_for_selector, extra_wait)
+            if full_result[0]:
+                needed = not self.needs_javascript(full_result[0], full_result[1])
+                self.health.record_full_render(domain, needed)
+                if needed:
+                    print(f"Pages from {domain} need blocked resources to render. Rendering them in full.")
+                    return full_result
         
+        return result
+    
+    async def _render(
+        self,
+        url: str,
+        profile: RenderProfile,
+        wait_for_selector: Optional[str] = None,
+        extra_wait: int = 0
+    ) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+        """Render a page once with the given profile."""
+        domain = self.scheduler.domain_of(url)
         try:
             # Use a shorter timeout for faster overall execution
             timeout = min(self.timeout, 15) * 1000  # Max 15 seconds
-            user_agent = self.user_agent
             
-            # Create context directly with the browser instance
-            proxy_options = {"server": self.proxy} if self.proxy and self.proxy.strip() else None
-            
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(
-                    proxy=proxy_options,
-                    headless=True,
-                    args=["--disable-dev-shm-usage", "--no-sandbox", "--disable-setuid-sandbox"]
-                )
-                
-                context = await browser.new_context(
-                    user_agent=user_agent,
-                    viewport={"width": 1280, "height": 800},
-                    accept_downloads=True
-                )
-                
-                context.set_default_timeout(timeout)
-                page = await context.new_page()
+            async with self.browser_pool.page() as page:
                 page.set_default_timeout(timeout)
                 
                 try:
-                    # Use faster load strategy
-                    wait_until = "commit" if is_problematic else "domcontentloaded"
-                    response = await page.goto(url, wait_until=wait_until, timeout=timeout)
-                    
-                    # Reduced timeout for networkidle
-                    try:
-                        await page.wait_for_load_state("networkidle", timeout=3000)  # Reduced from 5000ms
-                    except PlaywrightTimeoutError:
-                        # This is expected and not a problem - continue anyway
-                        pass
-                    except Exception:
-                        # Ignore network idle errors - continue with what we have
-                        pass
-                    
-                    if wait_for_selector:
+                    async with blocking(page, profile, self.render_requests):
+                        response = await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+                        
+                        # Stop waiting as soon as the main text stops changing
                         try:
-                            await page.wait_for_selector(wait_for_selector, timeout=3000)  # Reduced timeout
-                        except:
-                            # Continue even if selector isn't found
+                            readiness = await wait_until_ready(page, profile)
+                            self.health.record_readiness(domain, readiness["elapsed"])
+                        except Exception:
+                            # Navigations during the check end it early - continue with what we have
                             pass
-                    
-                    # Reduced extra wait time
-                    if extra_wait > 0:
-                        await asyncio.sleep(min(extra_wait, 1))  # Cap at 1 second
-                    
-                    status_code = None
-                    content_type = 'text/html'
-                    
-                    if response:
+                        
+                        if wait_for_selector:
+                            try:
+                                await page.wait_for_selector(wait_for_selector, timeout=3000)  # Reduced timeout
+                            except:
+                                # Continue even if selector isn't found
+                                pass
+                        
+                        # Reduced extra wait time
+                        if extra_wait > 0:
+                            await asyncio.sleep(min(extra_wait, 1))  # Cap at 1 second
+                        
+                        status_code = None
+                        content_type = 'text/html'
+                        
+                        if response:
+                            try:
+                                status_code = response.status
+                                content_type = response.headers.get('content-type', 'text/html')
+                                if status_code in (429, 503):
+                                    self._honor_retry_after(url, response.headers.get('retry-after'))
+                            except:
+                                # Continue with defaults if we can't get headers
+                                pass
+                        
+                        # Get content with a timeout
+                        html = None
                         try:
-                            status_code = response.status
-                            content_type = response.headers.get('content-type', 'text/html')
-                        except:
-                            # Continue with defaults if we can't get headers
-                            pass
+                            html = await page.content()
+                        except Exception as e:
+                            print(f"Error getting page content for {url}: {e}")
+                            self.health.record(domain, ERROR, rendered=True)
+                            return None, content_type, status_code
                     
-                    # Get content with a timeout
-                    html = None
-                    try:
-                        html = await page.content()
-                    except Exception as e:
-                        print(f"Error getting page content for {url}: {e}")
-                        return None, content_type, status_code
+                    if len(html) > self.max_page_bytes:
+                        html = truncate_at_tag_boundary(html[:self.max_page_bytes])
                     
+                    self.health.record(domain, OK, rendered=True)
                     return html, content_type, status_code
                     
                 except PlaywrightTimeoutError:
                     # Simply return None on timeout - don't waste time with detailed errors
+                    self.health.record(domain, TIMEOUT, rendered=True)
                     return None, None, None
                 except Exception:
                     # Simply return None on errors
+                    self.health.record(domain, ERROR, rendered=True)
                     return None, None, None
-                finally:
-                    # Always close resources to prevent leaks
-                    if context:
-                        await context.close()
-                    await browser.close()
                 
         except Exception:
             # Fast fail and return None
             return None, None, None
 
-    def _extract_content(self, html: str, url: str, content_type: str = "text/html") -> Dict[str, Any]:
-        """Extract structured content from web page."""
-        if not html:
-            return {
-                "title": "No content",
-                "text": "",
-                "metadata": {"url": url}
-            }
-        
-        if content_type and "json" in content_type.lower():
-            try:
-                json_data = json.loads(html)
-                text = json.dumps(json_data, indent=2)
-                return {
-                    "title": url.split("/")[-1] or "JSON Content",
-                    "text": text,
-                    "metadata": {"url": url, "content_type": "json"}
-                }
-            except json.JSONDecodeError:
-                pass
-                
-        elif content_type and "xml" in content_type.lower():
-            try:
-                soup = BeautifulSoup(html, 'xml')
-                text = soup.get_text(separator="\n\n", strip=True)
-                title = soup.find('title')
-                title_text = title.get_text(strip=True) if title else url.split("/")[-1] or "XML Content"
-                return {
-                    "title": title_text,
-                    "text": text,
-                    "metadata": {"url": url, "content_type": "xml"}
-                }
-            except Exception:
-                pass
+    # Markup left behind by client-side frameworks when the server sends an empty shell
+    SPA_SHELL_MARKERS = [
+        'id="root"', "id='root'", 'id="app"', "id='app'", 'id="__next"', 'id="__nuxt"',
+        'ng-app', 'data-reactroot', 'window.__NUXT__', 'window.__INITIAL_STATE__', '<app-root'
+    ]
+    NOSCRIPT_WALL_PATTERN = re.compile(
+        r"enable javascript|javascript is (?:required|disabled)|requires javascript|"
+        r"turn on javascript|javascript must be enabled",
+        re.IGNORECASE
+    )
+    _NOSCRIPT_BLOCKS = re.compile(r"<noscript[^>]*>(.*?)</noscript>", re.IGNORECASE | re.DOTALL)
+    _NON_TEXT_BLOCKS = re.compile(r"<(script|style|noscript|template|svg)[^>]*>.*?</\1>", re.IGNORECASE | re.DOTALL)
+    _TAGS = re.compile(r"<[^>]+>")
+    
+    @classmethod
+    def needs_javascript(cls, html: Optional[str], content_type: Optional[str] = "text/html", min_text_length: int = 200) -> bool:
+        """
+        Cheaply decide whether a statically fetched page needs JavaScript rendering.
         
-        try:
-            extracted_text = trafilatura.extract(
-                html,
-                url=url,
-                include_comments=False,
-                include_tables=True,
-                include_images=False,
-                include_links=False,
-                output_format="txt"
-            )
-            
-            if extracted_text and len(extracted_text.strip()) > 100:
-                soup = BeautifulSoup(html, 'html.parser')
-                title = soup.title.string if soup.title else url.split("/")[-1]
-                
-                return {
-                    "title": title,
-                    "text": extracted_text,
-                    "metadata": {"url": url}
-                }
-            
-            try:
-                extracted = trafilatura.bare_extraction(
-                    html,
-                    url=url,
-                    include_comments=False,
-                    include_tables=True,
-                    include_images=False,
-                    include_links=False,
-                    output_format="python"
-                )
-                
-                if extracted and isinstance(extracted, dict):
-                    title = extracted.get('title', '')
-                    text = extracted.get('text', '')
-                    
-                    metadata = {
-                        "url": url,
-                        "description": extracted.get('description', ''),
-                        "author": extracted.get('author', ''),
-                        "date": extracted.get('date', ''),
-                        "categories": extracted.get('categories', ''),
-                        "tags": extracted.get('tags', ''),
-                        "sitename": extracted.get('sitename', '')
-                    }
-                    
-                    return {
-                        "title": title,
-                        "text": text,
-                        "metadata": metadata
-                    }
-            except Exception as inner_e:
-                print(f"Trafilatura bare_extraction failed for {url}: {inner_e}")
-        except Exception as e:
-            print(f"Trafilatura extraction failed for {url}: {e}")
-            
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            title = ""
-            if soup.title:
-                title = soup.title.string
-            
-            for script in soup(["script", "style", "iframe", "noscript"]):
-                script.decompose()
-            
-            lines = []
-            
-            for i, tag in enumerate(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                for heading in soup.find_all(tag):
-                    text = heading.get_text(strip=True)
-                    if text:
-                        prefix = '#' * (i + 1)
-                        lines.append(f"{prefix} {text}")
+        Args:
+            html: Raw HTML from a plain HTTP fetch
+            content_type: Content-Type of the response
+            min_text_length: Visible text below this length counts as an empty body
             
-            for element in soup.find_all(['p', 'li']):
-                text = element.get_text(strip=True)
-                if text:
-                    lines.append(text)
+        Returns:
+            True if the page looks like an empty body, SPA shell or noscript wall
+        """
+        if content_type and "html" not in content_type.lower():
+            return False
+        if not html or not html.strip():
+            return True
+        
+        if any(cls.NOSCRIPT_WALL_PATTERN.search(block) for block in cls._NOSCRIPT_BLOCKS.findall(html)):
+            return True
+        
+        body_start = html.lower().find("<body")
+        body = html[body_start:] if body_start >= 0 else html
+        visible_text = cls._TAGS.sub(" ", cls._NON_TEXT_BLOCKS.sub(" ", body))
+        text_length = len(" ".join(visible_text.split()))
+        
+        if text_length < min_text_length:
+            return True
+        
+        # Framework shells with only a little server-rendered text still need the browser
+        has_shell_marker = any(marker in html for marker in cls.SPA_SHELL_MARKERS)
+        return has_shell_marker and text_length < min_text_length * 5
+    
+    async def _fetch_page(
+        self,
+        url: str,
+        dynamic: Optional[bool] = None,
+        wait_for_selector: Optional[str] = None,
+        extra_wait: int = 0,
+        validators: Optional[Dict[str, str]] = None
+    ) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+        """
+        Fetch a page with a static-first strategy, escalating to the browser only when needed.
+        
+        Args:
+            url: URL to fetch
+            dynamic: True to always render, False to never render, None to decide automatically
+            wait_for_selector: CSS selector to wait for when rendering
+            extra_wait: Additional time in seconds to wait after a rendered page loads
+            validators: Conditional request headers; a cheap static revalidation is tried first
             
-            for table in soup.find_all('table'):
-                lines.append("TABLE:")
-                for row in table.find_all('tr'):
-                    row_data = []
-                    for cell in row.find_all(['td', 'th']):
-                        row_data.append(cell.get_text(strip=True))
-                    if row_data:
-                        lines.append(" | ".join(row_data))
-                lines.append("END TABLE")
+        Returns:
+            Tuple of (html_content, content_type, status_code)
+        """
+        domain = self.scheduler.domain_of(url)
+        
+        if dynamic is None:
+            use_browser = self.health.strategy(domain) == "dynamic"
+        else:
+            use_browser = dynamic
+        
+        static_result = None
+        if not use_browser or validators:
+            static_result = await self._get_page_simple(url, validators)
+            html, content_type, status_code = static_result
             
-            text = "\n\n".join(lines)
+            if dynamic is False or status_code == 304:
+                return static_result
             
-            metadata = {
-                "description": "",
-                "keywords": "",
-                "author": "",
-                "date": "",
-                "publisher": "",
-                "language": "",
-                "url": url
-            }
+            if html and not self.needs_javascript(html, content_type):
+                self.health.record_javascript(domain, False)
+                return static_result
             
-            meta_tags = soup.find_all('meta')
-            for tag in meta_tags:
-                if tag.get('name') and tag.get('content'):
-                    name = tag['name'].lower()
-                    if name in metadata or name in ['description', 'keywords', 'author', 'date', 'publisher', 'language']:
-                        metadata[name] = tag['content']
-                
-                if tag.get('property') and tag.get('content'):
-                    prop = tag['property'].lower()
-                    if 'og:title' in prop:
-                        metadata['og_title'] = tag['content']
-                    elif 'og:description' in prop:
-                        metadata['og_description'] = tag['content']
-                    elif 'og:site_name' in prop:
-                        metadata['site_name'] = tag['content']
-                    elif 'article:published_time' in prop:
-                        metadata['date'] = tag['content']
+            # Missing pages and rejected downloads will not improve by rendering them
+            if not html and status_code in self.PERMANENT_FAILURES:
+                return static_result
             
-            date_elements = soup.select('time, .date, .published, [itemprop="datePublished"]')
-            if date_elements and not metadata.get('date'):
-                metadata['date'] = date_elements[0].get_text(strip=True)
+            # The host just tripped its circuit breaker; the browser would only time out too
+            if not html and not self.health.is_closed(domain):
+                return static_result
+        
+        rendered = await self._get_page_dynamic(
+            url,
+            wait_for_selector=wait_for_selector,
+            extra_wait=extra_wait
+        )
+        if rendered[0]:
+            if dynamic is None:
+                self.health.record_javascript(domain, True)
+            return rendered
+        
+        # Rendering failed: fall back to whatever plain HTTP can give us
+        if static_result is None:
+            static_result = await self._get_page_simple(url)
+        return static_result if static_result[0] else rendered
+
+    async def _check_robots(self, url: str) -> bool:
+        """Check robots.txt for a URL and apply the host's Crawl-delay."""
+        try:
+            if not await self.robots_checker.can_fetch(url, self.user_agent):
+                return False
             
-            return {
-                "title": title,
-                "text": text,
-                "metadata": metadata
-            }
+            crawl_delay = self.robots_checker.crawl_delay(url, self.user_agent)
+            if crawl_delay:
+                self.scheduler.set_crawl_delay(self.scheduler.domain_of(url), crawl_delay)
         except Exception as e:
-            print(f"BeautifulSoup extraction failed for {url}: {e}")
-            
-        return {
-            "title": url.split("/")[-1] or "Unknown Title",
-            "text": html[:1000] + "...",
-            "metadata": {"url": url, "extraction_failed": True}
-        }
+            # On error, we'll log but continue anyway
+            print(f"Error checking robots.txt for {url}: {e}")
+        return True
+    
+    @staticmethod
+    def _robots_denied(url: str) -> ScrapedContent:
+        error_msg = f"Access to {url} denied by robots.txt"
+        print(error_msg)
+        return ScrapedContent.from_error(url, error_msg, permanent=True)
 
-    async def scrape_url(
+    async def _fetch_with_retries(
         self,
         url: str,
-        dynamic: bool = False,
-        extract_images: bool = False,
-        force_refresh: bool = False,
-        wait_for_selector: Optional[str] = None,
-        extra_wait: int = 0
-    ) -> ScrapedContent:
-        """Scrape content from a URL with caching and error handling."""
-        # Check cache first
-        if not force_refresh:
-            cached_content = self.cache.get(url)
-            if cached_content:
-                return cached_content
-                
-        # Check robots.txt if enabled
-        if self.respect_robots:
-            try:
-                allowed = await self.robots_checker.can_fetch(url, self.user_agent)
-                if not allowed:
-                    error_msg = f"Access to {url} denied by robots.txt"
-                    print(error_msg)
-                    return ScrapedContent.from_error(url, error_msg)
-            except Exception as e:
-                # On error, we'll log but continue anyway
-                print(f"Error checking robots.txt for {url}: {e}")
-        
+        dynamic: Optional[bool],
+        wait_for_selector: Optional[str],
+        extra_wait: int,
+        validators: Optional[Dict[str, str]]
+    ) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+        """Fetch a page, retrying failed attempts with jittered exponential backoff."""
         html = None
         content_type = None
         status_code = None
+        domain = self.scheduler.domain_of(url)
         
         # Try to fetch the content with retries
         for attempt in range(self.max_retries):
+            if attempt > 0:
+                delay = self.health.backoff(attempt - 1)
+                print(f"Waiting {delay:.1f} seconds before retrying {url}...")
+                await asyncio.sleep(delay)
+                # Stop retrying once the host's circuit has opened
+                if not self.health.allow(domain):
+                    break
             try:
-                if dynamic:
-                    html, content_type, status_code = await self._get_page_dynamic(
-                        url, 
+                # Each attempt waits for a polite slot on the URL's host
+                async with self.scheduler.slot(url):
+                    html, content_type, status_code = await self._fetch_page(
+                        url,
+                        dynamic=dynamic,
                         wait_for_selector=wait_for_selector,
-                        extra_wait=extra_wait
+                        extra_wait=extra_wait,
+                        validators=validators
                     )
-                else:
-                    html, content_type, status_code = await self._get_page_simple(url)
                 
-                if html:
+                if html or status_code == 304 or status_code in self.PERMANENT_FAILURES:
                     break
                     
             except Exception as e:
-                delay = (attempt + 1) * 2
                 print(f"Attempt {attempt + 1} failed for {url}: {e}")
-                print(f"Waiting {delay} seconds...")
-                await asyncio.sleep(delay)
+        
+        return html, content_type, status_code
+
+    async def scrape_url(
+        self,
+        url: str,
+        dynamic: Optional[bool] = None,
+        extract_images: bool = False,
+        force_refresh: bool = False,
+        wait_for_selector: Optional[str] = None,
+        extra_wait: int = 0
+    ) -> ScrapedContent:
+        """
+        Scrape content from a URL with caching and error handling.
+        
+        With dynamic=None the page is fetched over plain HTTP first and only
+        rendered in the browser when it looks like it needs JavaScript.
+        """
+        # Check cache first; expired entries with validators are revalidated below
+        stale_content = None
+        if not force_refresh:
+            cached_content = await self.cache.aget(url)
+            if cached_content:
+                return cached_content
+            stale_content = await self.cache.aget_stale(url)
+        validators = stale_content.validators() if stale_content else None
+        
+        # Hosts that keep failing are skipped until their cooldown ends
+        domain = self.scheduler.domain_of(url)
+        if not self.health.allow(domain):
+            error_msg = f"Skipping {url}: circuit open for {domain} after repeated failures"
+            print(error_msg)
+            return ScrapedContent.from_error(url, error_msg)
+                
+        # Check robots.txt if enabled. When the host's rules are not loaded yet,
+        # robots.txt is fetched alongside the first page and settled before the page is used.
+        robots_check = None
+        if self.respect_robots:
+            robots_check = asyncio.ensure_future(self._check_robots(url))
+            if self.robots_checker.is_cached(url):
+                if not await robots_check:
+                    return self._robots_denied(url)
+                robots_check = None
+        
+        # One wall-clock budget covers every attempt, including rendering
+        try:
+            try:
+                html, content_type, status_code = await asyncio.wait_for(
+                    self._fetch_with_retries(url, dynamic, wait_for_selector, extra_wait, validators),
+                    timeout=self.page_budget
+                )
+            except asyncio.TimeoutError:
+                self.response_validators.pop(url, None)
+                error_msg = f"Fetching {url} exceeded the {self.page_budget} second page budget"
+                print(error_msg)
+                return ScrapedContent.from_error(url, error_msg)
+            
+            if robots_check is not None and not await robots_check:
+                self.response_validators.pop(url, None)
+                return self._robots_denied(url)
+        finally:
+            # Stop a robots.txt check nobody awaits any more, e.g. after a cancelled fetch,
+            # and retrieve the outcome of a finished one
+            if robots_check is not None:
+                if not robots_check.done():
+                    robots_check.cancel()
+                elif not robots_check.cancelled():
+                    robots_check.exception()
+        
+        response_validators = self.response_validators.pop(url, {})
+        
+        # Unchanged since we cached it: reuse the stored extraction
+        if status_code == 304 and stale_content is not None:
+            await self.cache.arefresh(url)
+            return stale_content
         
         if not html:
+            if status_code in self.PERMANENT_FAILURES:
+                error_msg = f"Failed to fetch content: HTTP {status_code}"
+                return ScrapedContent.from_error(url, error_msg, status_code, permanent=True)
             error_msg = f"Failed to fetch content after {self.max_retries} attempts"
-            return ScrapedContent.from_error(url, error_msg)
+            return ScrapedContent.from_error(url, error_msg, status_code)
             
-        content = self._extract_content(html, url, content_type)
+        # Parse once, in the extraction pool so large pages don't stall the event loop
+        extraction = await self.extraction_pool.run(
+            extract_content, html, url, content_type,
+            default=failed_extraction(url)
+        )
+        
+        canonicalizer.learn(url, extraction.metadata.get("canonical_url"))
         
         result = ScrapedContent(
             url=url,
-            title=content["title"],
-            text=content["text"],
+            title=extraction.title,
+            text=extraction.text,
             html=html,
-            metadata=content["metadata"],
+            metadata=extraction.metadata,
+            links=extraction.links,
+            fingerprint=extraction.fingerprint,
+            anchors=extraction.anchors,
             content_type=content_type or "text/html",
-            status_code=status_code
+            status_code=status_code,
+            etag=response_validators.get("etag"),
+            last_modified=response_validators.get("last_modified")
         )
         
         if result.is_successful():
             try:
-                self.cache.set(result)
+                # Only shed HTML that can be read back from the cache
+                if await self.cache.aset(result) and self.shed_html:
+                    result.shed_html()
             except Exception as e:
                 print(f"Failed to cache content for {url}: {e}")
             
@@ -656,7 +892,7 @@ class WebScraper:
     async def scrape_urls(
         self,
         urls: List[str],
-        dynamic: bool = False,
+        dynamic: Optional[bool] = None,
         extract_images: bool = False,
         force_refresh: bool = False,
         wait_for_selector: Optional[str] = None,
@@ -667,7 +903,8 @@ class WebScraper:
         
         Args:
             urls: List of URLs to scrape
-            dynamic: Whether to use Playwright for JavaScript rendering
+            dynamic: True to always render with Playwright, False to never render,
+                None to fetch statically and escalate to rendering when needed
             extract_images: Whether to extract image data
             force_refresh: Whether to ignore cache and fetch fresh content
             wait_for_selector: CSS selector to wait for before considering page loaded
@@ -676,33 +913,136 @@ class WebScraper:
         Returns:
             List of ScrapedContent objects
         """
+        unique_urls = self._unique_urls(urls)
+        
+        # Concurrency and per-host politeness are enforced by the scheduler inside scrape_url
+        tasks = [
+            self.scrape_url(
+                url, 
+                dynamic=dynamic, 
+                extract_images=extract_images, 
+                force_refresh=force_refresh,
+                wait_for_selector=wait_for_selector,
+                extra_wait=extra_wait
+            )
+            for url in unique_urls
+        ]
+        results = await asyncio.gather(*tasks)
+        
+        return self._drop_canonical_duplicates(results)
+    
+    async def scrape_iter(
+        self,
+        urls: List[str],
+        dynamic: Optional[bool] = None,
+        extract_images: bool = False,
+        force_refresh: bool = False,
+        wait_for_selector: Optional[str] = None,
+        extra_wait: int = 0,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[ScrapedContent]:
+        """
+        Scrape multiple URLs concurrently, yielding each page as soon as it finishes.
+        
+        Results arrive in completion order, so callers can start processing fast
+        pages while slow ones are still loading. Pages with the same canonical
+        URL as one already yielded are skipped. Pages still loading after
+        deadline seconds are cancelled and yielded as errors. Leaving the loop
+        early cancels the remaining pages.
+        
+        Args:
+            urls: List of URLs to scrape
+            dynamic: True to always render with Playwright, False to never render,
+                None to fetch statically and escalate to rendering when needed
+            extract_images: Whether to extract image data
+            force_refresh: Whether to ignore cache and fetch fresh content
+            wait_for_selector: CSS selector to wait for before considering page loaded
+            extra_wait: Additional time in seconds to wait after page load
+            deadline: Seconds after which unfinished pages are abandoned
+            
+        Yields:
+            ScrapedContent objects
+        """
+        tasks = {
+            asyncio.ensure_future(self.scrape_url(
+                url,
+                dynamic=dynamic,
+                extract_images=extract_images,
+                force_refresh=force_refresh,
+                wait_for_selector=wait_for_selector,
+                extra_wait=extra_wait
+            )): url
+            for url in self._unique_urls(urls)
+        }
+        order = {task: i for i, task in enumerate(tasks)}
+        pending = set(tasks)
+        seen_urls = set()
+        give_up_at = time.monotonic() + deadline if deadline is not None else None
+        
+        try:
+            while pending:
+                timeout = max(0.0, give_up_at - time.monotonic()) if give_up_at is not None else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    print(f"Abandoning {len(pending)} pages still loading after {deadline} seconds")
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    for task in pending:
+                        yield ScrapedContent.from_error(tasks[task], f"Abandoned after the {deadline} second deadline")
+                    pending = set()
+                    break
+                
+                # Keep input order among pages that finished together
+                for task in sorted(done, key=order.get):
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = ScrapedContent.from_error(tasks[task], str(e))
+                    if self._is_canonical_duplicate(result, seen_urls):
+                        continue
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+    
+    @staticmethod
+    def _unique_urls(urls: List[str]) -> List[str]:
+        """Drop URLs whose canonical form was already listed, keeping input order."""
         unique_urls = []
         seen_urls = set()
         
         for url in urls:
-            normalized_url = url.rstrip('/')
-            if normalized_url not in seen_urls:
-                seen_urls.add(normalized_url)
+            canonical_url = canonicalizer.canonicalize(url)
+            if canonical_url not in seen_urls:
+                seen_urls.add(canonical_url)
                 unique_urls.append(url)
         
         if len(unique_urls) < len(urls):
             print(f"Removed {len(urls) - len(unique_urls)} duplicate URLs")
-        
-        async def scrape_with_semaphore(url: str) -> ScrapedContent:
-            async with self.semaphore:
-                return await self.scrape_url(
-                    url, 
-                    dynamic=dynamic, 
-                    extract_images=extract_images, 
-                    force_refresh=force_refresh,
-                    wait_for_selector=wait_for_selector,
-                    extra_wait=extra_wait
-                )
-        
-        tasks = [scrape_with_semaphore(url) for url in unique_urls]
-        results = await asyncio.gather(*tasks)
-        
-        return results
+        return unique_urls
+    
+    @staticmethod
+    def _is_canonical_duplicate(result: ScrapedContent, seen_urls: set) -> bool:
+        """Check a result against the canonical pages seen so far, recording it if new."""
+        if not result.is_successful():
+            return False
+        canonicalizer.learn(result.url, result.metadata.get("canonical_url"))
+        canonical_url = canonicalizer.canonicalize(result.url)
+        if canonical_url in seen_urls:
+            print(f"Dropping {result.url}: same canonical page as an earlier result")
+            return True
+        seen_urls.add(canonical_url)
+        return False
+    
+    @staticmethod
+    def _drop_canonical_duplicates(results: List[ScrapedContent]) -> List[ScrapedContent]:
+        """Keep one page per <link rel=canonical> target, in input order."""
+        seen_urls = set()
+        return [result for result in results if not WebScraper._is_canonical_duplicate(result, seen_urls)]
 
     def chunk_content(
         self,
@@ -807,8 +1147,10 @@ class WebScraper:
     
     async def extract_main_content(self, content: ScrapedContent) -> str:
         """
-        Extract main content from a webpage, filtering out navigation, ads, etc.
-        Uses trafilatura for optimal content extraction with fallback to BeautifulSoup.
+        Get the main content of a webpage, filtered of navigation, ads, etc.
+        
+        The main text is extracted once when the page is scraped, so this no
+        longer parses the HTML again.
         
         Args:
             content: ScrapedContent object
@@ -816,67 +1158,4 @@ class WebScraper:
         Returns:
             Extracted main content text
         """
-        if not content.is_successful() or not content.html:
-            return content.text
-        
-        try:
-            extracted_text = trafilatura.extract(
-                content.html,
-                url=content.url,
-                include_comments=False,
-                include_tables=True,
-                include_images=False,
-                include_links=False,
-                output_format="txt"
-            )
-            
-            if extracted_text and len(extracted_text.strip()) > 100:
-                return extracted_text
-        except Exception as e:
-            print(f"Trafilatura extraction failed for main content: {e}")
-        
-        try:
-            soup = BeautifulSoup(content.html, 'html.parser')
-            
-            for selector in [
-                'nav', 'header', 'footer', 'aside', 
-                '.sidebar', '.navigation', '.menu', '.ad', '.advertisement',
-                '.cookie-notice', '.popup', '#cookie-banner', '.banner',
-                'script', 'style', 'iframe', 'noscript'
-            ]:
-                for element in soup.select(selector):
-                    element.decompose()
-            
-            main_content = None
-            for selector in [
-                'article', 'main', '.content', '.main-content', '#content', '#main',
-                '[role="main"]', '.post', '.entry', '.article-content'
-            ]:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-            
-            if not main_content:
-                main_content = soup.body
-            
-            if not main_content:
-                return content.text
-                
-            lines = []
-            for tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li']:
-                for element in main_content.find_all(tag):
-                    text = element.get_text(strip=True)
-                    if text:
-                        if tag.startswith('h'):
-                            # Add heading level indicator
-                            level = int(tag[1])
-                            prefix = '#' * level
-                            lines.append(f"{prefix} {text}")
-                        else:
-                            lines.append(text)
-            
-            return "\n\n".join(lines)
-            
-        except Exception as e:
-            print(f"BeautifulSoup extraction failed for main content: {e}")
-            return content.text  # Return original text as fallback
+        return content.text
\ No newline at end of file
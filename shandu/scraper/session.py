@@ -0,0 +1,79 @@
+"""Pooled HTTP session management for the scraper."""
+from typing import Dict, Optional
+import asyncio
+import weakref
+import aiohttp
+from ..replay import Archive, RecordingSession, ReplaySession
+
+class HttpSessionPool:
+    """
+    Long-lived aiohttp session with a shared connection pool.
+
+    Sessions are bound to the event loop that created them, so one session is
+    kept per running loop. Connections, DNS results and keep-alive sockets are
+    reused by every fetch made on that loop until close() is called. With an
+    archive, requests are recorded through the session, or replayed from the
+    archive without opening one.
+    """
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 8,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        archive: Optional[Archive] = None
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.archive = archive
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Create a session backed by a pooled connector."""
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout) if self.timeout else None
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers=self.headers
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the pooled session for the running event loop, creating it if needed."""
+        if self.archive is not None and self.archive.replaying:
+            return ReplaySession(self.archive)
+        loop = asyncio.get_running_loop()
+
+        # Drop sessions whose loop has gone away; they can no longer be used or closed
+        for stale_loop in [l for l in self._sessions.keys() if l.is_closed()]:
+            self._sessions.pop(stale_loop, None)
+
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = self._create_session()
+            self._sessions[loop] = session
+        if self.archive is not None:
+            return RecordingSession(session, self.archive)
+        return session
+
+    async def close(self):
+        """Close the session for the running event loop and release its connections."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
@@ -101,6 +101,7 @@ class AISearcher:
         current_datetime = timestamp.strftime("%Y-%m-%d %H:%M:%S")
 
         search_results = await self.searcher.search(query, engines)
+        await self.searcher.close()
         
         # Build content text with date information if available
         content_text = ""
@@ -137,16 +138,53 @@ class AISearcher:
                 if enable_scraping and result.get('url') and len(urls_to_scrape) < self.max_pages_to_scrape:
                     urls_to_scrape.append(result.get('url'))
         
-        # If scraping is enabled, get deeper content from the top results
+        # If scraping is enabled, get deeper content from the top results while
+        # the search results are summarized; pages are added as they arrive
+        scraping = None
         if enable_scraping and urls_to_scrape:
             print(f"Scraping {len(urls_to_scrape)} pages for deeper insights...")
-            scraped_results = await self.scraper.scrape_urls(urls_to_scrape, dynamic=True)
-            
-            # Process scraped content
-            for scraped in scraped_results:
+            scraping = asyncio.ensure_future(self._scrape_content(urls_to_scrape))
+        
+        # --- Multi-stage Prompting Implementation for Refined LLM Output ---
+        try:
+            individual_summaries = await self._summarize_results(search_results)
+            if scraping is not None:
+                content_text += await scraping
+        finally:
+            if scraping is not None and not scraping.done():
+                scraping.cancel()
+                await asyncio.gather(scraping, return_exceptions=True)
+        
+        # Stage 2: Combine individual summaries into a coherent narrative.
+        combined_text = "\n".join(individual_summaries)
+        stage2_prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are an AI that creates coherent narratives from multiple summaries."),
+            ("user", f"Combine the following summaries into a coherent narrative:\n{combined_text}")
+        ])
+        combined_summary = await (stage2_prompt | self.llm).ainvoke({})
+        
+        # Stage 3: Refine the output with structured markdown formatting and contextual guidelines.
+        stage3_prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are an AI that refines narratives. Please output your answer in a structured markdown format with clear sections: Key Findings, Address any conflicting information and note if any data is based on recent search results."),
+            ("user", f"Refine the following narrative for tone, detail, and accuracy:\n{combined_summary.content}")
+        ])
+        final_output = await (stage3_prompt | self.llm).ainvoke({})
+        
+        return AISearchResult(
+            query=query,
+            summary=final_output.content,
+            sources=sources,
+            timestamp=timestamp
+        )
+    
+    async def _scrape_content(self, urls: List[str]) -> str:
+        """Scrape pages and format their main content, in the order they finish."""
+        content_text = ""
+        try:
+            async for scraped in self.scraper.scrape_iter(urls, deadline=config.get("scraper", "batch_deadline", 90)):
                 if scraped.is_successful():
-                    # Extract main content
-                    main_content = await self.scraper.extract_main_content(scraped)
+                    # Main content was extracted when the page was scraped
+                    main_content = scraped.extraction.text
                     
                     # Add a separator between search results and scraped content
                     content_text += "\n" + "-" * 40 + "\n"
@@ -159,10 +197,13 @@ class AISearcher:
                         content_preview += "...(content truncated)..."
                     
                     content_text += content_preview + "\n"
-        
-        # --- Multi-stage Prompting Implementation for Refined LLM Output ---
+        finally:
+            await self.scraper.close()
+        return content_text
+    
+    async def _summarize_results(self, search_results: List[Any]) -> List[str]:
+        """Stage 1: Summarize each search result individually."""
         individual_summaries = []
-        # Stage 1: Summarize each search result individually.
         for result in search_results:
             if isinstance(result, SearchResult):
                 result_text = (
@@ -186,27 +227,7 @@ class AISearcher:
             summary_output = await (stage1_prompt | self.llm).ainvoke({})
             individual_summaries.append(summary_output.content)
         
-        # Stage 2: Combine individual summaries into a coherent narrative.
-        combined_text = "\n".join(individual_summaries)
-        stage2_prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an AI that creates coherent narratives from multiple summaries."),
-            ("user", f"Combine the following summaries into a coherent narrative:\n{combined_text}")
-        ])
-        combined_summary = await (stage2_prompt | self.llm).ainvoke({})
-        
-        # Stage 3: Refine the output with structured markdown formatting and contextual guidelines.
-        stage3_prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an AI that refines narratives. Please output your answer in a structured markdown format with clear sections: Key Findings, Address any conflicting information and note if any data is based on recent search results."),
-            ("user", f"Refine the following narrative for tone, detail, and accuracy:\n{combined_summary.content}")
-        ])
-        final_output = await (stage3_prompt | self.llm).ainvoke({})
-        
-        return AISearchResult(
-            query=query,
-            summary=final_output.content,
-            sources=sources,
-            timestamp=timestamp
-        )
+        return individual_summaries
     
     def search_sync(
         self, 
@@ -1,21 +1,186 @@
 """Search implementation module."""
 from typing import List, Dict, Optional, Union, Any, Tuple
-from langchain_community.tools import DuckDuckGoSearchResults, DuckDuckGoSearchRun
-from googlesearch import search as google_search
+from googlesearch.user_agents import get_useragent
+from bs4 import BeautifulSoup
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from urllib.parse import unquote, urlparse, parse_qs
+import xml.etree.ElementTree as ET
 import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import weakref
+import aiohttp
 import time
-import hashlib
 import json
 import os
+import re
 from pathlib import Path
-import wikipedia
-import arxiv
-from ..config import config, get_user_agent
+from ..config import config, get_cache_dir, get_user_agent
+from ..cache import CacheStore, remove_legacy_files
+from ..urls import canonicalize
+from ..replay import Archive, search_through, shared_archive
+from ..scraper.session import HttpSessionPool
+
+GOOGLE_SEARCH_URL = "https://www.google.com/search"
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+DUCKDUCKGO_URL = "https://duckduckgo.com/"
+DUCKDUCKGO_NEWS_URL = "https://duckduckgo.com/news.js"
+DUCKDUCKGO_HTML_URL = "https://html.duckduckgo.com/html/"
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+
+# DuckDuckGo's safe search values for the news endpoint
+DUCKDUCKGO_SAFESEARCH = {"on": "1", "moderate": "-1", "off": "-2"}
+
+ATOM_NS = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
+
+# Articles change slowly; their extracts are kept longer than query hits
+WIKIPEDIA_EXTRACT_TTL = 7 * 86400
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+def parse_google_results(html: str) -> List[Dict[str, str]]:
+    """Read url, title and description of each result from Google's plain result markup."""
+    results = []
+    seen = set()
+    soup = BeautifulSoup(html, "html.parser")
+    for block in soup.find_all("div", class_="ezO2md"):
+        link_tag = block.find("a", href=True)
+        if link_tag is None:
+            continue
+        url = unquote(link_tag["href"].split("&")[0].replace("/url?q=", ""))
+        if not url.startswith(("http://", "https://")) or url in seen:
+            continue
+        seen.add(url)
+        title_tag = link_tag.find("span", class_="CVA68e")
+        description_tag = block.find("span", class_="FrIlee")
+        results.append({
+            "url": url,
+            "title": title_tag.get_text() if title_tag else "",
+            "description": description_tag.get_text() if description_tag else ""
+        })
+    return results
+
+def extract_vqd(html: str) -> str:
+    """Read the vqd token DuckDuckGo's JSON endpoints require from its search page."""
+    match = re.search(r"""vqd=["']?([\d-]+)""", html)
+    if match is None:
+        raise ValueError("DuckDuckGo page has no vqd token")
+    return match.group(1)
+
+def parse_duckduckgo_news(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Read title, url, snippet, date and publisher of each result of DuckDuckGo's news endpoint."""
+    results = []
+    seen = set()
+    for row in data.get("results", []):
+        url = unquote(row.get("url") or "")
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        date = None
+        if row.get("date"):
+            date = datetime.fromtimestamp(row["date"], timezone.utc).isoformat()
+        results.append({
+            "title": row.get("title") or url,
+            "url": url,
+            "snippet": BeautifulSoup(row.get("excerpt") or "", "html.parser").get_text(),
+            "date": date,
+            "publisher": row.get("source")
+        })
+    return results
+
+def parse_duckduckgo_html(html: str) -> List[Dict[str, Any]]:
+    """Read title, url and snippet of each result from DuckDuckGo's HTML-only results page."""
+    results = []
+    seen = set()
+    soup = BeautifulSoup(html, "html.parser")
+    for block in soup.select("div.result"):
+        if "result--ad" in block.get("class", []):
+            continue
+        link_tag = block.select_one("a.result__a")
+        if link_tag is None or not link_tag.get("href"):
+            continue
+        url = link_tag["href"]
+        # Result links go through DuckDuckGo's redirect, with the target in uddg
+        if urlparse(url).path == "/l/":
+            url = parse_qs(urlparse(url).query).get("uddg", [""])[0]
+        if url.startswith("//"):
+            url = "https:" + url
+        if not url.startswith(("http://", "https://")) or url in seen:
+            continue
+        seen.add(url)
+        snippet_tag = block.select_one(".result__snippet")
+        results.append({
+            "title": link_tag.get_text(" ", strip=True) or url,
+            "url": url,
+            "snippet": snippet_tag.get_text(" ", strip=True) if snippet_tag else "",
+            "date": None,
+            "publisher": None
+        })
+    return results
+
+def parse_arxiv_feed(feed: str) -> List[Dict[str, Any]]:
+    """Read each paper of an arXiv API Atom feed."""
+    papers = []
+    root = ET.fromstring(feed)
+
+    def text(element, path: str) -> str:
+        found = element.find(path, ATOM_NS)
+        return " ".join(found.text.split()) if found is not None and found.text else ""
+
+    for entry in root.findall("atom:entry", ATOM_NS):
+        entry_id = text(entry, "atom:id")
+        if not entry_id:
+            continue
+        pdf_url = None
+        for link in entry.findall("atom:link", ATOM_NS):
+            if link.get("title") == "pdf":
+                pdf_url = link.get("href")
+        papers.append({
+            "entry_id": entry_id,
+            "title": text(entry, "atom:title"),
+            "summary": text(entry, "atom:summary"),
+            "published": text(entry, "atom:published"),
+            "authors": [text(author, "atom:name") for author in entry.findall("atom:author", ATOM_NS)],
+            "categories": [c.get("term") for c in entry.findall("atom:category", ATOM_NS) if c.get("term")],
+            "pdf_url": pdf_url,
+            "doi": text(entry, "arxiv:doi") or None
+        })
+    return papers
+
+class EngineLimits:
+    """
+    Per-engine caps on concurrent searches.
+    
+    Semaphores are bound to the event loop that uses them, so one set is kept
+    per running loop.
+    """
+    def __init__(self, limits: Dict[str, int], default: int = 2):
+        self.limits = limits
+        self.default = default
+        self._semaphores = weakref.WeakKeyDictionary()
+    
+    def limit(self, engine: str) -> int:
+        return max(1, int(self.limits.get(engine, self.default)))
+    
+    @asynccontextmanager
+    async def slot(self, engine: str):
+        """Hold one of the engine's search slots for the duration of the block."""
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.get(loop)
+        if semaphores is None:
+            semaphores = {}
+            self._semaphores[loop] = semaphores
+        semaphore = semaphores.get(engine)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit(engine))
+            semaphores[engine] = semaphore
+        async with semaphore:
+            yield
 
 class SearchResult:
     """Container for search results from various engines."""
+    __slots__ = ("title", "url", "snippet", "source", "date", "metadata")
+    
     def __init__(
         self, 
         title: str, 
@@ -47,76 +212,121 @@ class SearchResult:
         }
 
 class SearchCache:
-    """Cache for search results to improve performance."""
-    def __init__(self, cache_dir: Optional[str] = None, ttl: int = 3600):
-        self.cache_dir = cache_dir or os.path.expanduser("~/.shandu/cache/search")
+    """
+    Cache for search results to improve performance.
+    
+    Results live in one indexed SQLite store keyed by engine and normalized
+    query, with a bounded in-memory LRU tier in front. Expired entries are
+    purged and the store is kept under max_bytes by a background thread.
+    aget/aset keep the disk work off the event loop. close() releases the
+    store; it is reopened on the next access.
+    """
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl: int = 3600,
+        max_bytes: Optional[int] = None,
+        memory_items: int = 256,
+        purge_interval: float = 600
+    ):
+        self.cache_dir = cache_dir or get_cache_dir("search")
         self.ttl = ttl  # Time to live in seconds
-        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes or config.get("search", "cache_max_bytes", 64 * 1024 * 1024)
+        self.memory_items = memory_items
+        self.purge_interval = purge_interval
+        self.path = os.path.join(self.cache_dir, "search.db")
+        self._store: Optional[CacheStore] = None
+        self._store_lock = threading.Lock()
+        
+        # The per-query JSON files of the old format are only cleaned up when the store is first created
+        if not os.path.exists(self.path):
+            remove_legacy_files(self.cache_dir)
+    
+    @property
+    def store(self) -> CacheStore:
+        """The open store, reopened after close()."""
+        with self._store_lock:
+            if self._store is None:
+                self._store = CacheStore(
+                    self.path,
+                    ttl=self.ttl,
+                    max_bytes=self.max_bytes,
+                    memory_items=self.memory_items,
+                    purge_interval=self.purge_interval
+                )
+            return self._store
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query so case and spacing variants share an entry."""
+        return " ".join(query.lower().split())
     
     def _get_cache_key(self, query: str, engine: str) -> str:
         """Generate a cache key from query and engine."""
-        hash_key = hashlib.md5(f"{query}:{engine}".encode()).hexdigest()
-        return hash_key
+        return f"{engine}:{self.normalize_query(query)}"
     
-    def _get_cache_path(self, key: str) -> str:
-        """Get file path for cache key."""
-        return os.path.join(self.cache_dir, f"{key}.json")
+    @staticmethod
+    def _to_record(results: List[Any]) -> Dict[str, Any]:
+        """Serialize results; the JSON goes into a compressed blob that counts toward max_bytes."""
+        serializable_results = []
+        for r in results:
+            if hasattr(r, 'to_dict'):
+                serializable_results.append(r.to_dict())
+            elif isinstance(r, dict):
+                serializable_results.append(r)
+            # Skip non-serializable results
+        return {"results": json.dumps(serializable_results)}
+    
+    @staticmethod
+    def _from_record(record: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        if not record or "results" not in record:
+            return None
+        return json.loads(record["results"])
     
     def get(self, query: str, engine: str) -> Optional[List[Dict[str, Any]]]:
         """Get cached results if available and not expired."""
-        key = self._get_cache_key(query, engine)
-        path = self._get_cache_path(key)
-        
-        if os.path.exists(path):
-            try:
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                
-                # Check if cache is expired
-                if time.time() - data['timestamp'] <= self.ttl:
-                    return data['results']
-            except Exception as e:
-                print(f"Error reading cache: {e}")
-        
-        return None
+        try:
+            return self._from_record(self.store.get(self._get_cache_key(query, engine)))
+        except Exception as e:
+            print(f"Error reading cache: {e}")
+            return None
     
-    def set(self, query: str, engine: str, results: List[Any]):
-        """Cache search results."""
+    def set(self, query: str, engine: str, results: List[Any], ttl: Optional[int] = None):
+        """Cache search results, for ttl seconds if given instead of the cache's default."""
         try:
-            key = self._get_cache_key(query, engine)
-            path = self._get_cache_path(key)
-            
-            # Create serializable results
-            serializable_results = []
-            for r in results:
-                if hasattr(r, 'to_dict'):
-                    serializable_results.append(r.to_dict())
-                elif isinstance(r, dict):
-                    serializable_results.append(r)
-                else:
-                    # Skip non-serializable results
-                    continue
-            
-            with open(path, 'w') as f:
-                json.dump({
-                    'timestamp': time.time(),
-                    'results': serializable_results
-                }, f)
-                
+            self.store.set(self._get_cache_key(query, engine), self._to_record(results), ("results",), ttl)
         except Exception as e:
             print(f"Error caching search results: {e}")
             # Failures should be silent - don't impact the main functionality
+    
+    async def aget(self, query: str, engine: str) -> Optional[List[Dict[str, Any]]]:
+        """Get cached results without blocking the event loop."""
+        try:
+            return self._from_record(await self.store.aget(self._get_cache_key(query, engine)))
+        except Exception as e:
+            print(f"Error reading cache: {e}")
+            return None
+    
+    async def aset(self, query: str, engine: str, results: List[Any], ttl: Optional[int] = None):
+        """Cache search results without blocking the event loop."""
+        try:
+            await self.store.aset(self._get_cache_key(query, engine), self._to_record(results), ("results",), ttl)
+        except Exception as e:
+            print(f"Error caching search results: {e}")
+    
+    def close(self):
+        """Stop background expiry and close the store."""
+        with self._store_lock:
+            store, self._store = self._store, None
+        if store is not None:
+            store.close()
 
 class UnifiedSearcher:
     """
     Unified search interface combining results from multiple search engines.
     Supports DuckDuckGo, Google, Wikipedia, and arXiv with caching and parallel processing.
-    Uses a shared ThreadPoolExecutor for better resource management.
+    Every engine has a native async client on one pooled HTTP session.
     """
-    # Class-level executor for thread pool reuse
-    _executor = None
-    _executor_lock = None
-    
     def __init__(
         self,
         proxy: Optional[str] = None,
@@ -126,211 +336,168 @@ class UnifiedSearcher:
         timelimit: Optional[str] = None,
         backend: str = "news",
         cache_ttl: int = 3600,
-        user_agent: Optional[str] = None
+        user_agent: Optional[str] = None,
+        archive: Optional[Archive] = None
     ):
         self.max_results = max_results
         self.proxy = proxy or config.get("scraper", "proxy")
         self.user_agent = user_agent or get_user_agent()
         
-        # Initialize DuckDuckGo searchers
-        self.ddg_results = DuckDuckGoSearchResults(
-            backend=backend,
-            region=region,
-            safesearch=safesearch,
-            timelimit=timelimit,
-            max_results=max_results
-        )
-        self.ddg_run = DuckDuckGoSearchRun()
+        # DuckDuckGo options; the news backend queries its news endpoint, any other its HTML results
+        self.region = region
+        self.safesearch = safesearch
+        self.timelimit = timelimit
+        self.backend = backend
         
         # Initialize cache
         self.cache = SearchCache(ttl=cache_ttl)
         
-        # Use a shared executor for better resource management
-        if not hasattr(UnifiedSearcher, '_executor'):
-            UnifiedSearcher._executor_lock = threading.Lock()
-            with UnifiedSearcher._executor_lock:
-                if not hasattr(UnifiedSearcher, '_executor'):
-                    UnifiedSearcher._executor = ThreadPoolExecutor(max_workers=6)
+        # Record/replay archive for offline runs, from the replay config section by default
+        self.archive = archive if archive is not None else shared_archive()
         
-        self.executor = UnifiedSearcher._executor
+        # Engine searches in flight, keyed by engine and normalized query
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.coalesced_searches = 0
+        
+        # Pooled HTTP session shared by the engine clients, and per-engine concurrency caps
+        self.session_pool = HttpSessionPool(
+            limit=config.get("search", "max_connections", 20),
+            limit_per_host=config.get("search", "max_connections_per_host", 4),
+            archive=self.archive
+        )
+        self.engine_limits = EngineLimits(config.get("search", "engine_concurrency", {}))
         
         # Add request timeout to prevent hanging
         self.request_timeout = 10  # 10 second timeout for all requests
 
+    def _request_kwargs(self, headers: Dict[str, str], **kwargs) -> Dict[str, Any]:
+        """Keyword arguments of one engine request: headers, timeout and proxy."""
+        kwargs['headers'] = headers
+        kwargs['timeout'] = aiohttp.ClientTimeout(total=self.request_timeout)
+        if self.proxy and self.proxy.strip():
+            kwargs['proxy'] = self.proxy
+        return kwargs
+    
+    # Hosts Google results are dropped from: social, shopping and streaming sites
+    GOOGLE_IRRELEVANT_DOMAINS = [
+        "pinterest", "instagram", "facebook", "twitter", 
+        "youtube", "tiktok", "reddit", "quora", "linkedin",
+        "msn.com/en-us/money", "msn.com/en-us/lifestyle",
+        "msn.com/en-us/entertainment", "msn.com/en-us/travel",
+        "amazon.com", "ebay.com", "etsy.com", "walmart.com", 
+        "target.com", "netflix.com", "hulu.com", "spotify.com"
+    ]
+    
+    async def _fetch_google(self, query: str, count: int) -> List[Dict[str, str]]:
+        """Fetch one page of Google results over the pooled session."""
+        headers = {
+            # Google serves the plain result markup parse_google_results reads to text browsers
+            'User-Agent': get_useragent(),
+            'Accept': '*/*',
+            # Skips the consent page
+            'Cookie': 'CONSENT=PENDING+987; SOCS=CAESHAgBEhIaAB'
+        }
+        params = {"q": query, "num": str(count + 2), "hl": "en", "start": "0", "safe": "active"}
+        kwargs = self._request_kwargs(headers, params=params)
+        
+        session = await self.session_pool.get_session()
+        async with session.get(GOOGLE_SEARCH_URL, **kwargs) as response:
+            response.raise_for_status()
+            html = await response.text()
+        return parse_google_results(html)[:count]
+    
     async def _async_google_search(self, query: str, num_results: int) -> List[SearchResult]:
-        """Execute Google search asynchronously."""
+        """
+        Execute Google search asynchronously.
+        
+        Requests go through the shared aiohttp pool, so a slow Google never
+        blocks the event loop. At most the configured number of Google searches
+        run at once, and each call gives up at its deadline, counted from when it
+        starts waiting for a slot and covering its retries.
+        """
         results = []
         try:
             search_query = self._humanize_query(query)
             
-            cached_results = self.cache.get(search_query, "google")
+            cached_results = await self.cache.aget(search_query, "google")
             if cached_results:
                 return [SearchResult(**r) for r in cached_results]
             
-            headers = {'User-Agent': self.user_agent}
+            async def attempts():
+                async with self.engine_limits.slot("google"):
+                    return await self._google_attempts(query, search_query, num_results)
             
-            for attempt in range(3):
-                try:
-                    print(f"Executing Google search for: {search_query}")
-                    
-                    search_results = list(google_search(
-                        search_query, 
-                        num_results=num_results * 2,
-                        proxy=self.proxy,
-                        timeout=15,
-                        unique=True, 
-                        advanced=True
-                    ))
-                    
-                    if search_results and len(search_results) > 0:
-                        first_result = search_results[0]
-                        print(f"Google search result type: {type(first_result)}")
-                        if hasattr(first_result, '__dict__'):
-                            print(f"Google search result attributes: {first_result.__dict__}")
-                        else:
-                            print(f"Google search result dir: {dir(first_result)}")
-                    
-                    filtered_results = []
-                    irrelevant_domains = [
-                        "pinterest", "instagram", "facebook", "twitter", 
-                        "youtube", "tiktok", "reddit", "quora", "linkedin",
-                        "msn.com/en-us/money", "msn.com/en-us/lifestyle",
-                        "msn.com/en-us/entertainment", "msn.com/en-us/travel",
-                        "amazon.com", "ebay.com", "etsy.com", "walmart.com", 
-                        "target.com", "netflix.com", "hulu.com", "spotify.com"
-                    ]
-                    
-                    for result in search_results:
-                        try:
-                            if hasattr(result, 'url') and hasattr(result, 'title'):
-                                url = result.url
-                                if url and isinstance(url, str) and any(domain in url.lower() for domain in irrelevant_domains):
-                                    continue
-                                
-                                snippet = ""
-                                if hasattr(result, 'description'):
-                                    snippet = result.description
-                                
-                                filtered_results.append(
-                                    SearchResult(
-                                        title=result.title,
-                                        url=url,
-                                        snippet=snippet,
-                                        source="Google"
-                                    )
-                                )
-                            elif isinstance(result, dict):
-                                url = result.get('url', '')
-                                if url and isinstance(url, str) and any(domain in url.lower() for domain in irrelevant_domains):
-                                    continue
-                                    
-                                filtered_results.append(
-                                    SearchResult(
-                                        title=result.get('title', result.get('url', 'Untitled')),
-                                        url=url,
-                                        snippet=result.get('description', ''),
-                                        source="Google",
-                                        date=result.get('date')
-                                    )
-                                )
-                            elif isinstance(result, str):
-                                if any(domain in result.lower() for domain in irrelevant_domains):
-                                    continue
-                                    
-                                filtered_results.append(
-                                    SearchResult(
-                                        title=result,
-                                        url=result,
-                                        snippet="",
-                                        source="Google"
-                                    )
-                                )
-                            else:
-                                print(f"Skipping unknown result type: {type(result)}")
-                        except Exception as e:
-                            print(f"Error processing search result: {e}")
-                            continue
-                    
-                    if filtered_results:
-                        query_keywords = query.lower().split()
-                        important_keywords = [word for word in query_keywords 
-                                             if len(word) > 3 and word not in ["from", "with", "that", "this", "what", "when", "where", "which", "while"]]
-                        
-                        scored_results = []
-                        for result in filtered_results:
-                            score = 0
-                            title_lower = result.title.lower() if result.title else ""
-                            for keyword in important_keywords:
-                                if keyword in title_lower:
-                                    score += 3
-                            
-                            snippet_lower = result.snippet.lower() if result.snippet else ""
-                            for keyword in important_keywords:
-                                if keyword in snippet_lower:
-                                    score += 1
-                            
-                            scored_results.append((score, result))
-                        
-                        scored_results.sort(reverse=True, key=lambda x: x[0])
-                        results = [result for score, result in scored_results[:num_results]]
-                    else:
-                        results = []
-                        for result in search_results[:num_results]:
-                            try:
-                                if hasattr(result, 'url') and hasattr(result, 'title'):
-                                    snippet = ""
-                                    if hasattr(result, 'description'):
-                                        snippet = result.description
-                                    
-                                    results.append(SearchResult(
-                                        title=result.title,
-                                        url=result.url,
-                                        snippet=snippet,
-                                        source="Google"
-                                    ))
-                                elif isinstance(result, dict):
-                                    results.append(SearchResult(
-                                        title=result.get('title', result.get('url', 'Untitled')),
-                                        url=result.get('url', ''),
-                                        snippet=result.get('description', ''),
-                                        source="Google"
-                                    ))
-                                elif isinstance(result, str):
-                                    results.append(SearchResult(
-                                        title=result,
-                                        url=result,
-                                        snippet="",
-                                        source="Google"
-                                    ))
-                            except Exception as e:
-                                print(f"Error converting search result: {e}")
-                    
-                    break
-                except Exception as e:
-                    print(f"Google search attempt {attempt+1} failed: {e}")
-                    if attempt < 2:
-                        await asyncio.sleep(2 ** attempt)
+            deadline = config.get("search", "google_deadline", 30)
+            results = await asyncio.wait_for(attempts(), deadline)
             
             if results:
-                try:
-                    result_dicts = []
-                    for r in results:
-                        if isinstance(r, SearchResult):
-                            result_dicts.append(r.to_dict())
-                        elif isinstance(r, dict):
-                            result_dicts.append(r)
-                        else:
-                            print(f"Warning: Skipping non-serializable result: {type(r)}")
-                    
-                    self.cache.set(search_query, "google", result_dicts)
-                except Exception as e:
-                    print(f"Error caching Google search results: {e}")
+                await self.cache.aset(search_query, "google", [r.to_dict() for r in results])
                 
+        except asyncio.TimeoutError:
+            print(f"Google search for '{query}' gave up after its deadline")
         except Exception as e:
             print(f"Google search error: {e}")
             
         return results
     
+    async def _google_attempts(self, query: str, search_query: str, num_results: int) -> List[SearchResult]:
+        """Fetch, filter and rank Google results, retrying failed fetches with backoff."""
+        for attempt in range(3):
+            try:
+                print(f"Executing Google search for: {search_query}")
+                search_results = await self._fetch_google(search_query, num_results * 2)
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Google search attempt {attempt+1} failed: {e}")
+                if attempt < 2:
+                    await asyncio.sleep(2 ** attempt)
+        else:
+            return []
+        
+        filtered_results = []
+        for result in search_results:
+            url = result.get('url', '')
+            if url and any(domain in url.lower() for domain in self.GOOGLE_IRRELEVANT_DOMAINS):
+                continue
+            filtered_results.append(SearchResult(
+                title=result.get('title') or url or 'Untitled',
+                url=url,
+                snippet=result.get('description', ''),
+                source="Google"
+            ))
+        
+        query_keywords = query.lower().split()
+        important_keywords = [word for word in query_keywords 
+                             if len(word) > 3 and word not in ["from", "with", "that", "this", "what", "when", "where", "which", "while"]]
+        
+        scored_results = []
+        for result in filtered_results:
+            score = 0
+            title_lower = result.title.lower() if result.title else ""
+            for keyword in important_keywords:
+                if keyword in title_lower:
+                    score += 3
+            
+            snippet_lower = result.snippet.lower() if result.snippet else ""
+            for keyword in important_keywords:
+                if keyword in snippet_lower:
+                    score += 1
+            
+            scored_results.append((score, result))
+        
+        scored_results.sort(reverse=True, key=lambda x: x[0])
+        if scored_results:
+            return [result for score, result in scored_results[:num_results]]
+        
+        # Everything was filtered out; better an off-topic result than none
+        return [
+            SearchResult(title=r.get('title') or r.get('url') or 'Untitled', url=r.get('url', ''),
+                         snippet=r.get('description', ''), source="Google")
+            for r in search_results[:num_results]
+        ]
+    
     def _humanize_query(self, query: str) -> str:
         """Make search queries more human-like for better results."""
         # Remove excessive punctuation and formatting
@@ -349,135 +516,131 @@ class UnifiedSearcher:
             
         return query
 
-    def _parse_ddg_results(self, results_str: str) -> List[SearchResult]:
-        """Parse DuckDuckGo results with improved error handling."""
-        results = []
-        if not results_str or "snippet:" not in results_str:
-            return results  # Return empty list if input is invalid
+    async def _query_wikipedia(self, params: Dict[str, str]) -> List[Dict[str, str]]:
+        """
+        Send one MediaWiki API query returning the intro extract and URL of each page.
         
-        entries = results_str.split("snippet:")
-        for entry in entries[1:]:  # Skip first empty split
-            try:
-                snippet_end = entry.find(", title:")
-                title_end = entry.find(", link:")
-                link_end = entry.find(", date:") if ", date:" in entry else entry.find(", source:") 
-                date_end = entry.find(", source:") if ", date:" in entry else -1
-                
-                snippet = entry[:snippet_end].strip() if snippet_end > 0 else ""
-                title = (entry[entry.find(", title:") + len(", title:"):title_end].strip() 
-                        if title_end > snippet_end else "Untitled")
-                link = (entry[entry.find(", link:") + len(", link:"):link_end].strip() 
-                        if link_end > title_end else "")
-                
-                date = None
-                if ", date:" in entry and date_end > link_end:
-                    date = entry[entry.find(", date:") + len(", date:"):date_end].strip()
-                
-                source = "DuckDuckGo"
-                
-                results.append(SearchResult(
-                    title=title,
-                    url=link,
-                    snippet=snippet,
-                    source=source,
-                    date=date
-                ))
-            except Exception as e:
-                print(f"Error parsing DuckDuckGo result: {e}")
-                continue
-        return results
+        Disambiguation and missing pages are left out; pages come back in
+        search rank order when the query is a search.
+        """
+        request_params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "redirects": "1",
+            "prop": "extracts|info|pageprops",
+            # Extracts of several pages in one request are only available for intros
+            "exintro": "1",
+            "explaintext": "1",
+            "exlimit": "max",
+            "inprop": "url",
+            "ppprop": "disambiguation"
+        }
+        request_params.update(params)
+        kwargs = self._request_kwargs({'User-Agent': self.user_agent}, params=request_params)
+        
+        session = await self.session_pool.get_session()
+        async with self.engine_limits.slot("wikipedia"):
+            async with session.get(WIKIPEDIA_API_URL, **kwargs) as response:
+                response.raise_for_status()
+                data = await response.json()
+        
+        pages = sorted(data.get("query", {}).get("pages", []), key=lambda page: page.get("index", 0))
+        return [
+            {"title": page["title"], "url": page.get("fullurl", ""), "extract": page.get("extract", "")}
+            for page in pages
+            if not page.get("missing") and "disambiguation" not in page.get("pageprops", {})
+            and page.get("extract")
+        ]
     
     async def _search_wikipedia(self, query: str, max_results: int = 3) -> List[SearchResult]:
-        """Search Wikipedia for information."""
-        results = []
+        """
+        Search Wikipedia for information.
         
-        # Check cache first
-        cached_results = self.cache.get(query, "wikipedia")
-        if cached_results:
-            return [SearchResult(**r) for r in cached_results]
+        One batched MediaWiki query returns the hits together with their
+        extracts and URLs. The titles a query hit and each title's extract are
+        cached separately, so queries landing on known articles only fetch the
+        extracts they are missing, in a single request.
+        """
+        results = []
         
         try:
-            # Make search more specific for Wikipedia
-            search_query = f"{query} information facts"
-            
-            # Run in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            search_results = await loop.run_in_executor(
-                self.executor, 
-                lambda: wikipedia.search(search_query, results=max_results)
-            )
-            
-            for title in search_results:
-                try:
-                    # Get page content with more sentences for better context
-                    page_summary = await loop.run_in_executor(
-                        self.executor,
-                        lambda t=title: wikipedia.summary(t, sentences=5, auto_suggest=False)
-                    )
-                    
-                    # Get page URL
-                    page_url = await loop.run_in_executor(
-                        self.executor,
-                        lambda t=title: wikipedia.page(t, auto_suggest=False).url
-                    )
-                    
-                    # Get full page content for better research
-                    try:
-                        page_content = await loop.run_in_executor(
-                            self.executor,
-                            lambda t=title: wikipedia.page(t, auto_suggest=False).content
-                        )
-                        # Extract first 2000 chars of content for more comprehensive information
-                        full_content = page_content[:2000] + "..." if len(page_content) > 2000 else page_content
-                    except Exception:
-                        full_content = page_summary
-                    
-                    results.append(SearchResult(
-                        title=title,
-                        url=page_url,
-                        snippet=page_summary,
-                        source="Wikipedia",
-                        metadata={
-                            "type": "encyclopedia",
-                            "full_content": full_content
-                        }
-                    ))
-                except (wikipedia.exceptions.DisambiguationError, 
-                        wikipedia.exceptions.PageError) as e:
-                    print(f"Wikipedia error for '{title}': {e}")
-                    continue
-                except Exception as e:
-                    print(f"Error processing Wikipedia page '{title}': {e}")
-                    continue
+            extracts = []
+            hits = await self.cache.aget(query, "wikipedia-hits")
+            if hits:
+                titles = [hit["title"] for hit in hits][:max_results]
+                known = {}
+                missing = []
+                for title in titles:
+                    cached = await self.cache.aget(title, "wikipedia-extract")
+                    if cached:
+                        known[title] = cached[0]
+                    else:
+                        missing.append(title)
+                if missing:
+                    for extract in await self._query_wikipedia({"titles": "|".join(missing)}):
+                        known[extract["title"]] = extract
+                        await self.cache.aset(extract["title"], "wikipedia-extract", [extract], WIKIPEDIA_EXTRACT_TTL)
+                extracts = [known[title] for title in titles if title in known]
+            else:
+                # Make search more specific for Wikipedia
+                search_query = f"{query} information facts"
+                extracts = await self._query_wikipedia({
+                    "generator": "search",
+                    "gsrsearch": search_query,
+                    "gsrlimit": str(max_results),
+                    "gsrnamespace": "0"
+                })
+                if extracts:
+                    await self.cache.aset(query, "wikipedia-hits", [{"title": e["title"]} for e in extracts])
+                    for extract in extracts:
+                        await self.cache.aset(extract["title"], "wikipedia-extract", [extract], WIKIPEDIA_EXTRACT_TTL)
             
-            # Cache results
-            if results:
-                try:
-                    # Ensure we're storing dictionaries, not SearchResult objects
-                    result_dicts = []
-                    for r in results:
-                        if isinstance(r, SearchResult):
-                            result_dicts.append(r.to_dict())
-                        elif isinstance(r, dict):
-                            result_dicts.append(r)
-                        else:
-                            print(f"Warning: Skipping non-serializable result: {type(r)}")
-                    
-                    self.cache.set(query, "wikipedia", result_dicts)
-                except Exception as e:
-                    print(f"Error caching Wikipedia search results: {e}")
+            for extract in extracts:
+                text = extract["extract"]
+                # The first few sentences serve as the snippet
+                summary = " ".join(SENTENCE_BOUNDARY.split(text)[:5])
+                full_content = text[:2000] + "..." if len(text) > 2000 else text
+                results.append(SearchResult(
+                    title=extract["title"],
+                    url=extract["url"],
+                    snippet=summary,
+                    source="Wikipedia",
+                    metadata={
+                        "type": "encyclopedia",
+                        "full_content": full_content
+                    }
+                ))
                 
         except Exception as e:
             print(f"Wikipedia search error: {e}")
             
         return results
     
+    async def _fetch_arxiv(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """Query the arXiv API for the most relevant papers."""
+        params = {
+            "search_query": query,
+            "sortBy": "relevance",
+            "sortOrder": "descending",
+            "start": "0",
+            "max_results": str(max_results)
+        }
+        kwargs = self._request_kwargs({'User-Agent': self.user_agent}, params=params)
+        
+        session = await self.session_pool.get_session()
+        async with self.engine_limits.slot("arxiv"):
+            async with session.get(ARXIV_API_URL, **kwargs) as response:
+                response.raise_for_status()
+                feed = await response.text()
+        return parse_arxiv_feed(feed)
+    
     async def _search_arxiv(self, query: str, max_results: int = 3) -> List[SearchResult]:
         """Search arXiv for academic papers."""
         results = []
         
         # Check cache first
-        cached_results = self.cache.get(query, "arxiv")
+        cached_results = await self.cache.aget(query, "arxiv")
         if cached_results:
             return [SearchResult(**r) for r in cached_results]
         
@@ -485,64 +648,37 @@ class UnifiedSearcher:
             # Make search more academic for arXiv
             search_query = f"{query} research paper"
             
-            # Run in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            search_results = await loop.run_in_executor(
-                self.executor,
-                lambda: list(arxiv.Search(
-                    query=search_query,
-                    max_results=max_results,
-                    sort_by=arxiv.SortCriterion.Relevance
-                ).results())
-            )
-            
-            for paper in search_results:
+            for paper in await self._fetch_arxiv(search_query, max_results):
                 # Extract full summary for better research
-                full_summary = paper.summary
+                full_summary = paper["summary"]
                 
                 # Create a more comprehensive snippet
                 snippet = full_summary[:500] + "..." if len(full_summary) > 500 else full_summary
                 
                 # Get both PDF and abstract URLs for more flexibility
-                pdf_url = paper.pdf_url
-                abstract_url = paper.entry_id.replace("http://", "https://") if paper.entry_id else pdf_url
+                pdf_url = paper["pdf_url"]
+                abstract_url = paper["entry_id"].replace("http://", "https://")
                 
                 # Use abstract URL as primary since it's more readable in browser
-                primary_url = abstract_url
-                
                 results.append(SearchResult(
-                    title=paper.title,
-                    url=primary_url,
+                    title=paper["title"],
+                    url=abstract_url,
                     snippet=snippet,
                     source="arXiv",
-                    date=paper.published.strftime("%Y-%m-%d") if paper.published else None,
+                    date=paper["published"][:10] or None,
                     metadata={
-                        "authors": [author.name for author in paper.authors],
-                        "categories": paper.categories,
+                        "authors": paper["authors"],
+                        "categories": paper["categories"],
                         "type": "academic_paper",
                         "pdf_url": pdf_url,
                         "abstract_url": abstract_url,
                         "full_summary": full_summary,
-                        "doi": paper.doi
+                        "doi": paper["doi"]
                     }
                 ))
             
-            # Cache results
             if results:
-                try:
-                    # Ensure we're storing dictionaries, not SearchResult objects
-                    result_dicts = []
-                    for r in results:
-                        if isinstance(r, SearchResult):
-                            result_dicts.append(r.to_dict())
-                        elif isinstance(r, dict):
-                            result_dicts.append(r)
-                        else:
-                            print(f"Warning: Skipping non-serializable result: {type(r)}")
-                    
-                    self.cache.set(query, "arxiv", result_dicts)
-                except Exception as e:
-                    print(f"Error caching arXiv search results: {e}")
+                await self.cache.aset(query, "arxiv", [r.to_dict() for r in results])
                 
         except Exception as e:
             print(f"arXiv search error: {e}")
@@ -564,16 +700,16 @@ class UnifiedSearcher:
         
         # Start all searches concurrently
         if "duckduckgo" in engines:
-            tasks.append(self._search_duckduckgo(query))
+            tasks.append(self._search_engine("duckduckgo", query, lambda: self._search_duckduckgo(query)))
         
         if "google" in engines:
-            tasks.append(self._async_google_search(query, results_per_engine))
+            tasks.append(self._search_engine("google", query, lambda: self._async_google_search(query, results_per_engine)))
         
         if "wikipedia" in engines:
-            tasks.append(self._search_wikipedia(query, max(1, results_per_engine // 2)))
+            tasks.append(self._search_engine("wikipedia", query, lambda: self._search_wikipedia(query, max(1, results_per_engine // 2))))
         
         if "arxiv" in engines:
-            tasks.append(self._search_arxiv(query, max(1, results_per_engine // 2)))
+            tasks.append(self._search_engine("arxiv", query, lambda: self._search_arxiv(query, max(1, results_per_engine // 2))))
         
         # Wait for all searches to complete
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -590,19 +726,6 @@ class UnifiedSearcher:
                             all_results.append(item)
                         elif isinstance(item, dict) and 'title' in item and 'url' in item and 'snippet' in item and 'source' in item:
                             all_results.append(SearchResult(**item))
-                        # Handle googlesearch.SearchResult objects
-                        elif hasattr(item, 'title') and hasattr(item, 'url'):
-                            # Convert googlesearch.SearchResult to our SearchResult
-                            snippet = ""
-                            if hasattr(item, 'description'):
-                                snippet = item.description
-                            
-                            all_results.append(SearchResult(
-                                title=item.title,
-                                url=item.url,
-                                snippet=snippet,
-                                source="Google"
-                            ))
                         else:
                             print(f"Warning: Skipping invalid search result: {type(item)}")
                     except Exception as e:
@@ -611,66 +734,132 @@ class UnifiedSearcher:
         # Merge and limit results
         return self.merge_results(all_results, "alternate")[:self.max_results]
     
+    async def _search_engine(self, engine: str, query: str, search) -> List[SearchResult]:
+        """
+        Run one engine's search, sharing it with identical searches already in flight.
+        
+        Concurrent callers asking an engine the same normalized query await one
+        pending search instead of each missing the cache and hitting the engine.
+        """
+        loop = asyncio.get_running_loop()
+        key = (engine, SearchCache.normalize_query(query))
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._run_engine(engine, query, search))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(key, done))
+        else:
+            self.coalesced_searches += 1
+        
+        # Shielded so one cancelled caller does not abort the search for the others
+        return list(await asyncio.shield(task))
+    
+    def _forget_inflight(self, key: Tuple[str, str], task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+    
+    async def _run_engine(self, engine: str, query: str, search) -> List[SearchResult]:
+        """Run one engine's search, recording or replaying it when an archive is set."""
+        if self.archive is None:
+            return await search()
+        
+        async def run():
+            return [r.to_dict() if isinstance(r, SearchResult) else r for r in await search()]
+        
+        results = await search_through(self.archive, engine, query, run)
+        return [SearchResult(**r) if isinstance(r, dict) else r for r in results]
+    
+    async def _fetch_duckduckgo(self, query: str, backend: str) -> List[Dict[str, Any]]:
+        """
+        Fetch one page of DuckDuckGo results over the pooled session.
+        
+        The news backend reads the JSON news endpoint, which needs the vqd
+        token of the query's search page first; any other backend reads the
+        HTML-only results page.
+        """
+        headers = {'User-Agent': self.user_agent, 'Referer': DUCKDUCKGO_URL}
+        session = await self.session_pool.get_session()
+        
+        if backend == "news":
+            async with session.get(DUCKDUCKGO_URL, **self._request_kwargs(headers, params={"q": query})) as response:
+                response.raise_for_status()
+                vqd = extract_vqd(await response.text())
+            params = {
+                "l": self.region,
+                "o": "json",
+                "noamp": "1",
+                "q": query,
+                "vqd": vqd,
+                "p": DUCKDUCKGO_SAFESEARCH.get(self.safesearch, "-1")
+            }
+            if self.timelimit:
+                params["df"] = self.timelimit
+            async with session.get(DUCKDUCKGO_NEWS_URL, **self._request_kwargs(headers, params=params)) as response:
+                # DuckDuckGo answers rate-limited requests with 202 or 403
+                if response.status != 200:
+                    raise ValueError(f"DuckDuckGo news returned status {response.status}")
+                data = await response.json(content_type=None)
+            return parse_duckduckgo_news(data)
+        
+        form = {"q": query, "b": "", "kl": self.region}
+        if self.timelimit:
+            form["df"] = self.timelimit
+        async with session.post(DUCKDUCKGO_HTML_URL, **self._request_kwargs(headers, data=form)) as response:
+            if response.status != 200:
+                raise ValueError(f"DuckDuckGo returned status {response.status}")
+            html = await response.text()
+        return parse_duckduckgo_html(html)
+    
     async def _search_duckduckgo(self, query: str) -> List[SearchResult]:
-        """Perform DuckDuckGo search with caching and error handling."""
+        """
+        Perform DuckDuckGo search with caching and error handling.
+        
+        News results come first; when the news endpoint fails or finds
+        nothing, the HTML results page is searched instead.
+        """
         # Check cache first
-        cached_results = self.cache.get(query, "duckduckgo")
+        cached_results = await self.cache.aget(query, "duckduckgo")
         if cached_results:
             return [SearchResult(**r) for r in cached_results]
         
         results = []
         
-        # Use LangChain's DuckDuckGo tools
         try:
-            # Run in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            ddg_results_str = await loop.run_in_executor(
-                self.executor,
-                lambda: self.ddg_results.run(query)
-            )
+            async with self.engine_limits.slot("duckduckgo"):
+                found = []
+                if self.backend == "news":
+                    try:
+                        found = await self._fetch_duckduckgo(query, "news")
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"DuckDuckGo news search error: {e}")
+                if not found:
+                    found = await self._fetch_duckduckgo(query, "html")
             
-            ddg_results = self._parse_ddg_results(ddg_results_str)
-            results.extend(ddg_results)
+            for result in found[:self.max_results]:
+                results.append(SearchResult(
+                    title=result["title"],
+                    url=result["url"],
+                    snippet=result["snippet"],
+                    source="DuckDuckGo",
+                    date=result["date"],
+                    metadata={"publisher": result["publisher"]} if result["publisher"] else None
+                ))
             
-            # Cache results
             if results:
-                try:
-                    # Ensure we're storing dictionaries, not SearchResult objects
-                    result_dicts = []
-                    for r in results:
-                        if isinstance(r, SearchResult):
-                            result_dicts.append(r.to_dict())
-                        elif isinstance(r, dict):
-                            result_dicts.append(r)
-                        else:
-                            print(f"Warning: Skipping non-serializable result: {type(r)}")
-                    
-                    self.cache.set(query, "duckduckgo", result_dicts)
-                except Exception as e:
-                    print(f"Error caching DuckDuckGo search results: {e}")
+                await self.cache.aset(query, "duckduckgo", [r.to_dict() for r in results])
                 
         except Exception as e:
             print(f"DuckDuckGo search error: {e}")
-            # Fallback to simpler DuckDuckGo run
-            try:
-                simple_result = await loop.run_in_executor(
-                    self.executor,
-                    lambda: self.ddg_run.run(query)
-                )
-                
-                results.append(
-                    SearchResult(
-                        title="DuckDuckGo Result",
-                        url="",
-                        snippet=simple_result,
-                        source="DuckDuckGo"
-                    )
-                )
-            except Exception as e:
-                print(f"DuckDuckGo fallback error: {e}")
         
         return results
 
+    async def close(self):
+        """Release the pooled HTTP session of the running event loop and the cache's store."""
+        await self.session_pool.close()
+        self.cache.close()
+    
     def search_sync(
         self,
         query: str,
@@ -679,16 +868,34 @@ class UnifiedSearcher:
         """
         Synchronous version of search method.
         """
-        return asyncio.run(self.search(query, engines))
+        async def search_and_close():
+            try:
+                return await self.search(query, engines)
+            finally:
+                # The session belongs to the loop asyncio.run is about to close
+                await self.close()
+        
+        return asyncio.run(search_and_close())
 
     @staticmethod
     def merge_results(
         results: List[SearchResult],
         strategy: str = "relevance"
     ) -> List[SearchResult]:
-        """Merge results using specified strategy."""
+        """Merge results using specified strategy, keeping one result per canonical URL."""
         if not results:
             return []
+        
+        unique_results = []
+        seen_urls = set()
+        for r in results:
+            if r.url:
+                canonical_url = canonicalize(r.url)
+                if canonical_url in seen_urls:
+                    continue
+                seen_urls.add(canonical_url)
+            unique_results.append(r)
+        results = unique_results
             
         if strategy == "alternate":
             # Group by source
@@ -0,0 +1,126 @@
+"""Canonical URL normalization shared by scraping, caching and search dedup."""
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+import re
+from .config import config
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ocid", "cmpid", "ref_src", "spm"
+}
+TRACKING_PREFIXES = ("utm_",)
+
+# Host prefixes that serve the same pages as the bare host
+HOST_PREFIXES = ("www.", "amp.")
+
+AMP_PATH = re.compile(r"(?:^/amp(?=/)|/amp/?$|\.amp(?=\.html?$|$))")
+
+# Per-domain rules, matched on the host and its parent domains. Supported keys:
+#   keep_params: only these query parameters identify a page
+#   drop_params: extra parameters to ignore
+#   keep_fragment: the fragment selects content (hash-routed sites)
+#   keep_trailing_slash: "/path/" and "/path" are different pages
+#   keep_host_prefix: don't strip www./amp. from the host
+DEFAULT_DOMAIN_RULES: Dict[str, Dict[str, Any]] = {
+    "youtube.com": {"keep_params": ["v", "list"]},
+    "news.ycombinator.com": {"keep_params": ["id"]},
+    "amazon.com": {"keep_params": []}
+}
+
+class URLCanonicalizer:
+    """
+    Maps URL variants of the same page to one canonical form.
+
+    normalize() applies the rules: https scheme, lower-cased host without
+    www./amp. prefixes or default ports, no fragment, tracking parameters and
+    AMP markers removed, query sorted and trailing slash dropped, each of which
+    can be adjusted per domain. canonicalize() additionally follows
+    <link rel=canonical> targets learned from fetched pages.
+    """
+    def __init__(self, domain_rules: Optional[Dict[str, Dict[str, Any]]] = None, max_learned: int = 10000):
+        self.domain_rules = dict(DEFAULT_DOMAIN_RULES)
+        self.domain_rules.update(domain_rules or {})
+        self.max_learned = max_learned
+        self._learned = OrderedDict()
+
+    def rules_for(self, host: str) -> Dict[str, Any]:
+        """Get the rules for a host, falling back to its parent domains."""
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            rules = self.domain_rules.get(".".join(labels[i:]))
+            if rules is not None:
+                return rules
+        return {}
+
+    def normalize(self, url: str) -> str:
+        """Normalize a URL by rule, without learned canonical links."""
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except (ValueError, AttributeError):
+            return url
+        host = (parts.hostname or "").rstrip(".")
+        if parts.scheme.lower() not in ("http", "https") or not host:
+            return url
+
+        rules = self.rules_for(host)
+        if not rules.get("keep_host_prefix"):
+            for prefix in HOST_PREFIXES:
+                if host.startswith(prefix) and host.count(".") > 1:
+                    host = host[len(prefix):]
+        netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+
+        path = re.sub(r"/{2,}", "/", parts.path) or "/"
+        path = AMP_PATH.sub("", path) or "/"
+        if len(path) > 1 and not rules.get("keep_trailing_slash"):
+            path = path.rstrip("/") or "/"
+
+        keep_params = rules.get("keep_params")
+        drop_params = set(rules.get("drop_params", ()))
+        params = []
+        for key, value in parse_qsl(parts.query, keep_blank_values=True):
+            name = key.lower()
+            if name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES) or key in drop_params:
+                continue
+            if name == "amp" or (name == "outputtype" and value.lower() == "amp"):
+                continue
+            if keep_params is not None and key not in keep_params:
+                continue
+            params.append((key, value))
+        query = urlencode(sorted(params))
+
+        fragment = parts.fragment if rules.get("keep_fragment") else ""
+        return urlunsplit(("https", netloc, path, query, fragment))
+
+    def canonicalize(self, url: str) -> str:
+        """Get the canonical form of a URL, following learned rel=canonical links."""
+        normalized = self.normalize(url)
+        return self._learned.get(normalized, normalized)
+
+    def learn(self, url: str, canonical_url: Optional[str]) -> bool:
+        """
+        Record a page's <link rel=canonical> target.
+
+        Only targets on the same host are trusted, so a page cannot merge itself
+        into another site's content.
+        """
+        if not canonical_url:
+            return False
+        source = self.normalize(url)
+        target = self.normalize(urljoin(url, canonical_url))
+        if target == source or urlsplit(target).netloc != urlsplit(source).netloc:
+            return False
+
+        self._learned[source] = target
+        self._learned.move_to_end(source)
+        while len(self._learned) > self.max_learned:
+            self._learned.popitem(last=False)
+        return True
+
+canonicalizer = URLCanonicalizer(config.get("scraper", "canonical_rules", {}))
+
+def canonicalize(url: str) -> str:
+    """Get the canonical form of a URL with the shared canonicalizer."""
+    return canonicalizer.canonicalize(url)
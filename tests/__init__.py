@@ -0,0 +1,24 @@
+"""
+Shared test fixtures.
+
+Test modules that build scrapers or searchers import setUpModule and
+tearDownModule from here, so the scraper, search and robots caches and the
+host health database live in a temporary directory instead of the user's
+cache directory.
+"""
+import tempfile
+from shandu.config import config
+
+_cache_dir = None
+_saved_cache_dir = None
+
+def setUpModule():
+    """Point every persistent store at a temporary cache directory."""
+    global _cache_dir, _saved_cache_dir
+    _cache_dir = tempfile.TemporaryDirectory()
+    _saved_cache_dir = config.get("cache", "dir")
+    config.set("cache", "dir", _cache_dir.name)
+
+def tearDownModule():
+    config.set("cache", "dir", _saved_cache_dir)
+    _cache_dir.cleanup()
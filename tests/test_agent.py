@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import MagicMock, patch, AsyncMock
 from shandu.agents.agent import ResearchAgent
 from shandu.agents.langgraph_agent import ResearchGraph
+from tests import setUpModule, tearDownModule
 
 
 class TestResearchAgent(unittest.TestCase):
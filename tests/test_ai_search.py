@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 from datetime import datetime
 from shandu.search.ai_search import AISearcher, AISearchResult
+from tests import setUpModule, tearDownModule
 
 
 class TestAISearchResult(unittest.TestCase):
@@ -0,0 +1,97 @@
+"""
+Tests for the cache store module.
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from shandu.cache import CacheStore
+
+class TestCacheStore(unittest.TestCase):
+    """Test cases for the CacheStore class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = CacheStore(os.path.join(self.temp_dir.name, "cache.db"), ttl=100, memory_items=2)
+
+    def tearDown(self):
+        """Clean up test environment."""
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_identical_blobs_stored_once(self):
+        """Test that identical payloads under different keys share one blob."""
+        page = "<html>" + "same page " * 500 + "</html>"
+        self.store.set("a", {"url": "a", "html": page}, ["html"])
+        self.store.set("b", {"url": "b", "html": page}, ["html"])
+
+        blob_count = self.store._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        self.assertEqual(blob_count, 1)
+        self.assertLess(self.store.size_bytes(), len(page))
+        self.assertEqual(self.store.get("b")["html"], page)
+
+    def test_lazy_fields(self):
+        """Test that lazy fields are skipped by get() and read with get_field()."""
+        path = os.path.join(self.temp_dir.name, "lazy.db")
+        store = CacheStore(path, ttl=100, lazy_fields=["html"])
+        try:
+            store.set("a", {"url": "a", "html": "<html>page</html>", "text": "page"}, ["html", "text"])
+            self.assertEqual(store.get("a"), {"url": "a", "text": "page"})
+            store._memory.clear()
+            self.assertEqual(store.get("a"), {"url": "a", "text": "page"})
+            self.assertEqual(store.get_field("a", "html"), "<html>page</html>")
+            self.assertIsNone(store.get_field("missing", "html"))
+        finally:
+            store.close()
+
+    @patch("shandu.cache.time.time")
+    def test_purge_expired(self, mock_time):
+        """Test TTL expiry and cleanup of unreferenced blobs."""
+        mock_time.return_value = 1000
+        self.store.set("a", {"html": "old page"}, ["html"])
+
+        mock_time.return_value = 1200
+        self.assertIsNone(self.store.get("a"))
+        self.assertEqual(self.store.purge_expired(), 1)
+        self.assertEqual(self.store.size_bytes(), 0)
+
+    @patch("shandu.cache.time.time")
+    def test_evict_least_recently_used(self, mock_time):
+        """Test size-based eviction removes the least recently used entries first."""
+        for i, key in enumerate(["a", "b", "c"]):
+            mock_time.return_value = 1000 + i
+            self.store.set(key, {"html": os.urandom(2000).hex()}, ["html"])
+
+        # Touch "a" on disk so "b" becomes the oldest entry
+        self.store._memory.clear()
+        mock_time.return_value = 1010
+        self.store.get("a")
+
+        self.store.evict(max_bytes=self.store.size_bytes() - 1)
+        self.assertIsNone(self.store.get("b"))
+        self.assertIsNotNone(self.store.get("a"))
+
+    def test_background_maintenance(self):
+        """Test that a purge_interval store purges expired entries on its own."""
+        store = CacheStore(os.path.join(self.temp_dir.name, "maintained.db"), ttl=0, purge_interval=0.05)
+        try:
+            store.set("old", {"value": 1})
+            time.sleep(0.3)
+            with store._lock:
+                count = store._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            self.assertEqual(count, 0)
+        finally:
+            store.close()
+
+    def test_memory_tier_is_bounded(self):
+        """Test that the in-memory tier keeps only the most recent entries."""
+        for key in ["a", "b", "c"]:
+            self.store.set(key, {"value": key})
+
+        self.assertEqual(list(self.store._memory.keys()), ["b", "c"])
+        self.assertEqual(self.store.get("a"), {"value": "a"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -91,6 +91,23 @@ class TestConfig(unittest.TestCase):
                 self.assertEqual(new_config.get("api", "model"), "new-model")
                 self.assertEqual(new_config.get("search", "max_results"), 20)
     
+    @patch.dict(os.environ, {"SHANDU_REPLAY": "env-run.jsonl.gz"})
+    def test_runtime_values_are_not_saved(self):
+        """Test that per-process settings such as the replay mode stay out of the saved file."""
+        with patch('shandu.config.os.path.expanduser', return_value=self.config_path):
+            config = Config()
+            config.set_runtime("replay", "latency", 0.0)
+            self.assertEqual(config.get("replay", "mode"), "replay")
+            self.assertEqual(config.get_section("replay")["archive"], "env-run.jsonl.gz")
+            self.assertEqual(config.get("replay", "latency"), 0.0)
+            
+            config.save()
+            with open(self.config_path) as f:
+                saved = json.load(f)
+            self.assertIsNone(saved["replay"]["mode"])
+            self.assertIsNone(saved["replay"]["archive"])
+            self.assertEqual(saved["replay"]["latency"], "recorded")
+    
     def test_get_with_default(self):
         """Test getting configuration with default value."""
         with patch('shandu.config.os.path.expanduser', return_value=self.config_path):
@@ -0,0 +1,186 @@
+"""
+Tests for the record/replay archive.
+"""
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+import asyncio
+import os
+import tempfile
+import time
+from aiohttp import web
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from shandu.replay import Archive, ReplayMiss, RECORD, REPLAY, HTTP, RENDER
+from shandu.scraper.scraper import WebScraper
+from shandu.scraper.browser import RecordingPage
+from shandu.search.search import UnifiedSearcher, SearchResult
+from tests import setUpModule, tearDownModule
+
+
+class TestArchive(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the archive file and latency injection."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "run.jsonl.gz")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_replays_in_recorded_order(self):
+        """Test that responses per key are served in order and the last one repeats."""
+        archive = Archive(self.path, RECORD)
+        archive.record(HTTP, "GET https://a.com/", {"status": 503}, 0.2)
+        archive.record(HTTP, "GET https://a.com/", {"status": 200}, 0.1)
+        archive.record(RENDER, "https://b.com/", {"body": "<html></html>"}, 0.3)
+        archive.close()
+
+        archive = Archive(self.path, REPLAY, latency=None)
+        statuses = [archive.lookup(HTTP, "GET https://a.com/")["status"] for _ in range(3)]
+
+        self.assertEqual(statuses, [503, 200, 200])
+        self.assertEqual(archive.lookup(RENDER, "https://b.com/")["body"], "<html></html>")
+        with self.assertRaises(ReplayMiss):
+            archive.lookup(HTTP, "GET https://c.com/")
+        self.assertEqual((archive.stats()["replayed"], archive.stats()["misses"]), (4, 1))
+
+    async def test_latency_injection(self):
+        """Test recorded, scaled and fixed delays, and timeouts shorter than the delay."""
+        archive = Archive(self.path, RECORD)
+        archive.record(HTTP, "GET https://a.com/", {"status": 200}, 0.2)
+        archive.close()
+
+        recorded = Archive(self.path, REPLAY, latency="recorded", latency_scale=0.5)
+        fixed = Archive(self.path, REPLAY, latency=0.05)
+        self.assertAlmostEqual(recorded.delay_for(recorded.lookup(HTTP, "GET https://a.com/")), 0.1)
+        self.assertEqual(fixed.delay_for(fixed.lookup(HTTP, "GET https://a.com/")), 0.05)
+
+        started = time.monotonic()
+        await fixed.replay(HTTP, "GET https://a.com/")
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await recorded.replay(HTTP, "GET https://a.com/", timeout=0.01)
+
+class TestScraperReplay(unittest.IsolatedAsyncioTestCase):
+    """Test cases for recording and replaying scraper traffic."""
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "run.jsonl.gz")
+
+        async def page(request):
+            return web.Response(text="<html><body><p>Recorded page</p></body></html>", content_type="text/html")
+        async def stream(request):
+            response = web.StreamResponse(headers={"Content-Type": "text/html"})
+            await response.prepare(request)
+            await response.write(b"<html><body>")
+            for _ in range(8):
+                await response.write(b"<p>" + b"x" * 50000 + b"</p>")
+                await asyncio.sleep(0.005)
+            await response.write(b"</body></html>")
+            return response
+        async def image(request):
+            return web.Response(body=b"\x89PNG" + b"\x00" * 100000, content_type="image/png")
+        app = web.Application()
+        app.router.add_get("/page", page)
+        app.router.add_get("/stream", stream)
+        app.router.add_get("/image", image)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        self.url = self.base + "/page"
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+        self.temp_dir.cleanup()
+
+    async def test_static_fetch_replays_offline(self):
+        """Test that a recorded fetch is served identically once the server is gone."""
+        archive = Archive(self.path, RECORD)
+        scraper = WebScraper(user_agent="test-agent", respect_robots=False, archive=archive)
+        scraper.proxy = None
+        try:
+            recorded = await scraper._get_page_simple(self.url)
+        finally:
+            await scraper.session_pool.close()
+            archive.close()
+        await self.runner.cleanup()
+
+        replayer = WebScraper(user_agent="test-agent", respect_robots=False, archive=Archive(self.path, REPLAY, latency=None))
+        replayed = await replayer._get_page_simple(self.url)
+        missing = await replayer._get_page_simple(self.url + "/other")
+
+        self.assertEqual(recorded[2], 200)
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(missing, (None, None, None))
+
+    async def test_streamed_body_recorded_in_full(self):
+        """Test that a body arriving in many chunks is recorded whole, and rejected bodies are not read."""
+        archive = Archive(self.path, RECORD)
+        scraper = WebScraper(user_agent="test-agent", respect_robots=False, archive=archive)
+        scraper.proxy = None
+        try:
+            streamed = await scraper._get_page_simple(self.base + "/stream")
+            rejected = await scraper._get_page_simple(self.base + "/image")
+        finally:
+            await scraper.session_pool.close()
+            archive.close()
+
+        replay = Archive(self.path, REPLAY, latency=None)
+        replayer = WebScraper(user_agent="test-agent", respect_robots=False, archive=replay)
+
+        self.assertEqual(len(streamed[0]), 12 + 8 * 50007 + 14)
+        self.assertEqual(await replayer._get_page_simple(self.base + "/stream"), streamed)
+        self.assertEqual(rejected[2], 415)
+        self.assertEqual(replay.lookup(HTTP, "GET " + self.base + "/image")["body"], "")
+
+    async def test_render_replays_without_browser(self):
+        """Test that recorded renders and render timeouts come back without Playwright."""
+        archive = Archive(self.path, RECORD)
+        page = MagicMock()
+        response = MagicMock(status=200, headers={"content-type": "text/html"})
+        page.goto = AsyncMock(side_effect=[response, PlaywrightTimeoutError("slow")])
+        page.evaluate = AsyncMock(return_value={"quiet": True, "elapsed": 120, "textLength": 900})
+        page.content = AsyncMock(return_value="<html><body>Rendered</body></html>")
+        recording = RecordingPage(page, archive)
+        await recording.goto("https://spa.com/app")
+        await recording.evaluate("script")
+        await recording.content()
+        with self.assertRaises(PlaywrightTimeoutError):
+            await recording.goto("https://spa.com/slow")
+        archive.close()
+
+        scraper = WebScraper(user_agent="test-agent", archive=Archive(self.path, REPLAY, latency=None))
+        html, content_type, status_code = await scraper._render("https://spa.com/app", scraper.render_profile)
+
+        self.assertEqual((html, content_type, status_code), ("<html><body>Rendered</body></html>", "text/html", 200))
+        self.assertEqual(list(scraper.health.get("spa.com").ready_times)[-1], 120)
+        self.assertEqual(await scraper._render("https://spa.com/slow", scraper.render_profile), (None, None, None))
+        self.assertEqual(scraper.browser_pool.stats()["browsers"], 0)
+
+class TestSearchReplay(unittest.IsolatedAsyncioTestCase):
+    """Test cases for recording and replaying engine searches."""
+
+    async def test_search_replays_without_engines(self):
+        """Test that replayed searches never call the engines."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.jsonl.gz")
+            archive = Archive(path, RECORD)
+            searcher = UnifiedSearcher(archive=archive)
+            searcher._search_duckduckgo = AsyncMock(return_value=[
+                SearchResult(title="Result", url="https://a.com/", snippet="About a", source="DuckDuckGo")
+            ])
+            recorded = await searcher.search("query", engines=["duckduckgo"])
+            archive.close()
+
+            replayer = UnifiedSearcher(archive=Archive(path, REPLAY, latency=None))
+            replayer._search_duckduckgo = AsyncMock(side_effect=RuntimeError("offline"))
+            replayed = await replayer.search("query", engines=["duckduckgo"])
+
+        self.assertEqual([r.to_dict() for r in replayed], [r.to_dict() for r in recorded])
+        replayer._search_duckduckgo.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
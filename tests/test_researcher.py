@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, patch, AsyncMock
 from datetime import datetime
 import asyncio
 from shandu.research.researcher import ResearchResult, DeepResearcher
+from tests import setUpModule, tearDownModule
 
 
 class TestResearchResult(unittest.TestCase):
@@ -5,12 +5,38 @@ import unittest
 from unittest.mock import patch, MagicMock, AsyncMock
 import asyncio
 import json
+import os
+import random
+import sys
+import tempfile
+import time
 from datetime import datetime
 from shandu.scraper.scraper import WebScraper, ScrapedContent, ScraperCache
+from shandu.scraper.session import HttpSessionPool
+from shandu.scraper.browser import BrowserPool
+from shandu.scraper.scheduler import AdaptiveLimit, DomainScheduler, parse_retry_after
+from shandu.scraper.robots import RobotsChecker
+from shandu.scraper.health import DomainHealth, DomainHealthTracker, OPEN, HALF_OPEN, CLOSED, OK, TIMEOUT, BLOCKED, ERROR
+from shandu.scraper.render import RenderProfile, blocking, is_tracker, should_block
+from shandu.scraper.bulk import Checkpoint, bulk_scrape, read_urls
+from shandu.scraper.crawler import FocusedCrawler, terms
+from shandu.scraper.dedup import NearDuplicateIndex, fingerprint, hamming_distance
+from shandu.scraper import extraction
+from shandu.scraper.extraction import ExtractionPool, extract_content
+from shandu.config import config, get_cache_dir
+from tests import setUpModule, tearDownModule
+
 
 class TestScrapedContent(unittest.TestCase):
     """Test cases for the ScrapedContent class."""
     
+    @unittest.skipIf(sys.version_info < (3, 10), "slotted dataclasses need Python 3.10")
+    def test_slots(self):
+        """Test that content records carry no per-instance __dict__."""
+        content = ScrapedContent(url="https://example.com", title="Example", text="Text", html=None, metadata={})
+        self.assertFalse(hasattr(content, "__dict__"))
+        self.assertEqual(content.extraction.text, "Text")
+    
     def test_is_successful(self):
         """Test is_successful method."""
         # Successful content
@@ -150,18 +176,17 @@ class TestWebScraper(unittest.TestCase):
         self.assertEqual(results["h1"], [])
         self.assertEqual(results["p"], [])
     
-    @patch("shandu.scraper.scraper.aiohttp.ClientSession")
-    async def test_get_page_simple(self, mock_session):
+    async def test_get_page_simple(self):
         """Test _get_page_simple method."""
-        # Mock ClientSession
-        mock_session_instance = AsyncMock()
-        mock_session.return_value.__aenter__.return_value = mock_session_instance
+        # Mock the pooled session
+        mock_session_instance = MagicMock()
+        self.scraper.session_pool.get_session = AsyncMock(return_value=mock_session_instance)
         
         # Mock response
         mock_response = AsyncMock()
         mock_response.headers = {"Content-Type": "text/html"}
         mock_response.status = 200
-        mock_response.text.return_value = "<html><body>Test content</body></html>"
+        mock_response.content = _streamed_body(b"<html><body>Test content</body></html>")
         
         mock_session_instance.get.return_value.__aenter__.return_value = mock_response
         
@@ -182,95 +207,1149 @@ class TestWebScraper(unittest.TestCase):
         self.assertEqual(content_type, "text/html")
         self.assertEqual(status_code, 404)
 
+def _streamed_body(*chunks):
+    """Mock aiohttp StreamReader yielding the given byte chunks."""
+    async def iter_chunked(size):
+        for chunk in chunks:
+            yield chunk
+    content = MagicMock()
+    content.iter_chunked = iter_chunked
+    return content
+
+class TestStreamingDownload(unittest.IsolatedAsyncioTestCase):
+    """Test cases for size-capped streaming page downloads."""
+    
+    def setUp(self):
+        """Create a scraper with a mocked pooled session."""
+        self.scraper = WebScraper(user_agent="test-agent", respect_robots=False)
+        self.session = MagicMock()
+        self.scraper.session_pool.get_session = AsyncMock(return_value=self.session)
+    
+    def _respond(self, headers, *chunks):
+        response = MagicMock()
+        response.status = 200
+        response.headers = headers
+        response.content = _streamed_body(*chunks)
+        self.session.get.return_value.__aenter__ = AsyncMock(return_value=response)
+        self.session.get.return_value.__aexit__ = AsyncMock(return_value=False)
+    
+    async def test_truncates_at_tag_boundary(self):
+        """Test that a body over the cap is cut after the last complete tag."""
+        self.scraper.max_page_bytes = 2000
+        self._respond({"Content-Type": "text/html"}, b"<html><body>", b"<p>" + b"x" * 990 + b"</p>", b"<p>" * 400)
+        
+        html, _, status_code = await self.scraper._get_page_simple("https://example.com/big")
+        
+        self.assertEqual(status_code, 200)
+        self.assertLessEqual(len(html), 2000)
+        self.assertTrue(html.endswith(">"))
+    
+    async def test_rejects_before_reading_body(self):
+        """Test rejection on Content-Type, Content-Length and binary signatures."""
+        self._respond({"Content-Type": "application/pdf"}, b"%PDF-1.7")
+        self.assertEqual(await self.scraper._get_page_simple("https://example.com/a.pdf"), (None, "application/pdf", 415))
+        
+        self._respond({"Content-Type": "text/html", "Content-Length": str(self.scraper.max_content_length + 1)}, b"")
+        html, _, status_code = await self.scraper._get_page_simple("https://example.com/huge")
+        self.assertEqual((html, status_code), (None, 413))
+        
+        self._respond({"Content-Type": "text/html"}, b"%PDF-1.7 mislabeled")
+        html, _, status_code = await self.scraper._get_page_simple("https://example.com/report")
+        self.assertEqual((html, status_code), (None, 415))
+    
+    async def test_detects_meta_charset(self):
+        """Test charset detection from a <meta> declaration across chunks."""
+        body = '<html><head><meta charset="iso-8859-1"></head><body>Caf\u00e9 cr\u00e8me</body></html>'.encode("latin-1")
+        self._respond({"Content-Type": "text/html"}, body[:50], body[50:])
+        
+        html, _, _ = await self.scraper._get_page_simple("https://example.com/fr")
+        
+        self.assertIn("Caf\u00e9 cr\u00e8me", html)
+    
+    async def test_page_budget(self):
+        """Test that a page exceeding its wall-clock budget fails fast."""
+        async def slow_fetch(*args, **kwargs):
+            await asyncio.sleep(5)
+        
+        self.scraper.page_budget = 0.1
+        self.scraper._fetch_page = slow_fetch
+        with patch.object(self.scraper.cache, "aget", AsyncMock(return_value=None)), \
+                patch.object(self.scraper.cache, "aget_stale", AsyncMock(return_value=None)):
+            content = await self.scraper.scrape_url("https://example.com/slow")
+        
+        self.assertIn("page budget", content.error)
+
+class TestRobotsChecker(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the RobotsChecker class."""
+    
+    ROBOTS = b"User-agent: *\nDisallow: /private\nCrawl-delay: 5\n"
+    
+    def setUp(self):
+        """Create a checker with a temporary cache and a mocked session."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fetches = []
+        self.session = MagicMock()
+        self.session.get.side_effect = self._get
+        self.pool = MagicMock()
+        self.pool.get_session = AsyncMock(return_value=self.session)
+        self.checker = RobotsChecker(session_pool=self.pool, cache_dir=self.temp_dir.name)
+    
+    def tearDown(self):
+        """Remove the temporary cache."""
+        self.checker.close()
+        self.temp_dir.cleanup()
+    
+    def _get(self, url, **kwargs):
+        self.fetches.append(url)
+        response = MagicMock()
+        response.status = 200
+        response.headers = {"Content-Type": "text/plain"}
+        response.content = _streamed_body(self.ROBOTS)
+        
+        async def enter():
+            await asyncio.sleep(0.05)
+            return response
+        request = MagicMock()
+        request.__aenter__ = AsyncMock(side_effect=enter)
+        request.__aexit__ = AsyncMock(return_value=False)
+        return request
+    
+    async def test_single_flight_per_host(self):
+        """Test that concurrent checks share one fetch per host and hosts run in parallel."""
+        results = await asyncio.gather(
+            self.checker.can_fetch("https://a.com/page", "agent"),
+            self.checker.can_fetch("https://a.com/private/x", "agent"),
+            self.checker.can_fetch("https://b.com/page", "agent")
+        )
+        
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(sorted(self.fetches), ["https://a.com/robots.txt", "https://b.com/robots.txt"])
+        self.assertEqual(self.checker.crawl_delay("https://a.com/page", "agent"), 5.0)
+    
+    async def test_rules_persist_across_runs(self):
+        """Test that a new checker reads rules from the on-disk cache."""
+        await self.checker.can_fetch("https://a.com/page", "agent")
+        
+        checker = RobotsChecker(session_pool=self.pool, cache_dir=self.temp_dir.name)
+        try:
+            self.assertFalse(await checker.can_fetch("https://a.com/private/y", "agent"))
+        finally:
+            checker.close()
+        self.assertEqual(self.fetches, ["https://a.com/robots.txt"])
+    
+    async def test_denied_page_fetched_in_parallel_is_dropped(self):
+        """Test that a page fetched alongside robots.txt is discarded when disallowed."""
+        scraper = WebScraper(user_agent="agent")
+        scraper.robots_checker.close()
+        scraper.robots_checker = self.checker
+        scraper.cache = ScraperCache(cache_dir=self.temp_dir.name)
+        scraper._fetch_page = AsyncMock(return_value=("<html><body>Secret</body></html>", "text/html", 200))
+        try:
+            content = await scraper.scrape_url("https://a.com/private/doc")
+        finally:
+            scraper.cache.store.close()
+        
+        self.assertIn("robots.txt", content.error)
+        scraper._fetch_page.assert_awaited_once()
+    
+    async def test_robots_check_cancelled_with_fetch(self):
+        """Test that the parallel robots.txt check stops when the page fetch is cancelled."""
+        scraper = WebScraper(user_agent="agent")
+        scraper.cache = ScraperCache(cache_dir=self.temp_dir.name)
+        robots_cancelled = asyncio.Event()
+        
+        async def check_robots(url):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                robots_cancelled.set()
+                raise
+            return True
+        
+        async def fetch_with_retries(*args):
+            await asyncio.sleep(5)
+        scraper._check_robots = check_robots
+        scraper._fetch_with_retries = fetch_with_retries
+        try:
+            scrape = asyncio.ensure_future(scraper.scrape_url("https://slow.example.com/page"))
+            await asyncio.sleep(0.05)
+            scrape.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await scrape
+            await asyncio.wait_for(robots_cancelled.wait(), 1)
+        finally:
+            scraper.cache.store.close()
+
+class TestTieredFetch(unittest.IsolatedAsyncioTestCase):
+    """Test cases for static-first fetching with JavaScript escalation."""
+    
+    ARTICLE_HTML = "<html><body><article>" + "<p>Plenty of server rendered text.</p>" * 20 + "</article></body></html>"
+    SHELL_HTML = "<html><head><script src='/app.js'></script></head><body><div id=\"root\"></div></body></html>"
+    
+    def test_needs_javascript(self):
+        """Test the JavaScript detector on common page shapes."""
+        self.assertFalse(WebScraper.needs_javascript(self.ARTICLE_HTML))
+        self.assertTrue(WebScraper.needs_javascript(self.SHELL_HTML))
+        self.assertTrue(WebScraper.needs_javascript(""))
+        
+        noscript_wall = self.ARTICLE_HTML.replace(
+            "<article>", "<noscript>Please enable JavaScript to view this site.</noscript><article>"
+        )
+        self.assertTrue(WebScraper.needs_javascript(noscript_wall))
+        
+        # Non-HTML content never needs rendering
+        self.assertFalse(WebScraper.needs_javascript("{}", "application/json"))
+    
+    async def test_escalates_and_remembers_domain(self):
+        """Test escalation to the browser and the per-domain decision."""
+        scraper = WebScraper(user_agent="test-agent")
+        scraper._get_page_simple = AsyncMock(return_value=(self.SHELL_HTML, "text/html", 200))
+        scraper._get_page_dynamic = AsyncMock(return_value=(self.ARTICLE_HTML, "text/html", 200))
+        
+        html, _, _ = await scraper._fetch_page("https://spa.example.com/a")
+        self.assertEqual(html, self.ARTICLE_HTML)
+        self.assertEqual(scraper.health.strategy("spa.example.com"), "dynamic")
+        
+        # Later URLs on the same domain skip the static attempt
+        scraper._get_page_simple.reset_mock()
+        await scraper._fetch_page("https://spa.example.com/b")
+        scraper._get_page_simple.assert_not_awaited()
+    
+    async def test_falls_back_to_static_when_rendering_fails(self):
+        """Test fallback to the plain HTTP result when the browser fails."""
+        scraper = WebScraper(user_agent="test-agent")
+        scraper._get_page_simple = AsyncMock(return_value=(self.SHELL_HTML, "text/html", 200))
+        scraper._get_page_dynamic = AsyncMock(return_value=(None, None, None))
+        
+        html, _, status_code = await scraper._fetch_page("https://spa.example.com/a")
+        self.assertEqual(html, self.SHELL_HTML)
+        self.assertEqual(status_code, 200)
+
+class TestScrapeUrls(unittest.IsolatedAsyncioTestCase):
+    """Test cases for batch scraping."""
+    
+    async def test_sheds_html_after_caching(self):
+        """Test that raw HTML is released after extraction and can be reloaded from the cache."""
+        html = "<html><head><title>Doc</title></head><body><article>" + "<p>Useful text here.</p>" * 30 + "</article></body></html>"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            scraper = WebScraper(user_agent="test-agent", respect_robots=False)
+            scraper.extraction_pool.inline = True
+            scraper.cache = ScraperCache(cache_dir=temp_dir, lazy_html=True)
+            scraper._fetch_page = AsyncMock(return_value=(html, "text/html", 200))
+            try:
+                content = await scraper.scrape_url("https://example.com/doc")
+                self.assertIsNone(content.html)
+                self.assertIn("Useful text here.", content.text)
+                self.assertEqual(await scraper.cache.aload_html("https://example.com/doc"), html)
+            finally:
+                scraper.cache.store.close()
+    
+    async def test_deduplicates_canonical_urls(self):
+        """Test that URL variants are fetched once and rel=canonical duplicates are dropped."""
+        scraper = WebScraper(user_agent="test-agent")
+        
+        async def scrape_url(url, **kwargs):
+            canonical = "https://example.com/story" if "print" in url else None
+            return ScrapedContent(
+                url=url, title="Story", text="Body", html="",
+                metadata={"canonical_url": canonical} if canonical else {}
+            )
+        scraper.scrape_url = AsyncMock(side_effect=scrape_url)
+        
+        results = await scraper.scrape_urls([
+            "https://example.com/story",
+            "http://www.example.com/story/?utm_source=feed",
+            "https://example.com/story/print"
+        ])
+        
+        self.assertEqual(scraper.scrape_url.await_count, 2)
+        self.assertEqual([r.url for r in results], ["https://example.com/story"])
+    
+    async def test_scrape_iter_yields_as_pages_finish(self):
+        """Test completion-order results and abandonment of stragglers at the deadline."""
+        scraper = WebScraper(user_agent="test-agent")
+        delays = {"https://a.com/slow": 0.3, "https://b.com/fast": 0.01, "https://c.com/stuck": 10}
+        cancelled = []
+        
+        async def scrape_url(url, **kwargs):
+            try:
+                await asyncio.sleep(delays[url])
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return ScrapedContent(url=url, title="Page", text="Body", html="", metadata={})
+        scraper.scrape_url = AsyncMock(side_effect=scrape_url)
+        
+        results = [r async for r in scraper.scrape_iter(list(delays), deadline=1)]
+        
+        self.assertEqual([r.url for r in results], ["https://b.com/fast", "https://a.com/slow", "https://c.com/stuck"])
+        self.assertTrue(results[1].is_successful())
+        self.assertIn("deadline", results[2].error)
+        self.assertEqual(cancelled, ["https://c.com/stuck"])
+    
+    async def test_scrape_iter_cancels_on_early_exit(self):
+        """Test that leaving the loop early cancels the pages still loading."""
+        scraper = WebScraper(user_agent="test-agent")
+        cancelled = []
+        
+        async def scrape_url(url, **kwargs):
+            try:
+                await asyncio.sleep(0 if "first" in url else 10)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return ScrapedContent(url=url, title="Page", text="Body", html="", metadata={})
+        scraper.scrape_url = AsyncMock(side_effect=scrape_url)
+        
+        pages = scraper.scrape_iter(["https://a.com/first", "https://b.com/second"])
+        async for result in pages:
+            self.assertEqual(result.url, "https://a.com/first")
+            break
+        await pages.aclose()
+        
+        self.assertEqual(cancelled, ["https://b.com/second"])
+
+class TestDomainHealth(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the per-domain circuit breaker and learned statistics."""
+    
+    def test_scraper_uses_configured_database(self):
+        """Test that the health database follows the health_db setting, or stays in memory without one."""
+        self.assertEqual(
+            WebScraper(user_agent="test-agent").health.store.path,
+            os.path.join(get_cache_dir(), "health/health.db")
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            health_db = os.path.join(temp_dir, "health.db")
+            with patch.dict(config._config["scraper"], {"health_db": health_db}):
+                self.assertEqual(WebScraper(user_agent="test-agent").health.store.path, health_db)
+        
+        with patch.dict(config._config["scraper"], {"health_db": None}):
+            self.assertIsNone(WebScraper(user_agent="test-agent").health.store)
+    
+    @patch("shandu.scraper.health.time.time")
+    def test_circuit_opens_and_recovers(self, mock_time):
+        """Test open, half-open probing with growing cooldown, and closing on success."""
+        mock_time.return_value = 1000
+        tracker = DomainHealthTracker(failure_threshold=3, cooldown=60)
+        for _ in range(3):
+            self.assertTrue(tracker.allow("slow.com"))
+            tracker.record("slow.com", TIMEOUT)
+        self.assertEqual(tracker.get("slow.com").state, OPEN)
+        self.assertFalse(tracker.allow("slow.com"))
+        self.assertTrue(tracker.allow("other.com"))
+        
+        # After the cooldown a single probe goes through
+        mock_time.return_value = 1061
+        self.assertTrue(tracker.allow("slow.com"))
+        self.assertEqual(tracker.get("slow.com").state, HALF_OPEN)
+        self.assertFalse(tracker.allow("slow.com"))
+        
+        # A failed probe reopens the circuit for twice as long
+        tracker.record("slow.com", BLOCKED)
+        self.assertEqual(tracker.get("slow.com").cooldown, 120)
+        mock_time.return_value = 1150
+        self.assertFalse(tracker.allow("slow.com"))
+        
+        mock_time.return_value = 1300
+        self.assertTrue(tracker.allow("slow.com"))
+        tracker.record("slow.com", OK, 0.5)
+        self.assertEqual(tracker.get("slow.com").state, CLOSED)
+        self.assertTrue(tracker.allow("slow.com"))
+    
+    def test_learned_strategy_and_timeout(self):
+        """Test strategy choice, render fallback and latency-based timeouts."""
+        tracker = DomainHealthTracker()
+        self.assertIsNone(tracker.strategy("spa.com"))
+        tracker.record_javascript("spa.com", True)
+        self.assertEqual(tracker.strategy("spa.com"), "dynamic")
+        
+        for _ in range(3):
+            tracker.record("spa.com", TIMEOUT, rendered=True)
+        self.assertFalse(tracker.can_render("spa.com"))
+        self.assertEqual(tracker.strategy("spa.com"), "static")
+        # Rendering trouble doesn't open the circuit
+        self.assertTrue(tracker.allow("spa.com"))
+        
+        self.assertEqual(tracker.timeout_for("fast.com", 30), 30)
+        for _ in range(10):
+            tracker.record("fast.com", OK, 1.0)
+        self.assertEqual(tracker.timeout_for("fast.com", 30), 5)
+        self.assertEqual(tracker.timeout_for("fast.com", 30, minimum=1), 3)
+        
+        for attempt in range(10):
+            self.assertTrue(0 <= DomainHealthTracker.backoff(attempt) <= min(30, 2 ** attempt))
+    
+    def test_persists_between_runs(self):
+        """Test that health records survive a restart, with probes reset to open."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "health.db")
+            tracker = DomainHealthTracker(path=path, failure_threshold=1)
+            tracker.record("down.com", ERROR)
+            tracker.record_javascript("spa.com", True)
+            tracker.close()
+            
+            tracker = DomainHealthTracker(path=path, failure_threshold=1)
+            try:
+                self.assertEqual(tracker.get("down.com").state, OPEN)
+                self.assertFalse(tracker.allow("down.com"))
+                self.assertEqual(tracker.strategy("spa.com"), "dynamic")
+            finally:
+                tracker.close()
+    
+    async def test_open_circuit_skips_fetch(self):
+        """Test that scrape_url fails fast for a host whose circuit is open."""
+        scraper = WebScraper(user_agent="test-agent", respect_robots=False)
+        scraper.health = DomainHealthTracker(failure_threshold=1)
+        scraper.health.record("down.example.com", TIMEOUT)
+        scraper._fetch_page = AsyncMock()
+        with patch.object(scraper.cache, "aget", AsyncMock(return_value=None)), \
+                patch.object(scraper.cache, "aget_stale", AsyncMock(return_value=None)):
+            content = await scraper.scrape_url("https://down.example.com/page")
+        
+        self.assertIn("circuit open", content.error)
+        scraper._fetch_page.assert_not_awaited()
+
+class TestRenderProfiles(unittest.IsolatedAsyncioTestCase):
+    """Test cases for request blocking and learned render profiles."""
+    
+    def test_should_block(self):
+        """Test which subresources a profile blocks."""
+        profile = RenderProfile()
+        self.assertTrue(should_block("image", "https://example.com/a.png", profile))
+        self.assertTrue(should_block("font", "https://example.com/a.woff2", profile))
+        self.assertTrue(should_block("script", "https://www.googletagmanager.com/gtm.js", profile))
+        self.assertFalse(should_block("script", "https://example.com/app.js", profile))
+        self.assertFalse(should_block("document", "https://example.com/", profile))
+        self.assertFalse(is_tracker("https://notdoubleclick.net/x"))
+        self.assertFalse(should_block("image", "https://example.com/a.png", RenderProfile(block_resources=False)))
+    
+    async def test_blocking_routes_and_unroutes(self):
+        """Test that blocked requests are aborted and the route is removed afterwards."""
+        page = MagicMock()
+        page.route = AsyncMock()
+        page.unroute = AsyncMock()
+        counts = {}
+        
+        async with blocking(page, RenderProfile(), counts):
+            handler = page.route.await_args.args[1]
+            for resource_type, url in [("image", "https://example.com/a.png"), ("script", "https://example.com/app.js")]:
+                route = MagicMock()
+                route.request.resource_type = resource_type
+                route.request.url = url
+                route.abort = AsyncMock()
+                route.continue_ = AsyncMock()
+                await handler(route)
+                (route.abort if resource_type == "image" else route.continue_).assert_awaited_once()
+        
+        page.unroute.assert_awaited_once_with("**/*", handler)
+        self.assertEqual(counts, {"blocked": 1, "allowed": 1})
+    
+    def test_learned_profile(self):
+        """Test that profiles adapt to settling times and blocked-resource breakage."""
+        tracker = DomainHealthTracker()
+        default = RenderProfile(quiet_ms=500, max_wait_ms=5000)
+        self.assertEqual(tracker.render_profile("news.com", default), default)
+        
+        for elapsed in (800, 900, 1000):
+            tracker.record_readiness("news.com", elapsed)
+        self.assertEqual(tracker.render_profile("news.com", default).max_wait_ms, 2000)
+        
+        tracker.record_full_render("app.com", True)
+        profile = tracker.render_profile("app.com", default)
+        self.assertFalse(profile.block_resources or profile.block_trackers)
+        self.assertTrue(default.block_resources)
+    
+    async def test_rerenders_in_full_when_blocking_breaks_page(self):
+        """Test the full-render retry and that the host is remembered."""
+        scraper = WebScraper(user_agent="test-agent")
+        scraper.health = DomainHealthTracker()
+        shell = TestTieredFetch.SHELL_HTML
+        article = TestTieredFetch.ARTICLE_HTML
+        scraper._render = AsyncMock(side_effect=[(shell, "text/html", 200), (article, "text/html", 200)])
+        
+        html, _, _ = await scraper._get_page_dynamic("https://app.example.com/a")
+        
+        self.assertEqual(html, article)
+        self.assertFalse(scraper._render.await_args.args[1].block_trackers)
+        self.assertTrue(scraper.health.get("app.example.com").full_render)
+    
+    async def test_skips_full_render_when_it_does_not_help(self):
+        """Test that a host whose pages stay empty when rendered in full is rendered once per visit."""
+        scraper = WebScraper(user_agent="test-agent")
+        scraper.health = DomainHealthTracker()
+        shell = TestTieredFetch.SHELL_HTML
+        scraper._render = AsyncMock(return_value=(shell, "text/html", 200))
+        
+        await scraper._get_page_dynamic("https://wall.example.com/a")
+        self.assertEqual(scraper._render.await_count, 2)
+        self.assertFalse(scraper.health.should_retry_full_render("wall.example.com"))
+        
+        # The outcome survives a restart through the stored record
+        health = DomainHealth.from_dict(scraper.health.get("wall.example.com").to_dict())
+        self.assertEqual(health.full_render_not_needed, 1)
+        self.assertFalse(health.full_render)
+        
+        html, _, _ = await scraper._get_page_dynamic("https://wall.example.com/b")
+        self.assertEqual(html, shell)
+        self.assertEqual(scraper._render.await_count, 3)
+        self.assertTrue(scraper._render.await_args.args[1].block_trackers)
+
+class TestBulkScrape(unittest.IsolatedAsyncioTestCase):
+    """Test cases for bulk scraping with checkpoints."""
+    
+    def test_read_urls(self):
+        """Test that blanks, comments and URL variants are skipped."""
+        lines = ["https://example.com/a\n", "\n", "# seed list\n", "https://www.example.com/a/\n", "https://example.com/b"]
+        self.assertEqual(read_urls(lines), ["https://example.com/a", "https://example.com/b"])
+    
+    async def test_resumes_from_checkpoint(self):
+        """Test that finished URLs are checkpointed and skipped on the next run."""
+        scraper = WebScraper(user_agent="test-agent")
+        
+        async def scrape_url(url, **kwargs):
+            if "broken" in url:
+                return ScrapedContent.from_error(url, "Failed to fetch content after 2 attempts")
+            return ScrapedContent(url=url, title="Page", text="Body text", html="", metadata={})
+        scraper.scrape_url = AsyncMock(side_effect=scrape_url)
+        urls = [f"https://example.com/{i}" for i in range(5)] + ["https://example.com/broken"]
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.checkpoint")
+            checkpoint = Checkpoint(path)
+            written = []
+            stats = await bulk_scrape(scraper, urls[:3], on_result=written.append, checkpoint=checkpoint, window=2)
+            checkpoint.close()
+            
+            self.assertEqual(stats.succeeded, 3)
+            self.assertEqual(sorted(r.url for r in written), urls[:3])
+            
+            checkpoint = Checkpoint(path)
+            try:
+                stats = await bulk_scrape(scraper, urls, checkpoint=checkpoint)
+            finally:
+                checkpoint.close()
+        
+        self.assertEqual(scraper.scrape_url.await_count, 6)
+        summary = stats.to_dict()
+        self.assertEqual((summary["skipped"], summary["succeeded"], summary["failed"]), (3, 2, 1))
+        self.assertEqual(summary["errors"], {"Failed to fetch content after 2 attempts": 1})
+        self.assertIsNotNone(summary["p95_latency"])
+    
+    async def test_transient_failures_are_retried_on_resume(self):
+        """Test that only successes and permanent failures are checkpointed."""
+        scraper = WebScraper(user_agent="test-agent")
+        attempts = {}
+        
+        async def scrape_url(url, **kwargs):
+            attempts[url] = attempts.get(url, 0) + 1
+            if "gone" in url:
+                return ScrapedContent.from_error(url, "Failed to fetch content: HTTP 404", 404, permanent=True)
+            if "flaky" in url and attempts[url] == 1:
+                return ScrapedContent.from_error(url, "Fetching timed out")
+            return ScrapedContent(url=url, title="Page", text="Body text", html="", metadata={})
+        scraper.scrape_url = AsyncMock(side_effect=scrape_url)
+        urls = ["https://example.com/ok", "https://example.com/gone", "https://example.com/flaky"]
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "run.checkpoint")
+            for _ in range(2):
+                checkpoint = Checkpoint(path)
+                try:
+                    stats = await bulk_scrape(scraper, urls, checkpoint=checkpoint)
+                finally:
+                    checkpoint.close()
+        
+        self.assertEqual(attempts, {"https://example.com/ok": 1, "https://example.com/gone": 1, "https://example.com/flaky": 2})
+        self.assertEqual((stats.skipped, stats.succeeded, stats.failed), (2, 1, 0))
+    
+    def test_concurrency_above_limit_raises_ceiling(self):
+        """Test that a starting concurrency above max_concurrent_limit is not clamped."""
+        scraper = WebScraper(user_agent="test-agent", max_concurrent=100)
+        self.assertEqual(scraper.scheduler.max_concurrent, 100)
+
+class TestFocusedCrawler(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the relevance-guided crawler."""
+    
+    def page(self, url, links):
+        return ScrapedContent(
+            url=url, title="Page", text="Body text", html="", metadata={},
+            links=list(links), anchors={link: anchor for link, anchor in links.items()}
+        )
+    
+    def test_score(self):
+        """Test that anchor text counts more than URL tokens and depth decays the score."""
+        crawler = FocusedCrawler(WebScraper(user_agent="test-agent"))
+        query_terms = terms("solid state battery lifespan")
+        
+        by_anchor = crawler.score(query_terms, "https://a.com/p/1", "Solid state battery research")
+        by_url = crawler.score(query_terms, "https://a.com/solid-state-battery", "read more")
+        unrelated = crawler.score(query_terms, "https://a.com/contact", "Contact us")
+        
+        self.assertGreater(by_anchor, by_url)
+        self.assertGreater(by_url, unrelated)
+        self.assertEqual(unrelated, 0.0)
+        self.assertAlmostEqual(
+            crawler.score(query_terms, "https://a.com/p/1", "Solid state battery research", depth=2),
+            by_anchor * crawler.depth_decay
+        )
+    
+    async def test_crawl_follows_best_links_within_budgets(self):
+        """Test ordering, canonical deduplication, binary links and per-host budgets."""
+        scraper = WebScraper(user_agent="test-agent")
+        fetched = []
+        
+        async def scrape_iter(urls, **kwargs):
+            for url in urls:
+                fetched.append(url)
+                yield self.page(url, {})
+        scraper.scrape_iter = scrape_iter
+        
+        seed = self.page("https://news.com/story", {
+            "https://news.com/story?utm_source=x": "Battery lifespan story",
+            "https://a.com/battery-lifespan": "Battery lifespan study",
+            "https://a.com/battery-chemistry": "Battery lifespan data",
+            "https://a.com/battery-lifespan-2": "Battery lifespan review",
+            "https://b.com/report.pdf": "Battery",
+            "https://b.com/chart.png": "Battery lifespan chart",
+            "https://c.com/about": "About us"
+        })
+        crawler = FocusedCrawler(scraper, max_pages=5, max_pages_per_domain=2, batch_size=1)
+        
+        pages = [page async for page in crawler.crawl("battery lifespan", [seed])]
+        
+        self.assertEqual(fetched, [
+            "https://a.com/battery-lifespan", "https://a.com/battery-lifespan-2", "https://b.com/report.pdf"
+        ])
+        self.assertEqual([page.url for page in pages], fetched)
+    
+    async def test_crawl_stops_at_depth_and_page_budget(self):
+        """Test that links of crawled pages are followed only up to max_depth."""
+        scraper = WebScraper(user_agent="test-agent")
+        fetched = []
+        
+        async def scrape_iter(urls, **kwargs):
+            for url in urls:
+                fetched.append(url)
+                n = len(fetched)
+                yield self.page(url, {f"https://site{n}.com/battery": "battery news"})
+        scraper.scrape_iter = scrape_iter
+        seed = self.page("https://seed.com/", {"https://site0.com/battery": "battery news"})
+        
+        shallow = FocusedCrawler(scraper, max_pages=10, max_depth=1)
+        self.assertEqual(len([p async for p in shallow.crawl("battery", [seed])]), 1)
+        
+        fetched.clear()
+        deep = FocusedCrawler(scraper, max_pages=2, max_depth=5)
+        self.assertEqual(len([p async for p in deep.crawl("battery", [seed])]), 2)
+
+class TestConditionalRevalidation(unittest.IsolatedAsyncioTestCase):
+    """Test cases for ETag/Last-Modified revalidation of expired cache entries."""
+    
+    def setUp(self):
+        """Create a scraper with a temporary cache."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.scraper = WebScraper(user_agent="test-agent", respect_robots=False)
+        self.scraper.cache = ScraperCache(cache_dir=self.temp_dir.name, ttl=100)
+    
+    def tearDown(self):
+        """Remove the temporary cache."""
+        self.scraper.cache.store.close()
+        self.temp_dir.cleanup()
+    
+    @patch("shandu.cache.time.time")
+    async def test_not_modified_reuses_cached_extraction(self, mock_time):
+        """Test that a 304 response returns the cached content and refreshes it."""
+        mock_time.return_value = 1000
+        self.scraper.cache.set(ScrapedContent(
+            url="https://example.com/doc",
+            title="Reference",
+            text="Cached extraction",
+            html="<html></html>",
+            metadata={},
+            etag='"v1"',
+            last_modified="Wed, 21 Oct 2015 07:28:00 GMT"
+        ))
+        self.scraper.cache.store._memory.clear()
+        
+        # Past the TTL the entry must be revalidated rather than served
+        mock_time.return_value = 1200
+        self.scraper._get_page_simple = AsyncMock(return_value=(None, "text/html", 304))
+        
+        content = await self.scraper.scrape_url("https://example.com/doc", dynamic=False)
+        
+        self.assertEqual(content.text, "Cached extraction")
+        _, validators = self.scraper._get_page_simple.await_args.args
+        self.assertEqual(validators["If-None-Match"], '"v1"')
+        self.assertEqual(validators["If-Modified-Since"], "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.assertIsNotNone(self.scraper.cache.get("https://example.com/doc"))
+
+class TestHttpSessionPool(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the HttpSessionPool class."""
+    
+    async def test_session_reused_until_closed(self):
+        """Test that one pooled session is shared until close is called."""
+        pool = HttpSessionPool(limit_per_host=4)
+        
+        first = await pool.get_session()
+        second = await pool.get_session()
+        self.assertIs(first, second)
+        self.assertEqual(first.connector.limit_per_host, 4)
+        
+        await pool.close()
+        self.assertTrue(first.closed)
+        
+        third = await pool.get_session()
+        self.assertIsNot(first, third)
+        await pool.close()
+
+def _mock_playwright():
+    """Build a fake Playwright driver whose browsers hand out mock pages."""
+    def new_browser(*args, **kwargs):
+        browser = MagicMock()
+        browser.is_connected.return_value = True
+        browser.close = AsyncMock()
+        
+        async def new_context(**context_kwargs):
+            context = MagicMock()
+            context.close = AsyncMock()
+            context.clear_cookies = AsyncMock()
+            page = MagicMock()
+            page.is_closed.return_value = False
+            page.goto = AsyncMock()
+            context.new_page = AsyncMock(return_value=page)
+            return context
+        
+        browser.new_context = AsyncMock(side_effect=new_context)
+        return browser
+    
+    playwright = MagicMock()
+    playwright.chromium.launch = AsyncMock(side_effect=new_browser)
+    playwright.stop = AsyncMock()
+    starter = MagicMock()
+    starter.start = AsyncMock(return_value=playwright)
+    return starter, playwright
+
+class TestBrowserPool(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the BrowserPool class."""
+    
+    async def test_pages_reused_and_browser_restarted(self):
+        """Test that pages are reused and a crashed browser is relaunched."""
+        starter, playwright = _mock_playwright()
+        with patch("shandu.scraper.browser.async_playwright", return_value=starter):
+            pool = BrowserPool(max_pages=2)
+            
+            async with pool.page() as first:
+                pass
+            async with pool.page() as second:
+                pass
+            self.assertIs(first, second)
+            self.assertEqual(playwright.chromium.launch.await_count, 1)
+            
+            # Simulate a browser crash; the next checkout should relaunch
+            first.is_closed.return_value = True
+            pool._get_state().browsers[0].is_connected.return_value = False
+            async with pool.page() as third:
+                pass
+            self.assertIsNot(first, third)
+            self.assertEqual(playwright.chromium.launch.await_count, 2)
+            
+            await pool.close()
+            playwright.stop.assert_awaited_once()
+
+class TestDomainScheduler(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the DomainScheduler class."""
+    
+    async def test_per_domain_cap_and_fairness(self):
+        """Test that a busy host cannot starve other hosts."""
+        scheduler = DomainScheduler(max_concurrent=2, per_domain_concurrency=1, requests_per_second=1000, burst=1000)
+        order = []
+        
+        async def fetch(url):
+            async with scheduler.slot(url):
+                order.append(url)
+                await asyncio.sleep(0.01)
+        
+        urls = [f"https://busy.example.com/{i}" for i in range(3)] + ["https://other.example.org/"]
+        await asyncio.gather(*(fetch(url) for url in urls))
+        
+        # The other host is served before the busy host's backlog
+        self.assertLess(order.index("https://other.example.org/"), 2)
+        self.assertEqual(scheduler.in_flight, 0)
+        self.assertEqual(scheduler.queued, 0)
+    
+    async def test_rate_limit_and_defer(self):
+        """Test token-bucket pacing and Retry-After deferral."""
+        scheduler = DomainScheduler(requests_per_second=20, burst=1)
+        loop = asyncio.get_running_loop()
+        
+        start = loop.time()
+        for _ in range(3):
+            async with scheduler.slot("https://example.com/"):
+                pass
+        self.assertGreaterEqual(loop.time() - start, 0.09)
+        
+        scheduler.defer("example.com", 0.1)
+        start = loop.time()
+        async with scheduler.slot("https://example.com/"):
+            pass
+        self.assertGreaterEqual(loop.time() - start, 0.09)
+    
+    def test_adaptive_limit(self):
+        """Test additive growth, multiplicative backoff and the latency trigger."""
+        limit = AdaptiveLimit(initial=4, minimum=1, maximum=6, decrease_interval=0)
+        for _ in range(8):
+            limit.record(0.1)
+        self.assertEqual(limit.current, 5)
+        
+        # Growth needs the limit to be in use
+        before = limit.limit
+        limit.record(0.1, saturated=False)
+        self.assertEqual(limit.limit, before)
+        
+        limit.record(overloaded=True)
+        self.assertEqual(limit.current, 2)
+        
+        # A p95 well above its baseline also backs off
+        for _ in range(20):
+            limit.record(0.1)
+        rising = limit.current
+        for _ in range(10):
+            limit.record(1.0)
+        self.assertLess(limit.current, rising)
+        self.assertGreaterEqual(limit.current, 1)
+    
+    async def test_adaptive_scheduler_grants_more_slots(self):
+        """Test that a raised limit immediately grants waiting requests."""
+        scheduler = DomainScheduler(
+            max_concurrent=1, per_domain_concurrency=10, requests_per_second=1000, burst=1000,
+            limiter=AdaptiveLimit(initial=1, maximum=4)
+        )
+        slots = [asyncio.ensure_future(scheduler.acquire("https://example.com/")) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.stats(), {"limit": 1, "in_flight": 1, "queued": 2})
+        
+        scheduler.report(0.1)
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.stats(), {"limit": 2, "in_flight": 2, "queued": 1})
+        
+        scheduler.report(overloaded=True)
+        self.assertEqual(scheduler.max_concurrent, 1)
+        for task in slots:
+            task.cancel()
+        await asyncio.gather(*slots, return_exceptions=True)
+    
+    def test_parse_retry_after(self):
+        """Test Retry-After parsing."""
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+class TestExtraction(unittest.TestCase):
+    """Test cases for single-parse page extraction."""
+    
+    def test_extract_content(self):
+        """Test that one extraction yields title, main text, metadata and links."""
+        html = (
+            "<html><head><title>Article</title><meta name='description' content='About things'></head>"
+            "<body><nav><a href='/home'>Home</a></nav><article><h1>Heading</h1>"
+            "<p>" + "Substantial body text. " * 20 + "<a href='https://other.org/ref#note'>ref</a></p>"
+            "</article></body></html>"
+        )
+        result = extract_content(html, "https://example.com/post")
+        
+        self.assertEqual(result.title, "Article")
+        self.assertIn("Substantial body text.", result.text)
+        self.assertNotIn("Home", result.text)
+        self.assertEqual(result.metadata["description"], "About things")
+        self.assertEqual(result.links, ["https://example.com/home", "https://other.org/ref"])
+        self.assertEqual(result.anchors, {"https://example.com/home": "Home", "https://other.org/ref": "ref"})
+    
+    def test_canonical_link(self):
+        """Test that <link rel=canonical> is recorded in the metadata."""
+        html = (
+            "<html><head><link rel='Canonical' href='/articles/7'></head>"
+            "<body><p>Short page.</p></body></html>"
+        )
+        result = extract_content(html, "https://example.com/p?id=7")
+        
+        self.assertEqual(result.metadata["canonical_url"], "https://example.com/articles/7")
+    
+    def test_fallback_reads_main_container(self):
+        """Test the BeautifulSoup fallback for pages trafilatura finds too short."""
+        html = "<html><body><nav>Menu</nav><main><h2>Short</h2><p>Brief note.</p></main></body></html>"
+        result = extract_content(html, "https://example.com/note")
+        
+        self.assertEqual(result.text, "## Short\n\nBrief note.")
+        self.assertEqual(result.title, "note")
+
+class TestExtractionPool(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ExtractionPool class."""
+    
+    HTML = "<html><head><title>Pool Test</title></head><body><p>Extracted in a worker.</p></body></html>"
+    
+    async def test_inline_mode(self):
+        """Test that inline mode runs extraction in the caller."""
+        pool = ExtractionPool(inline=True)
+        content = await pool.run(extract_content, self.HTML, "https://example.com/")
+        
+        self.assertEqual(content.title, "Pool Test")
+        self.assertIsNone(pool._executor)
+    
+    async def test_process_mode(self):
+        """Test extraction in a worker process."""
+        pool = ExtractionPool(max_workers=1)
+        try:
+            content = await pool.run(extract_content, self.HTML, "https://example.com/")
+            # Workers are never forked from the threaded parent
+            self.assertIn(pool._executor._mp_context.get_start_method(), ("forkserver", "spawn"))
+        finally:
+            pool.shutdown()
+        
+        self.assertEqual(content.title, "Pool Test")
+        self.assertIn("Extracted in a worker.", content.text)
+    
+    async def test_timeout_returns_default(self):
+        """Test that a pathological page yields the default and restarts the workers."""
+        pool = ExtractionPool(max_workers=1, timeout=0.2)
+        try:
+            result = await pool.run(time.sleep, 5, default="timed out")
+            self.assertEqual(result, "timed out")
+            self.assertIsNone(pool._executor)
+            
+            # The pool recovers for the next page, given time to start a fresh worker
+            pool.timeout = 30
+            content = await pool.run(extract_content, self.HTML, "https://example.com/")
+            self.assertEqual(content.title, "Pool Test")
+        finally:
+            pool.shutdown()
+    
+    async def test_timeout_does_not_fail_other_pages(self):
+        """Test that pages queued behind a timed-out one are submitted again to the restarted pool."""
+        pool = ExtractionPool(max_workers=1, max_pending=4)
+        try:
+            # Start the worker before timing anything
+            await pool.run(extract_content, self.HTML, "https://example.com/")
+            pool.timeout = 1.5
+            stuck = asyncio.ensure_future(pool.run(time.sleep, 5, default="timed out"))
+            await asyncio.sleep(0.2)
+            queued = await asyncio.gather(*(pool.run(time.sleep, 0.2, default="failed") for _ in range(3)))
+            
+            self.assertEqual(await stuck, "timed out")
+            self.assertEqual(queued, [None, None, None])
+        finally:
+            pool.shutdown()
+    
+    async def test_worker_error_returns_default(self):
+        """Test that an exception raised inside the worker yields the default."""
+        pool = ExtractionPool(max_workers=1)
+        try:
+            self.assertEqual(await pool.run(int, "not a number", default="failed"), "failed")
+        finally:
+            pool.shutdown()
+    
+    async def test_exit_hook_tracks_running_pools(self):
+        """Test that pools join the shared exit hook while running and leave it on shutdown."""
+        pool = ExtractionPool(max_workers=1)
+        await pool.run(extract_content, self.HTML, "https://example.com/")
+        self.assertIn(pool, extraction._live_pools)
+        
+        pool.shutdown()
+        self.assertNotIn(pool, extraction._live_pools)
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    """Test cases for near-duplicate page detection."""
+    
+    VOCABULARY = [f"word{i}" for i in range(2000)]
+    STORY = " ".join(random.Random(1).choices(VOCABULARY, k=800))
+    OTHER = " ".join(random.Random(2).choices(VOCABULARY, k=800))
+    
+    def _page(self, url, text):
+        return ScrapedContent(url=url, title="Page", text=text, html="", metadata={})
+    
+    def test_fingerprint(self):
+        """Test that small edits keep fingerprints close and different texts far apart."""
+        syndicated = "Reposted from the wire. " + self.STORY.replace(self.STORY.split()[100], "edited", 1)
+        
+        self.assertLessEqual(hamming_distance(fingerprint(self.STORY), fingerprint(syndicated)), 3)
+        self.assertGreater(hamming_distance(fingerprint(self.STORY), fingerprint(self.OTHER)), 3)
+        self.assertIsNone(fingerprint("Too short to compare."))
+    
+    def test_collapse_keeps_source_urls(self):
+        """Test that duplicates fold into the first page and keep their URLs."""
+        index = NearDuplicateIndex()
+        pages = [
+            self._page("https://a.com/story", self.STORY),
+            self._page("https://b.com/wire", "Reposted. " + self.STORY),
+            self._page("https://c.com/museum", self.OTHER)
+        ]
+        
+        unique = index.collapse(pages)
+        
+        self.assertEqual([p.url for p in unique], ["https://a.com/story", "https://c.com/museum"])
+        self.assertEqual(unique[0].metadata["duplicate_urls"], ["https://b.com/wire"])
+        
+        # The same page found again for another query is kept
+        self.assertEqual(len(index.collapse([self._page("https://a.com/story", self.STORY)])), 1)
+    
+    def test_persistent_index(self):
+        """Test that copies of a page from an earlier run are collapsed onto the first copy in this run."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "dedup.db")
+            index = NearDuplicateIndex(path=path)
+            index.collapse([self._page("https://a.com/story", self.STORY)])
+            index.close()
+            
+            index = NearDuplicateIndex(path=path)
+            unique = index.collapse([
+                self._page("https://b.com/wire", self.STORY),
+                self._page("https://c.com/repost", "Reposted. " + self.STORY)
+            ])
+            index.close()
+        
+        self.assertEqual([p.url for p in unique], ["https://b.com/wire"])
+        self.assertEqual(unique[0].metadata["duplicate_urls"], ["https://c.com/repost"])
+    
+    def test_collapse_leaves_cached_pages_unchanged(self):
+        """Test that collapsing a cached page again does not repeat its duplicate URLs."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ScraperCache(cache_dir=temp_dir)
+            try:
+                cache.set(self._page("https://a.com/story", self.STORY))
+                for _ in range(3):
+                    unique = NearDuplicateIndex().collapse([
+                        cache.get("https://a.com/story"),
+                        self._page("https://b.com/wire", "Reposted. " + self.STORY)
+                    ])
+                    self.assertEqual(unique[0].metadata["duplicate_urls"], ["https://b.com/wire"])
+                self.assertNotIn("duplicate_urls", cache.get("https://a.com/story").metadata)
+            finally:
+                cache.store.close()
+    
+    def test_shared_representatives(self):
+        """Test that a copy found in a later batch folds into the earlier batch's page."""
+        index = NearDuplicateIndex()
+        representatives = {}
+        first = index.collapse([self._page("https://a.com/story", self.STORY)], representatives)
+        second = index.collapse([self._page("https://b.com/wire", "Reposted. " + self.STORY)], representatives)
+        
+        self.assertEqual(second, [])
+        self.assertEqual(first[0].metadata["duplicate_urls"], ["https://b.com/wire"])
+
 class TestScraperCache(unittest.TestCase):
     """Test cases for the ScraperCache class."""
     
-    @patch("shandu.scraper.scraper.os.path.exists")
-    @patch("shandu.scraper.scraper.open")
-    @patch("shandu.scraper.scraper.json.load")
-    @patch("shandu.scraper.scraper.time.time")
-    def test_get_cache_hit(self, mock_time, mock_json_load, mock_open, mock_exists):
+    def setUp(self):
+        """Create a cache in a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ScraperCache(cache_dir=self.temp_dir.name, ttl=200)
+    
+    def tearDown(self):
+        """Remove the temporary cache."""
+        self.cache.store.close()
+        self.temp_dir.cleanup()
+    
+    def _content(self, url="https://example.com", text="Cached content"):
+        return ScrapedContent(
+            url=url,
+            title="Example",
+            text=text,
+            html=f"<html><body>{text}</body></html>",
+            metadata={"key": "value"},
+            content_type="text/html",
+            status_code=200,
+            links=["https://example.com/next"]
+        )
+    
+    def test_get_cache_hit(self):
         """Test get method with cache hit."""
-        # Mock file exists
-        mock_exists.return_value = True
-        
-        # Mock time
-        mock_time.return_value = 1000
+        self.cache.set(self._content())
         
-        # Mock JSON data
-        mock_json_load.return_value = {
-            "timestamp": 900,  # Within TTL
-            "content": {
-                "url": "https://example.com",
-                "title": "Example",
-                "text": "Cached content",
-                "html": "<html><body>Cached content</body></html>",
-                "metadata": {},
-                "content_type": "text/html",
-                "status_code": 200,
-                "timestamp": "2023-01-01T00:00:00"
-            }
-        }
-        
-        # Create cache with TTL of 200 seconds
-        cache = ScraperCache(ttl=200)
-        
-        # Get cached content
-        content = cache.get("https://example.com")
+        # Read back from disk rather than the in-memory tier
+        fresh_cache = ScraperCache(cache_dir=self.temp_dir.name, ttl=200)
+        content = fresh_cache.get("https://example.com")
+        fresh_cache.store.close()
         
         # Check if content was retrieved from cache
         self.assertIsNotNone(content)
         self.assertEqual(content.url, "https://example.com")
         self.assertEqual(content.title, "Example")
         self.assertEqual(content.text, "Cached content")
+        self.assertEqual(content.html, "<html><body>Cached content</body></html>")
+        self.assertEqual(content.metadata, {"key": "value"})
+        self.assertEqual(content.extraction.links, ["https://example.com/next"])
     
-    @patch("shandu.scraper.scraper.os.path.exists")
-    def test_get_cache_miss(self, mock_exists):
+    def test_get_cache_miss(self):
         """Test get method with cache miss."""
-        # Mock file does not exist
-        mock_exists.return_value = False
-        
-        # Create cache
-        cache = ScraperCache()
-        
         # Get non-existent cached content
-        content = cache.get("https://example.com")
+        content = self.cache.get("https://example.com")
         
         # Check if content is None
         self.assertIsNone(content)
     
-    @patch("shandu.scraper.scraper.open")
-    @patch("shandu.scraper.scraper.json.dump")
-    @patch("shandu.scraper.scraper.time.time")
-    def test_set(self, mock_time, mock_json_dump, mock_open):
-        """Test set method."""
-        # Mock time
+    @patch("shandu.cache.time.time")
+    def test_get_cache_expired(self, mock_time):
+        """Test that entries past their TTL are not returned."""
         mock_time.return_value = 1000
+        self.cache.set(self._content())
         
-        # Create cache
-        cache = ScraperCache()
+        mock_time.return_value = 1300
+        self.assertIsNone(self.cache.get("https://example.com"))
+    
+    def test_set(self):
+        """Test set method."""
+        # Cache content
+        self.cache.set(self._content(text="Some content"))
         
-        # Create content to cache
-        content = ScrapedContent(
-            url="https://example.com",
-            title="Example",
-            text="Some content",
-            html="<html><body>Some content</body></html>",
-            metadata={}
-        )
+        stored = self.cache.store.get(self.cache._get_cache_key("https://example.com"))
+        self.assertEqual(stored["url"], "https://example.com")
+        self.assertEqual(stored["title"], "Example")
+        self.assertEqual(stored["text"], "Some content")
         
-        # Cache content
-        cache.set(content)
+        # Only ScrapedContent objects can be cached
+        with self.assertRaises(ValueError):
+            self.cache.set({"url": "https://example.com"})
+    
+    def test_async_get_and_set(self):
+        """Test the non-blocking accessors."""
+        async def roundtrip():
+            await self.cache.aset(self._content())
+            return await self.cache.aget("https://example.com")
+        
+        content = asyncio.run(roundtrip())
+        self.assertEqual(content.text, "Cached content")
+    
+    def test_lazy_html(self):
+        """Test that a lazy-HTML cache returns content without HTML and loads it on demand."""
+        self.cache.set(self._content())
+        lazy_cache = ScraperCache(cache_dir=self.temp_dir.name, ttl=200, lazy_html=True)
+        try:
+            content = lazy_cache.get("https://example.com")
+            self.assertIsNone(content.html)
+            self.assertEqual(content.text, "Cached content")
+            self.assertEqual(lazy_cache.load_html("https://www.example.com/"), "<html><body>Cached content</body></html>")
+        finally:
+            lazy_cache.store.close()
+    
+    def test_removes_legacy_files(self):
+        """Test that old per-URL JSON files are deleted once, when the store is first created."""
+        cache_dir = os.path.join(self.temp_dir.name, "upgraded")
+        os.makedirs(cache_dir)
+        legacy = os.path.join(cache_dir, "0123456789abcdef0123456789abcdef.json")
+        unrelated = os.path.join(cache_dir, "notes.json")
+        for path in (legacy, unrelated):
+            with open(path, "w") as f:
+                json.dump({"timestamp": 0, "content": {}}, f)
         
-        # Check if content was cached correctly
-        mock_json_dump.assert_called_once()
-        args, _ = mock_json_dump.call_args
-        data = args[0]
+        ScraperCache(cache_dir=cache_dir).store.close()
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(unrelated))
         
-        self.assertEqual(data["timestamp"], 1000)
-        self.assertEqual(data["content"]["url"], "https://example.com")
-        self.assertEqual(data["content"]["title"], "Example")
-        self.assertEqual(data["content"]["text"], "Some content")
+        # With the store in place, files are no longer touched
+        with open(legacy, "w") as f:
+            json.dump({"timestamp": 0, "content": {}}, f)
+        ScraperCache(cache_dir=cache_dir).store.close()
+        self.assertTrue(os.path.exists(legacy))
 
 if __name__ == "__main__":
     unittest.main()
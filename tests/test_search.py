@@ -3,8 +3,14 @@ import unittest
 from unittest.mock import patch, MagicMock, AsyncMock
 import asyncio
 import json
+import os
+import tempfile
 from datetime import datetime
-from shandu.search.search import UnifiedSearcher, SearchResult, SearchCache
+from shandu.search.search import (
+    UnifiedSearcher, SearchResult, SearchCache, parse_google_results,
+    DUCKDUCKGO_URL, DUCKDUCKGO_NEWS_URL, DUCKDUCKGO_HTML_URL, ARXIV_API_URL
+)
+from tests import setUpModule, tearDownModule
 
 class TestSearchResult(unittest.TestCase):
     """Test the SearchResult class."""
@@ -56,6 +62,11 @@ class TestSearchResult(unittest.TestCase):
         self.assertEqual(result.snippet, "Test snippet")
         self.assertEqual(result.source, "Test Source")
     
+    def test_slots(self):
+        """Test that search results carry no per-instance __dict__."""
+        result = SearchResult(title="Title", url="https://example.com", snippet="Snippet", source="Test")
+        self.assertFalse(hasattr(result, "__dict__"))
+    
     def test_to_dict(self):
         """Test dictionary conversion."""
         result = SearchResult(
@@ -120,53 +131,14 @@ class TestUnifiedSearcher(unittest.TestCase):
         humanized = self.searcher._humanize_query(query)
         self.assertLess(len(humanized), len(query))
     
-    def test_parse_ddg_results(self):
-        """Test DuckDuckGo results parsing."""
-        # Test with valid results
-        results_str = """
-        snippet: This is the first snippet, title: First Result, link: https://example.com/1, date: 2023-01-01, source: Example
-        snippet: This is the second snippet, title: Second Result, link: https://example.com/2, source: Example
-        """
-        
-        parsed = self.searcher._parse_ddg_results(results_str)
-        
-        self.assertEqual(len(parsed), 2)
-        self.assertEqual(parsed[0].title, "First Result")
-        self.assertEqual(parsed[0].url, "https://example.com/1")
-        self.assertEqual(parsed[0].snippet, "This is the first snippet")
-        self.assertEqual(parsed[0].source, "DuckDuckGo")
-        self.assertEqual(parsed[0].date, "2023-01-01")
-        
-        self.assertEqual(parsed[1].title, "Second Result")
-        self.assertEqual(parsed[1].url, "https://example.com/2")
-        self.assertEqual(parsed[1].snippet, "This is the second snippet")
-        self.assertEqual(parsed[1].source, "DuckDuckGo")
-        self.assertIsNone(parsed[1].date)
-        
-        # Test with invalid results
-        results_str = "This is not a valid result format"
-        parsed = self.searcher._parse_ddg_results(results_str)
-        self.assertEqual(len(parsed), 0)
-        
-        # Test with empty results
-        parsed = self.searcher._parse_ddg_results("")
-        self.assertEqual(len(parsed), 0)
-    
-    @patch("shandu.search.search.google_search")
-    async def test_async_google_search(self, mock_google_search):
+    @patch("shandu.search.search.UnifiedSearcher._fetch_google")
+    async def test_async_google_search(self, mock_fetch_google):
         """Test Google search integration."""
-        # Mock google_search
-        mock_result1 = MagicMock()
-        mock_result1.title = "First Result"
-        mock_result1.url = "https://example.com/1"
-        mock_result1.description = "This is the first result"
-        
-        mock_result2 = MagicMock()
-        mock_result2.title = "Second Result"
-        mock_result2.url = "https://example.com/2"
-        mock_result2.description = "This is the second result"
-        
-        mock_google_search.return_value = [mock_result1, mock_result2]
+        # Mock the fetched result page
+        mock_fetch_google.return_value = [
+            {"title": "First Result", "url": "https://example.com/1", "description": "This is the first result"},
+            {"title": "Second Result", "url": "https://example.com/2", "description": "This is the second result"}
+        ]
         
         # Test search
         results = await self.searcher._async_google_search("test query", 2)
@@ -183,7 +155,7 @@ class TestUnifiedSearcher(unittest.TestCase):
         self.assertEqual(results[1].source, "Google")
         
         # Test with exception
-        mock_google_search.side_effect = Exception("Search failed")
+        mock_fetch_google.side_effect = Exception("Search failed")
         results = await self.searcher._async_google_search("test query", 2)
         self.assertEqual(len(results), 0)
     
@@ -305,63 +277,460 @@ class TestUnifiedSearcher(unittest.TestCase):
         # Test with empty results
         merged = self.searcher.merge_results([])
         self.assertEqual(len(merged), 0)
+        
+        # Variants of the same URL are merged into one result
+        duplicate = SearchResult(
+            title="Google Result",
+            url="http://www.example.com/google/?utm_source=search",
+            snippet="Google snippet",
+            source="DuckDuckGo"
+        )
+        merged = self.searcher.merge_results(results + [duplicate], "alternate")
+        self.assertEqual(len(merged), 4)
+
+class TestGoogleSearch(unittest.IsolatedAsyncioTestCase):
+    """Test the non-blocking Google engine."""
+    
+    def setUp(self):
+        """Create a searcher with an empty cache."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.searcher = UnifiedSearcher()
+        self.searcher.cache = SearchCache(cache_dir=self.temp_dir.name)
+    
+    def tearDown(self):
+        """Close the cache and remove its files."""
+        self.searcher.cache.close()
+        self.temp_dir.cleanup()
+    
+    def test_parse_google_results(self):
+        """Test reading results from Google's plain result markup."""
+        html = (
+            "<div class='ezO2md'><a href='/url?q=https://example.com/a%3Fx%3D1&sa=U'>"
+            "<span class='CVA68e'>Result A</span></a><span class='FrIlee'>About A</span></div>"
+            "<div class='ezO2md'><a href='/search?q=related'><span class='CVA68e'>Related</span></a></div>"
+            "<div class='ezO2md'><a href='/url?q=https://example.com/a%3Fx%3D1&sa=U'>"
+            "<span class='CVA68e'>Result A again</span></a></div>"
+        )
+        self.assertEqual(parse_google_results(html), [
+            {"url": "https://example.com/a?x=1", "title": "Result A", "description": "About A"}
+        ])
+    
+    async def test_slow_google_does_not_block_other_engines(self):
+        """Test that other engines finish while Google waits on the network."""
+        finished = []
+        
+        async def fetch_google(query, count):
+            await asyncio.sleep(0.2)
+            finished.append("google")
+            return [{"title": "Google", "url": "https://example.com/g", "description": ""}]
+        
+        async def search_duckduckgo(query):
+            finished.append("duckduckgo")
+            return [SearchResult(title="DDG", url="https://example.com/d", snippet="", source="DuckDuckGo")]
+        
+        self.searcher._fetch_google = fetch_google
+        self.searcher._search_duckduckgo = search_duckduckgo
+        results = await self.searcher.search("query", ["google", "duckduckgo"])
+        
+        self.assertEqual(finished, ["duckduckgo", "google"])
+        self.assertEqual(len(results), 2)
+    
+    @patch("shandu.search.search.config.get")
+    async def test_deadline_and_concurrency_cap(self, mock_config_get):
+        """Test that Google calls give up at their deadline and run one at a time."""
+        mock_config_get.side_effect = lambda section, key, default=None: 0.1 if key == "google_deadline" else default
+        running = []
+        peak = []
+        
+        async def fetch_google(query, count):
+            running.append(query)
+            peak.append(len(running))
+            try:
+                await asyncio.sleep(0.05 if query == "fast" else 10)
+            finally:
+                running.remove(query)
+            return [{"title": query, "url": f"https://example.com/{query}", "description": ""}]
+        self.searcher._fetch_google = fetch_google
+        
+        started = asyncio.get_running_loop().time()
+        fast, stuck = await asyncio.gather(
+            self.searcher._async_google_search("fast", 2),
+            self.searcher._async_google_search("stuck", 2)
+        )
+        
+        self.assertEqual(stuck, [])
+        self.assertEqual([r.title for r in fast], ["fast"])
+        self.assertEqual(max(peak), 1)
+        self.assertLess(asyncio.get_running_loop().time() - started, 1)
+    
+    @patch("shandu.search.search.config.get")
+    async def test_deadline_covers_waiting_for_a_slot(self, mock_config_get):
+        """Test that calls queued behind a stuck search give up at their own deadline."""
+        mock_config_get.side_effect = lambda section, key, default=None: 0.2 if key == "google_deadline" else default
+        
+        async def fetch_google(query, count):
+            await asyncio.sleep(10)
+        self.searcher._fetch_google = fetch_google
+        
+        started = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*(self.searcher._async_google_search(f"stuck {i}", 2) for i in range(3)))
+        
+        self.assertEqual(results, [[], [], []])
+        self.assertLess(asyncio.get_running_loop().time() - started, 0.4)
+
+class TestWikipediaSearch(unittest.IsolatedAsyncioTestCase):
+    """Test the batched Wikipedia engine."""
+    
+    def setUp(self):
+        """Create a searcher with an empty cache and a mocked pooled session."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.searcher = UnifiedSearcher()
+        self.searcher.cache = SearchCache(cache_dir=self.temp_dir.name)
+        self.session = MagicMock()
+        self.searcher.session_pool.get_session = AsyncMock(return_value=self.session)
+    
+    def tearDown(self):
+        """Close the cache and remove its files."""
+        self.searcher.cache.close()
+        self.temp_dir.cleanup()
+    
+    def _respond(self, *pages):
+        response = MagicMock()
+        response.raise_for_status = MagicMock()
+        response.json = AsyncMock(return_value={"query": {"pages": list(pages)}})
+        self.session.get.return_value.__aenter__ = AsyncMock(return_value=response)
+        self.session.get.return_value.__aexit__ = AsyncMock(return_value=False)
+    
+    @staticmethod
+    def _page(title, index, extract, **extra):
+        page = {"title": title, "index": index, "extract": extract,
+                "fullurl": "https://en.wikipedia.org/wiki/" + title.replace(" ", "_")}
+        page.update(extra)
+        return page
+    
+    async def test_one_request_per_query(self):
+        """Test that hits, extracts and URLs arrive in one ranked request."""
+        long_intro = " ".join(f"Sentence {i}." for i in range(1, 9))
+        self._respond(
+            self._page("Battery", 2, "A battery stores energy."),
+            self._page("Lithium-ion battery", 1, long_intro),
+            self._page("Cell", 3, "Cell may refer to:", pageprops={"disambiguation": ""})
+        )
+        
+        results = await self.searcher._search_wikipedia("battery", 3)
+        
+        self.assertEqual(self.session.get.call_count, 1)
+        params = self.session.get.call_args.kwargs["params"]
+        self.assertEqual((params["generator"], params["gsrlimit"], params["exintro"]), ("search", "3", "1"))
+        self.assertEqual([r.title for r in results], ["Lithium-ion battery", "Battery"])
+        self.assertEqual(results[0].url, "https://en.wikipedia.org/wiki/Lithium-ion_battery")
+        self.assertEqual(results[0].snippet, "Sentence 1. Sentence 2. Sentence 3. Sentence 4. Sentence 5.")
+        self.assertEqual(results[0].metadata["full_content"], long_intro)
+        self.assertEqual(results[1].source, "Wikipedia")
+    
+    async def test_only_missing_extracts_are_fetched(self):
+        """Test that cached hits and extracts are reused and the rest fetched in one batch."""
+        await self.searcher.cache.aset("storage", "wikipedia-hits", [{"title": "Battery"}, {"title": "Flywheel"}])
+        await self.searcher.cache.aset("Battery", "wikipedia-extract", [
+            {"title": "Battery", "url": "https://en.wikipedia.org/wiki/Battery", "extract": "A battery stores energy."}
+        ])
+        self._respond(self._page("Flywheel", 0, "A flywheel stores rotational energy."))
+        
+        results = await self.searcher._search_wikipedia("storage", 3)
+        
+        self.assertEqual(self.session.get.call_args.kwargs["params"]["titles"], "Flywheel")
+        self.assertEqual([r.title for r in results], ["Battery", "Flywheel"])
+        
+        # Everything is cached now
+        self.session.get.reset_mock()
+        await self.searcher._search_wikipedia("storage", 3)
+        self.session.get.assert_not_called()
+
+class TestNativeEngines(unittest.IsolatedAsyncioTestCase):
+    """Test the async DuckDuckGo and arXiv clients."""
+    
+    ARXIV_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">
+  <entry>
+    <id>http://arxiv.org/abs/2101.00001v1</id>
+    <published>2021-01-01T18:00:00Z</published>
+    <title>Solid-State Batteries:
+      A Review</title>
+    <summary>  We review progress in
+      solid-state electrolytes.</summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+    <arxiv:doi>10.1000/example</arxiv:doi>
+    <link href="http://arxiv.org/abs/2101.00001v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2101.00001v1" rel="related" type="application/pdf"/>
+    <category term="cond-mat.mtrl-sci"/>
+    <category term="physics.chem-ph"/>
+  </entry>
+</feed>"""
+    
+    DUCKDUCKGO_HTML = """<html><body>
+  <div class="result results_links result--ad">
+    <a class="result__a" href="https://duckduckgo.com/y.js?ad_domain=shop.com">Buy batteries</a>
+  </div>
+  <div class="result results_links">
+    <h2><a class="result__a" href="//duckduckgo.com/l/?uddg=https%3A%2F%2Fexample.com%2Fbatteries&amp;rut=abc">Battery <b>storage</b></a></h2>
+    <a class="result__snippet" href="#">Grid-scale <b>battery</b> storage explained.</a>
+  </div>
+  <div class="result results_links">
+    <h2><a class="result__a" href="https://example.org/flywheels">Flywheels</a></h2>
+  </div>
+</body></html>"""
+    
+    def setUp(self):
+        """Create a searcher with an empty cache and a mocked pooled session."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.searcher = UnifiedSearcher()
+        self.searcher.cache = SearchCache(cache_dir=self.temp_dir.name)
+        self.session = MagicMock()
+        self.searcher.session_pool.get_session = AsyncMock(return_value=self.session)
+        self.responses = {}
+        self.session.get.side_effect = self._request
+        self.session.post.side_effect = self._request
+    
+    def tearDown(self):
+        """Close the cache and remove its files."""
+        self.searcher.cache.close()
+        self.temp_dir.cleanup()
+    
+    def _request(self, url, **kwargs):
+        status, body = self.responses[url]
+        response = MagicMock(status=status)
+        response.raise_for_status = MagicMock()
+        response.text = AsyncMock(return_value=body if isinstance(body, str) else json.dumps(body))
+        response.json = AsyncMock(return_value=body)
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=response)
+        context.__aexit__ = AsyncMock(return_value=False)
+        return context
+    
+    async def test_duckduckgo_news(self):
+        """Test that news results come back structured and are cached."""
+        self.responses[DUCKDUCKGO_URL] = (200, '<script>vqd="4-123456789";</script>')
+        self.responses[DUCKDUCKGO_NEWS_URL] = (200, {"results": [
+            {"title": "Battery breakthrough", "url": "https://news.com/a", "excerpt": "A <b>new</b> cell",
+             "date": 1609459200, "source": "News Co"},
+            {"title": "Duplicate", "url": "https://news.com/a", "excerpt": "", "date": 1609459200, "source": "News Co"}
+        ]})
+        
+        results = await self.searcher._search_duckduckgo("battery")
+        
+        self.assertEqual(self.session.get.call_args.kwargs["params"]["vqd"], "4-123456789")
+        self.assertEqual(len(results), 1)
+        self.assertEqual((results[0].title, results[0].url, results[0].snippet),
+                         ("Battery breakthrough", "https://news.com/a", "A new cell"))
+        self.assertEqual(results[0].date, "2021-01-01T00:00:00+00:00")
+        self.assertEqual(results[0].metadata["publisher"], "News Co")
+        self.session.post.assert_not_called()
+        
+        self.session.get.reset_mock()
+        await self.searcher._search_duckduckgo("battery")
+        self.session.get.assert_not_called()
+    
+    async def test_duckduckgo_falls_back_to_html(self):
+        """Test that a rate-limited news search is answered from the HTML results page."""
+        self.responses[DUCKDUCKGO_URL] = (200, '<script>vqd="4-123456789";</script>')
+        self.responses[DUCKDUCKGO_NEWS_URL] = (202, {})
+        self.responses[DUCKDUCKGO_HTML_URL] = (200, self.DUCKDUCKGO_HTML)
+        
+        results = await self.searcher._search_duckduckgo("battery storage")
+        
+        self.assertEqual(self.session.post.call_args.kwargs["data"]["q"], "battery storage")
+        self.assertEqual([r.url for r in results], ["https://example.com/batteries", "https://example.org/flywheels"])
+        self.assertEqual(results[0].title, "Battery storage")
+        self.assertEqual(results[0].snippet, "Grid-scale battery storage explained.")
+        self.assertEqual(results[1].snippet, "")
+    
+    async def test_arxiv_feed(self):
+        """Test that papers are read from the Atom feed with their metadata."""
+        self.responses[ARXIV_API_URL] = (200, self.ARXIV_FEED)
+        
+        results = await self.searcher._search_arxiv("solid-state batteries", 2)
+        
+        params = self.session.get.call_args.kwargs["params"]
+        self.assertEqual((params["search_query"], params["max_results"]), ("solid-state batteries research paper", "2"))
+        self.assertEqual(len(results), 1)
+        paper = results[0]
+        self.assertEqual((paper.title, paper.url, paper.date, paper.source),
+                         ("Solid-State Batteries: A Review", "https://arxiv.org/abs/2101.00001v1", "2021-01-01", "arXiv"))
+        self.assertEqual(paper.snippet, "We review progress in solid-state electrolytes.")
+        self.assertEqual(paper.metadata["authors"], ["Ada Lovelace", "Alan Turing"])
+        self.assertEqual(paper.metadata["categories"], ["cond-mat.mtrl-sci", "physics.chem-ph"])
+        self.assertEqual(paper.metadata["pdf_url"], "http://arxiv.org/pdf/2101.00001v1")
+        self.assertEqual(paper.metadata["doi"], "10.1000/example")
+    
+    async def test_engine_concurrency_cap(self):
+        """Test that no more DuckDuckGo searches run at once than its configured limit."""
+        running = []
+        peak = []
+        
+        async def fetch(query, backend):
+            running.append(query)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.remove(query)
+            return []
+        self.searcher._fetch_duckduckgo = fetch
+        
+        await asyncio.gather(*(self.searcher._search_duckduckgo(f"query {i}") for i in range(5)))
+        
+        self.assertEqual(max(peak), self.searcher.engine_limits.limit("duckduckgo"))
+        self.assertEqual(self.searcher.engine_limits.limit("duckduckgo"), 2)
+        self.assertEqual(self.searcher.engine_limits.limit("arxiv"), 1)
+
+class TestSearchCoalescing(unittest.IsolatedAsyncioTestCase):
+    """Test single-flight sharing of identical concurrent searches."""
+    
+    async def test_concurrent_identical_searches_share_one_call(self):
+        """Test that overlapping searches for the same normalized query hit the engine once."""
+        searcher = UnifiedSearcher()
+        calls = []
+        
+        async def search_duckduckgo(query):
+            calls.append(query)
+            await asyncio.sleep(0.05)
+            return [SearchResult(title="Result", url="https://example.com/", snippet="Snippet", source="DuckDuckGo")]
+        searcher._search_duckduckgo = search_duckduckgo
+        
+        first, second, other = await asyncio.gather(
+            searcher.search("Solar  Panels", engines=["duckduckgo"]),
+            searcher.search("solar panels", engines=["duckduckgo"]),
+            searcher.search("wind turbines", engines=["duckduckgo"])
+        )
+        
+        self.assertEqual(calls, ["Solar  Panels", "wind turbines"])
+        self.assertEqual(searcher.coalesced_searches, 1)
+        self.assertEqual([r.url for r in first], [r.url for r in second])
+        self.assertEqual(len(other), 1)
+        
+        # Finished searches are not shared; later calls go to the cache and engine again
+        await searcher.search("solar panels", engines=["duckduckgo"])
+        self.assertEqual(len(calls), 3)
+    
+    async def test_cancelled_caller_does_not_abort_shared_search(self):
+        """Test that cancelling one waiter leaves the search running for the others."""
+        searcher = UnifiedSearcher()
+        
+        async def search_duckduckgo(query):
+            await asyncio.sleep(0.05)
+            return [SearchResult(title="Result", url="https://example.com/", snippet="Snippet", source="DuckDuckGo")]
+        searcher._search_duckduckgo = search_duckduckgo
+        
+        impatient = asyncio.ensure_future(searcher.search("query", engines=["duckduckgo"]))
+        patient = asyncio.ensure_future(searcher.search("query", engines=["duckduckgo"]))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        
+        self.assertEqual(len(await patient), 1)
 
-class TestSearchCache(unittest.TestCase):
+class TestSearchCache(unittest.IsolatedAsyncioTestCase):
     """Test the SearchCache class."""
     
-    @patch("shandu.search.search.os.path.exists")
-    @patch("shandu.search.search.open")
-    @patch("shandu.search.search.json.load")
-    @patch("shandu.search.search.time.time")
-    def test_get_cache_hit(self, mock_time, mock_json_load, mock_open, mock_exists):
-        """Test cache retrieval hit."""
-        # Mock file exists
-        mock_exists.return_value = True
+    def setUp(self):
+        """Create a cache in a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = SearchCache(cache_dir=self.temp_dir.name, ttl=200, memory_items=0)
+        self.results = [
+            SearchResult(
+                title="Cached Result",
+                url="https://example.com/cached",
+                snippet="Cached snippet",
+                source="Cached Source"
+            )
+        ]
+    
+    def tearDown(self):
+        """Close the cache and remove its files."""
+        self.cache.close()
+        self.temp_dir.cleanup()
+    
+    def test_get_cache_hit(self):
+        """Test cache retrieval hit, shared by case and spacing variants of the query."""
+        self.cache.set("Test  Query", "test-engine", self.results)
         
-        # Mock time
-        mock_time.return_value = 1000
+        results = self.cache.get("test query", "test-engine")
         
-        # Mock JSON data
-        mock_json_load.return_value = {
-            "timestamp": 900,  # Within TTL
-            "results": [
-                {
-                    "title": "Cached Result",
-                    "url": "https://example.com/cached",
-                    "snippet": "Cached snippet",
-                    "source": "Cached Source"
-                }
-            ]
-        }
-        
-        # Create cache with TTL of 200 seconds
-        cache = SearchCache(ttl=200)
-        
-        # Get cached results
-        results = cache.get("test query", "test-engine")
-        
-        # Check if results were retrieved from cache
         self.assertIsNotNone(results)
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]["title"], "Cached Result")
         self.assertEqual(results[0]["url"], "https://example.com/cached")
         self.assertEqual(results[0]["snippet"], "Cached snippet")
         self.assertEqual(results[0]["source"], "Cached Source")
+        self.assertIsNone(self.cache.get("test query", "other-engine"))
     
-    @patch("shandu.search.search.os.path.exists")
-    def test_get_cache_miss(self, mock_exists):
+    def test_get_cache_miss(self):
         """Test cache retrieval miss."""
-        # Mock file does not exist
-        mock_exists.return_value = False
+        self.assertIsNone(self.cache.get("test query", "test-engine"))
+    
+    @patch("shandu.cache.time.time")
+    def test_expired_entries_are_purged(self, mock_time):
+        """Test that entries past their TTL are missed and then deleted."""
+        mock_time.return_value = 1000
+        self.cache.set("test query", "test-engine", self.results)
+        
+        mock_time.return_value = 1300
+        self.assertIsNone(self.cache.get("test query", "test-engine"))
+        self.assertEqual(self.cache.store.purge_expired(), 1)
+    
+    async def test_async_get_and_set(self):
+        """Test the non-blocking accessors."""
+        await self.cache.aset("test query", "test-engine", self.results)
+        
+        results = await self.cache.aget("test query", "test-engine")
+        
+        self.assertEqual(results, [self.results[0].to_dict()])
+    
+    def test_removes_legacy_files(self):
+        """Test that old per-query JSON files are deleted once, when the store is first created."""
+        cache_dir = os.path.join(self.temp_dir.name, "upgraded")
+        os.makedirs(cache_dir)
+        legacy = os.path.join(cache_dir, "0123456789abcdef0123456789abcdef.json")
+        unrelated = os.path.join(cache_dir, "notes.json")
+        for path in (legacy, unrelated):
+            with open(path, "w") as f:
+                json.dump({"timestamp": 0, "results": []}, f)
+        
+        cache = SearchCache(cache_dir=cache_dir)
+        cache.set("query", "test-engine", self.results)
+        cache.close()
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(unrelated))
+        
+        # With the store in place, files are no longer touched
+        with open(legacy, "w") as f:
+            json.dump({"timestamp": 0, "results": []}, f)
+        SearchCache(cache_dir=cache_dir).close()
+        self.assertTrue(os.path.exists(legacy))
+    
+    def test_reopens_after_close(self):
+        """Test that a closed cache reopens its store on the next access."""
+        self.cache.set("query", "test-engine", self.results)
+        self.cache.close()
+        
+        self.assertEqual(self.cache.get("query", "test-engine"), [self.results[0].to_dict()])
+
+class TestSearcherClose(unittest.IsolatedAsyncioTestCase):
+    """Test releasing a searcher's resources."""
+    
+    async def test_close_closes_cache(self):
+        """Test that close() releases the cache's store and a later search still works."""
+        searcher = UnifiedSearcher()
         
-        # Create cache
-        cache = SearchCache()
+        async def search_duckduckgo(query):
+            return [SearchResult(title="Result", url="https://example.com/", snippet="Snippet", source="DuckDuckGo")]
+        searcher._search_duckduckgo = search_duckduckgo
         
-        # Get non-existent cached results
-        results = cache.get("test query", "test-engine")
+        await searcher.search("query", engines=["duckduckgo"])
+        store = searcher.cache.store
+        await searcher.close()
         
-        # Check if results are None
-        self.assertIsNone(results)
+        self.assertTrue(store._closed.is_set())
+        self.assertEqual(len(await searcher.search("query", engines=["duckduckgo"])), 1)
+        await searcher.close()
 
 if __name__ == "__main__":
     unittest.main()
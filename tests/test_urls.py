@@ -0,0 +1,54 @@
+"""
+Tests for URL canonicalization.
+"""
+import unittest
+from shandu.urls import URLCanonicalizer
+
+class TestURLCanonicalizer(unittest.TestCase):
+    """Test cases for the URLCanonicalizer class."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.canonicalizer = URLCanonicalizer({"example.org": {"keep_fragment": True, "drop_params": ["session"]}})
+
+    def test_variants_share_a_canonical_form(self):
+        """Test that scheme, www., tracking, fragment, order, slash and AMP variants collapse."""
+        variants = [
+            "https://example.com/news/story?a=1&b=2",
+            "http://example.com/news/story?a=1&b=2",
+            "https://www.Example.com/news/story/?b=2&a=1",
+            "https://example.com/news/story?a=1&b=2&utm_source=feed&fbclid=xyz#comments",
+            "https://example.com:443/amp/news/story?a=1&b=2",
+            "https://example.com/news/story/amp?a=1&b=2&amp=1"
+        ]
+        canonical = {self.canonicalizer.normalize(url) for url in variants}
+        self.assertEqual(canonical, {"https://example.com/news/story?a=1&b=2"})
+
+    def test_domain_rules(self):
+        """Test per-domain rules, including rules for parent domains."""
+        self.assertEqual(
+            self.canonicalizer.normalize("https://www.youtube.com/watch?v=abc&feature=share"),
+            "https://youtube.com/watch?v=abc"
+        )
+        self.assertEqual(
+            self.canonicalizer.normalize("https://docs.example.org/app?session=1&page=2#/settings"),
+            "https://docs.example.org/app?page=2#/settings"
+        )
+
+    def test_learned_canonical_links(self):
+        """Test that rel=canonical targets are followed only within the same host."""
+        self.assertTrue(self.canonicalizer.learn("https://example.com/p?id=7", "/articles/7"))
+        self.assertEqual(
+            self.canonicalizer.canonicalize("http://www.example.com/p?id=7&utm_medium=email"),
+            "https://example.com/articles/7"
+        )
+        self.assertFalse(self.canonicalizer.learn("https://example.com/q", "https://other.com/q"))
+        self.assertEqual(self.canonicalizer.canonicalize("https://example.com/q"), "https://example.com/q")
+
+    def test_non_http_urls_are_unchanged(self):
+        """Test that URLs the rules don't apply to pass through."""
+        self.assertEqual(self.canonicalizer.normalize("mailto:someone@example.com"), "mailto:someone@example.com")
+        self.assertEqual(self.canonicalizer.normalize("not a url"), "not a url")
+
+if __name__ == "__main__":
+    unittest.main()